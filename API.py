@@ -87,6 +87,22 @@ class web_API(Server):
         def anime_nb():
             return jsonify({"value": len(self.db.animes)})
 
+        @self.app.route("/missing/list")
+        def get_missing():
+            return jsonify(self.db.list_missing_episodes())
+
+        @self.app.route("/missing/nb")
+        def missing_nb():
+            return jsonify({"value": DataBase.missing_episodes.count()})
+
+        @self.app.route("/tmdb/cache")
+        def tmdb_cache_stats():
+            return jsonify({"value": Server.title_cache.stats()})
+
+        @self.app.route("/connectors/stats")
+        def connectors_stats():
+            return jsonify({"value": ConnectorShowBase.stats()})
+
         @self.app.route("/cpu_temp/current")
         def cpu_temp():
             return jsonify({"value": Server.CPU_TEMP})
@@ -0,0 +1,391 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class ProbeCache():
+    """
+    On-disk cache of ffprobe results.
+
+    Each entry is keyed by the file path and stores the fingerprint (size, mtime, inode) of the file at the time it
+    was probed. A lookup only hits when the current fingerprint matches the stored one, so a replaced or re-encoded
+    file is probed again.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.lock:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS probe ("
+                              "path TEXT PRIMARY KEY, "
+                              "size INTEGER NOT NULL, "
+                              "mtime INTEGER NOT NULL, "
+                              "inode INTEGER NOT NULL, "
+                              "spec TEXT NOT NULL)")
+            self.conn.commit()
+
+    def fingerprint(file_path: str) -> tuple[int, int, int] | None:
+        """
+        Returns the (size, mtime, inode) fingerprint of a file, or None if the file cannot be stat'ed.
+        """
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            return None
+        return st.st_size, st.st_mtime_ns, st.st_ino
+
+    def get(self, file_path: str) -> dict | None:
+        """
+        Returns the cached spec of a file if its fingerprint did not change since it was probed, None otherwise.
+        """
+        fingerprint = ProbeCache.fingerprint(file_path)
+        if fingerprint is None:
+            with self.lock:
+                self.misses += 1
+            return None
+        with self.lock:
+            row = self.conn.execute("SELECT size, mtime, inode, spec FROM probe WHERE path = ?",
+                                    (file_path,)).fetchone()
+            if row is None or tuple(row[:3]) != fingerprint:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(row[3])
+
+    def put(self, file_path: str, spec: dict):
+        fingerprint = ProbeCache.fingerprint(file_path)
+        if fingerprint is None:
+            return
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO probe (path, size, mtime, inode, spec) VALUES (?, ?, ?, ?, ?)",
+                              (file_path, *fingerprint, json.dumps(spec)))
+            self.conn.commit()
+
+    def evict(self, paths: list[str]) -> int:
+        """
+        Removes the given paths from the cache and returns the number of removed entries.
+        """
+        with self.lock:
+            count = self.conn.executemany("DELETE FROM probe WHERE path = ?", [(p,) for p in paths]).rowcount
+            self.conn.commit()
+            self.evicted += count
+        return count
+
+    def evict_missing(self) -> int:
+        """
+        Removes every entry whose file no longer exists and returns the number of removed entries.
+        """
+        with self.lock:
+            paths = [row[0] for row in self.conn.execute("SELECT path FROM probe")]
+        return self.evict([p for p in paths if not os.path.isfile(p)])
+
+    def stats(self) -> dict:
+        with self.lock:
+            size = self.conn.execute("SELECT COUNT(*) FROM probe").fetchone()[0]
+            return {"hits": self.hits, "misses": self.misses, "evicted": self.evicted, "size": size}
+
+
+class TitleCache():
+    """
+    Cache of the TMDB searches that found nothing for a parsed title, bounded in memory by an LRU and persisted on
+    disk.
+
+    Titles are cached per kind of search ("tv" or "movie"). An entry expires after `negative_ttl` seconds so a title
+    that was not yet on TMDB is searched again later. Found titles are not cached here, they are kept in
+    `Server.tmdb_title`.
+    """
+
+    def __init__(self, path: str, size: int = 2048, negative_ttl: int = 86400):
+        self.path = path
+        self.size = size
+        self.negative_ttl = negative_ttl
+        self.lru = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.lock:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            # the title table also stored the found titles
+            self.conn.execute("DROP TABLE IF EXISTS title")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS not_found ("
+                              "kind TEXT NOT NULL, "
+                              "title TEXT NOT NULL, "
+                              "stored_at REAL NOT NULL, "
+                              "PRIMARY KEY (kind, title))")
+            self.conn.commit()
+
+    def remember(self, key: tuple[str, str], stored_at: float):
+        self.lru[key] = stored_at
+        self.lru.move_to_end(key)
+        while len(self.lru) > self.size:
+            self.lru.popitem(last=False)
+
+    def get(self, kind: str, title: str) -> bool:
+        """
+        Returns True if the search of `title` is cached as not found and its entry did not expire.
+        """
+        key = (kind, title)
+        with self.lock:
+            stored_at = self.lru.get(key, None)
+            if stored_at is None:
+                row = self.conn.execute("SELECT stored_at FROM not_found WHERE kind = ? AND title = ?",
+                                        key).fetchone()
+                stored_at = row[0] if row is not None else None
+            if stored_at is None or time.time() - stored_at > self.negative_ttl:
+                self.lru.pop(key, None)
+                self.misses += 1
+                return False
+            self.remember(key, stored_at)
+            self.hits += 1
+            return True
+
+    def put(self, kind: str, title: str):
+        """
+        Caches a search of `title` that found nothing.
+        """
+        stored_at = time.time()
+        with self.lock:
+            self.remember((kind, title), stored_at)
+            self.conn.execute("INSERT OR REPLACE INTO not_found (kind, title, stored_at) VALUES (?, ?, ?)",
+                              (kind, title, stored_at))
+            self.conn.commit()
+
+    def purge_expired(self) -> int:
+        """
+        Removes the expired entries from the disk and returns their number.
+        """
+        with self.lock:
+            count = self.conn.execute("DELETE FROM not_found WHERE stored_at < ?",
+                                      (time.time() - self.negative_ttl,)).rowcount
+            self.conn.commit()
+        return count
+
+    def stats(self) -> dict:
+        with self.lock:
+            size = self.conn.execute("SELECT COUNT(*) FROM not_found").fetchone()[0]
+            return {"hits": self.hits, "misses": self.misses, "memory": len(self.lru), "size": size}
+
+
+class NfoCache():
+    """
+    On-disk cache of the parsed NFOs of the torrents, keyed by torrent id. The NFO of a torrent does not change, so
+    an entry never expires.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.lock:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS nfo ("
+                              "torrent_id TEXT PRIMARY KEY, "
+                              "nfo TEXT NOT NULL, "
+                              "stored_at REAL NOT NULL)")
+            # the empty NFOs cached from refused or failed requests
+            self.conn.execute("DELETE FROM nfo WHERE nfo = '{}'")
+            self.conn.commit()
+
+    def get(self, torrent_id: str | int) -> dict | None:
+        with self.lock:
+            row = self.conn.execute("SELECT nfo FROM nfo WHERE torrent_id = ?", (str(torrent_id),)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, torrent_id: str | int, nfo: dict):
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO nfo (torrent_id, nfo, stored_at) VALUES (?, ?, ?)",
+                              (str(torrent_id), json.dumps(nfo), time.time()))
+            self.conn.commit()
+
+    def put_missing(self, nfos: dict) -> int:
+        """
+        Caches the {torrent id: nfo} entries not cached yet and returns their number.
+        """
+        with self.lock:
+            count = self.conn.executemany("INSERT OR IGNORE INTO nfo (torrent_id, nfo, stored_at) VALUES (?, ?, ?)",
+                                          [(str(torrent_id), json.dumps(nfo), time.time())
+                                           for torrent_id, nfo in nfos.items()]).rowcount
+            self.conn.commit()
+        return count
+
+    def stats(self) -> dict:
+        with self.lock:
+            size = self.conn.execute("SELECT COUNT(*) FROM nfo").fetchone()[0]
+            return {"hits": self.hits, "misses": self.misses, "size": size}
+
+
+class PageCache():
+    """
+    On-disk cache of fetched pages, keyed by URL.
+
+    A page younger than `ttl` seconds is served without any request. An older one is revalidated: the request
+    carries its ETag and Last-Modified headers, and a "304 Not Modified" answer serves the cached page again for
+    `ttl` seconds.
+    """
+
+    def __init__(self, path: str, ttl: int = 21600):
+        self.path = path
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.lock:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS page ("
+                              "url TEXT PRIMARY KEY, "
+                              "content BLOB NOT NULL, "
+                              "etag TEXT, "
+                              "last_modified TEXT, "
+                              "stored_at REAL NOT NULL)")
+            self.conn.commit()
+
+    def get(self, url: str) -> tuple[bytes | None, dict]:
+        """
+        Returns the cached page if it is fresh, else None and the headers of the conditional request to make.
+        """
+        with self.lock:
+            row = self.conn.execute("SELECT content, etag, last_modified, stored_at FROM page WHERE url = ?",
+                                    (url,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None, {}
+            if time.time() - row[3] <= self.ttl:
+                self.hits += 1
+                return row[0], {}
+            self.misses += 1
+        headers = {}
+        if row[1] is not None:
+            headers["If-None-Match"] = row[1]
+        if row[2] is not None:
+            headers["If-Modified-Since"] = row[2]
+        return None, headers
+
+    def not_modified(self, url: str) -> bytes | None:
+        """
+        Returns the cached page after a "304 Not Modified" answer, fresh again for `ttl` seconds.
+        """
+        with self.lock:
+            row = self.conn.execute("SELECT content FROM page WHERE url = ?", (url,)).fetchone()
+            if row is None:
+                return None
+            self.conn.execute("UPDATE page SET stored_at = ? WHERE url = ?", (time.time(), url))
+            self.conn.commit()
+            self.revalidated += 1
+        return row[0]
+
+    def put(self, url: str, content: bytes, etag: str | None = None, last_modified: str | None = None):
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO page (url, content, etag, last_modified, stored_at) "
+                              "VALUES (?, ?, ?, ?, ?)", (url, content, etag, last_modified, time.time()))
+            self.conn.commit()
+
+    def stats(self) -> dict:
+        with self.lock:
+            size = self.conn.execute("SELECT COUNT(*) FROM page").fetchone()[0]
+            return {"hits": self.hits, "revalidated": self.revalidated, "misses": self.misses, "size": size}
+
+
+class NfoKeyCache():
+    """
+    Classification of the NFO keys that are not in the alias tables of the key maps (see Nfo.NfoKeyMap), kept in
+    memory and persisted on disk.
+
+    Keys are cached per `kind`, the signature of a key map, so changing its wanted names or threshold starts over
+    with an empty classification. At most `size` keys are kept: the least recently used key is dropped from memory and
+    from the disk when a new key is classified. A hit only moves the key in memory, the time of its last use is
+    written to the disk when a key is dropped or by `flush`, so the keys reloaded at startup are the most recently
+    used ones.
+    """
+
+    def __init__(self, path: str, size: int = 4096):
+        self.path = path
+        self.size = size
+        self.lru = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        # {(kind, key): time} of the hits not written to the disk yet
+        self.used = {}
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.lock:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS nfo_key ("
+                              "kind TEXT NOT NULL, "
+                              "key TEXT NOT NULL, "
+                              "name TEXT, "
+                              "stored_at REAL NOT NULL, "
+                              "PRIMARY KEY (kind, key))")
+            self.conn.commit()
+            rows = self.conn.execute("SELECT kind, key, name FROM nfo_key ORDER BY stored_at DESC LIMIT ?",
+                                     (self.size,)).fetchall()
+        for kind, key, name in reversed(rows):
+            self.lru[(kind, key)] = name if name is not None else False
+
+    def get(self, kind: str, key: str) -> str | bool | None:
+        """
+        Returns the wanted name of a key, False if it matches none, None if the key is not classified yet.
+        """
+        with self.lock:
+            name = self.lru.get((kind, key), None)
+            if name is None:
+                self.misses += 1
+                return None
+            self.lru.move_to_end((kind, key))
+            self.used[(kind, key)] = time.time()
+            self.hits += 1
+            return name
+
+    def put(self, kind: str, key: str, name: str | bool):
+        with self.lock:
+            self.lru[(kind, key)] = name
+            self.lru.move_to_end((kind, key))
+            self.used.pop((kind, key), None)
+            self.conn.execute("INSERT OR REPLACE INTO nfo_key (kind, key, name, stored_at) VALUES (?, ?, ?, ?)",
+                              (kind, key, name if name else None, time.time()))
+            if len(self.lru) > self.size:
+                while len(self.lru) > self.size:
+                    dropped, name = self.lru.popitem(last=False)
+                    self.used.pop(dropped, None)
+                    self.conn.execute("DELETE FROM nfo_key WHERE kind = ? AND key = ?", dropped)
+                self.write_used()
+            self.conn.commit()
+
+    def write_used(self):
+        self.conn.executemany("UPDATE nfo_key SET stored_at = ? WHERE kind = ? AND key = ?",
+                              [(used_at, kind, key) for (kind, key), used_at in self.used.items()])
+        self.used = {}
+
+    def flush(self):
+        """
+        Writes the time of the last use of the keys hit since the last write.
+        """
+        with self.lock:
+            if self.used:
+                self.write_used()
+                self.conn.commit()
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self.lru)}
@@ -1,13 +1,112 @@
 import os.path
 import subprocess
 import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 
-from bs4 import BeautifulSoup
 import feedparser, re
 from thefuzz import fuzz
 from thefuzz import process
 from operator import itemgetter
+from dataclasses import dataclass, field
 from common import *
+from Nfo import MEDIAINFO_KEYS, MEDIAINFO_SECTIONS, NfoKeyMap, parse_nfo
+from Scrape import parse_result_page
+from Storage import EpisodeIndex, LibraryStore, MissingEpisodes
+from Throttle import RateLimiter
+
+
+def ffprobe_spec(path: str) -> dict:
+    """
+    Runs ffprobe on a video file and extracts the codec, height and languages of its streams.
+
+    Raises:
+        subprocess.CalledProcessError: If ffprobe fails on the file.
+    """
+    track_info = {'audio': {"codec": [], "language": []},
+                  'subtitles': {"codec": [], "language": []},
+                  'video': {"codec": None, "height": None}}
+
+    # Run the ffprobe command and capture the output
+    cmd = ["ffprobe", "-v", "quiet", "-print_format", "json", "-show_format", "-show_streams", path]
+    result = subprocess.check_output(cmd, universal_newlines=True, errors="ignore")
+
+    # Parse the JSON output to extract the subtitle languages
+    data = json.loads(result)
+    for streams in data["streams"]:
+        stream_type = streams["codec_type"].lower()
+        if stream_type == "video":
+            try:
+                track_info["video"]["height"] = streams["height"]
+            except KeyError:
+                pass
+            try:
+                track_info["video"]["codec"] = streams["codec_name"].upper()
+            except KeyError:
+                pass
+        elif stream_type == "audio":
+            try:
+                track_info["audio"]["codec"].append(streams["codec_name"].upper())
+            except KeyError:
+                pass
+            try:
+                track_info["audio"]["language"].append(streams["tags"]["language"].lower())
+            except KeyError:
+                pass
+        elif stream_type == "subtitle":
+            try:
+                track_info["subtitles"]["codec"].append(streams["codec_name"].upper())
+            except KeyError:
+                pass
+            try:
+                track_info["subtitles"]["language"].append(streams["tags"]["language"].lower())
+            except KeyError:
+                pass
+
+    return track_info
+
+
+def cache_video_spec(path: str) -> None:
+    """
+    Probes a video file and stores its specifications in `Server.probe_cache`.
+
+    Errors are swallowed on purpose: the file is left uncached so the caller probes it again and handles the error
+    the same way it did before the file was prefetched.
+    """
+    if not (os.path.isfile(path) and is_video(path)):
+        return
+    if Server.probe_cache.get(path) is not None:
+        return
+    try:
+        Server.probe_cache.put(path, ffprobe_spec(path))
+    except (subprocess.CalledProcessError, UnicodeError, ValueError, OSError) as e:
+        log(f"{e} ---> {path} while prefetching video specs", debug=True)
+
+
+def prefetch_video_specs(paths: list[str], workers: int = Server.PROBE_WORKERS):
+    """
+    Yields each path of `paths`, in order, once its video specifications are in `Server.probe_cache`.
+
+    Up to `workers` ffprobe processes run concurrently ahead of the consumer, so the single writer that builds
+    SorterShows/SorterMovie objects from the yielded paths only gets cache hits.
+
+    Args:
+        paths (list[str]): The files to probe.
+        workers (int, optional): Size of the probe pool. Defaults to `probe_workers` from server.conf.
+    """
+    if workers <= 1:
+        yield from paths
+        return
+    paths = iter(paths)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque((path, pool.submit(cache_video_spec, path)) for path in islice(paths, workers * 2))
+        while pending:
+            path, future = pending.popleft()
+            future.result()
+            for next_path in islice(paths, 1):
+                pending.append((next_path, pool.submit(cache_video_spec, next_path)))
+            yield path
 
 
 class SorterCommon(Server):
@@ -57,11 +156,7 @@ class SorterCommon(Server):
         Returns:
             None
         """
-        banned_chars = [("[", "]"), ("{", "}"), ("(", ")")]
-        for banned_char in banned_chars:
-            char1, char2 = banned_char
-            while char1 in self.clean_file_name and char2 in self.clean_file_name:
-                self.clean_file_name = delete_from_to(self.clean_file_name, char1, char2)
+        self.clean_file_name = strip_brackets(self.clean_file_name)
 
     def determine_language(self):
         """
@@ -81,14 +176,9 @@ class SorterCommon(Server):
         'VOSTFR'
         """
 
-        if "vf" in self.file_name.lower() and "vostfr" in self.file_name.lower():
-            return "VF/VOSTFR"
-
-        elif "vf" in self.file_name.lower():
-            return "VF"
-
-        elif "vostfr" in self.file_name.lower():
-            return "VOSTFR"
+        language = parse_language(self.file_name)
+        if language is not None:
+            return language
 
         result = ""
         if len(self.spec["subtitles"]["language"]) > 1:
@@ -107,6 +197,8 @@ class SorterCommon(Server):
         """
         Retrieve the specifications of a video file using ffprobe.
 
+        The result is stored in `Server.probe_cache` so an unchanged file is never probed twice.
+
         Returns:
             dict[str, dict[str, list[str]] | dict[str, list[str]] | dict[str, int]]: The video specifications.
 
@@ -118,62 +210,25 @@ class SorterCommon(Server):
         {'audio': {'codec': ['Unknown'], 'language': ['Unknown']}, 'subtitles': {'codec': ['Unknown'], 'language': ['Unknown']}, 'video': {'codec': 'Unknown', 'height': -1}}
         """
 
-        track_info = {'audio': {"codec": [], "language": []},
-                      'subtitles': {"codec": [], "language": []},
-                      'video': {"codec": None, "height": None}}
-
-        # Run the ffprobe command and capture the output
-        cmd = ["ffprobe", "-v", "quiet", "-print_format", "json", "-show_format", "-show_streams", self.path]
-        result = subprocess.check_output(cmd, universal_newlines=True, errors="ignore")
-
-        # Parse the JSON output to extract the subtitle languages
-        data = json.loads(result)
-        for streams in data["streams"]:
-            stream_type = streams["codec_type"].lower()
-            if stream_type == "video":
-                try:
-                    track_info["video"]["height"] = streams["height"]
-                except KeyError:
-                    pass
-                try:
-                    track_info["video"]["codec"] = streams["codec_name"].upper()
-                except KeyError:
-                    pass
-            elif stream_type == "audio":
-                try:
-                    track_info["audio"]["codec"].append(streams["codec_name"].upper())
-                except KeyError:
-                    pass
-                try:
-                    track_info["audio"]["language"].append(streams["tags"]["language"].lower())
-                except KeyError:
-                    pass
-            elif stream_type == "subtitle":
-                try:
-                    track_info["subtitles"]["codec"].append(streams["codec_name"].upper())
-                except KeyError:
-                    pass
-                try:
-                    track_info["subtitles"]["language"].append(streams["tags"]["language"].lower())
-                except KeyError:
-                    pass
-
+        cached = Server.probe_cache.get(self.path)
+        if cached is not None:
+            return cached
+        track_info = ffprobe_spec(self.path)
+        Server.probe_cache.put(self.path, track_info)
         return track_info
 
 
 class SorterShows(SorterCommon):
     def __init__(self, file_path: str, file_reachable=True, is_anime=False):
         super().__init__(file_path, file_reachable)
+        self.release = parse_release(self.file_name)
         self.season = self.determine_season()
         self.original_title = self.determine_title()
         self.title = self.original_title
         temp = super().find_tmdb_title(self.title, anime=is_anime, shows=(not is_anime))
         if not temp:
             raise ValueError(f"{file_path}, cannot determine the show")
-        if is_anime:
-            self.show = Anime("ok", temp)
-        else:
-            self.show = Show("ok", temp)
+        self.show = get_media(temp, "anime" if is_anime else "show")
         self.tmdb_info = self.show.info
         self.id = self.show.id
         self.title = self.show.title
@@ -184,41 +239,13 @@ class SorterShows(SorterCommon):
         """
         Determines the title of the video.
 
-        This method analyzes the clean file name attribute stored in the `clean_file_name` property of the object
-        and extracts the title of the video based on certain patterns and conventions. The determined title is returned.
+        The title is extracted from the file name by `parse_release`, along with the season, the episode and the
+        source.
 
         Returns:
             str: The determined title of the video.
         """
-        file = self.clean_file_name
-        file = delete_unwanted_words(file)
-        file = split_on_season_word(file)
-        if " - " in file:
-            file = file.split(" - ")[0]
-            if f"S{self.season}" in file:
-                file = file.split(f"S{self.season}")[0]
-            if f"S{self.season[1]}" in file:
-                file = file.split(f"S{self.season[1]}")[0]
-            if file[-1].isnumeric() and file[-2] == " ":
-                file = file[:-1].strip()
-            return file.strip()
-
-        temp_file, index = file, None
-        while "S" in temp_file:
-            if "S" in temp_file and temp_file.index("S") + 3 < len(file) and temp_file[temp_file.index("S") + 3] == "E":
-                index = temp_file.index("S")
-                break
-            elif "S" in temp_file:
-                temp_file = temp_file.replace("S", " ", 1)
-
-        if index is not None:
-            return file[:index].strip()
-
-        for char in file:
-            if char.isnumeric():
-                return file.split(char)[0].strip()
-
-        return file.split(" ")[0]
+        return self.release.title
 
     def determine_season(self) -> str:
         """
@@ -230,48 +257,7 @@ class SorterShows(SorterCommon):
         >>> video.determine_season()
         '01'
         """
-
-        file, ls = self.clean_file_name, []
-
-        if "oav" in file.lower():
-            return "00"
-
-        if "nd Season" in file:
-            return "02"
-
-        if "st Season" in file:
-            return "01"
-
-        if "rd Season" in file:
-            return "03"
-
-        try:
-            while file[0].isnumeric():
-                file = file[1:]
-        except IndexError:
-            pass
-
-        ls = isolate_numbers(file)
-
-        if len(ls) == 1:
-            return "01"
-
-        for elt in ls:
-            try:
-                if file.split(elt)[0][-1] in "sS":
-                    elt = int(elt)
-                    return f"{elt:02}"
-            except IndexError:
-                pass
-
-        for elt in ls:
-            temp_file, example = file.split(elt)[0], "Season "
-            while temp_file[-1] == example[-1] and len(example) > 1 and len(temp_file) > 1:
-                temp_file, example = temp_file[:-1], example[:-1]
-            if example == "S":
-                return f"{int(elt):02}"
-
-        return "01"
+        return self.release.season
 
     def determine_ep(self) -> str:
         """
@@ -286,48 +272,7 @@ class SorterShows(SorterCommon):
         >>> video.determine_ep()
         '02'
         """
-
-        file, ls, temp = self.clean_file_name, [], None
-        if self.original_title in file:
-            file = file.split(self.original_title)[-1]
-
-        temp_file = file
-
-        ls = isolate_numbers(temp_file)
-
-        if ls == []:
-            return "MOVIE"
-
-        if len(ls) == 1:
-            return f"{ls[0]:02}"
-        else:
-            for elt in ls:
-                try:
-                    if file.split(elt)[0][-1] == "E":
-                        if len(elt) <= 2:
-                            return f"{int(elt):02}"
-                        elif len(elt) == 3:
-                            return f"{int(elt):03}"
-                        elif len(elt) == 4:
-                            return f"{int(elt):04}"
-                except IndexError:
-                    pass
-                if len(elt) == 2:
-                    if f"{int(elt):02}" == self.season:
-                        temp = elt
-                    else:
-                        return f"{int(elt):02}"
-
-            if temp is not None:
-                return f"{int(temp):02}"
-            elif ls != []:
-                ep = str(max([int(i) for i in ls]))
-                if len(ep) <= 2:
-                    return f"{int(ep):02}"
-                elif len(ep) == 3:
-                    return f"{int(ep):03}"
-                elif len(ep) == 4:
-                    return f"{int(ep):04}"
+        return self.release.episode
 
     def determine_source(self) -> str | None:
         """
@@ -342,23 +287,7 @@ class SorterShows(SorterCommon):
         >>> video.determine_source()
         'Source'
         """
-
-        title, source = self.file_name, ""
-
-        if "[" == title[0] and "]" in title:
-            while title[0] != "[":
-                title = title[1:]
-            title = title[1:]
-            while title[0] != "]":
-                source = source + title[0]
-                title = title[1:]
-            return source
-
-        if "-" in title:
-            file = os.path.splitext(title)[0][::-1].strip()
-            if "-" in file[:15]:
-                return "-".join(file[:15].split("-")[:-1])[::-1]
-        return None
+        return self.release.group
 
     def __str__(self):
         if not self.file_reachable:
@@ -374,6 +303,50 @@ class SorterShows(SorterCommon):
             f"{self.title} - S{self.season}E{self.ep} - [{self.lang} {self.resolution} {self.codec}] -{self.source} {self.ext}")
 
 
+def movie_title(path: str, file_name: str) -> str:
+    """
+    Returns the title of a movie from its path and its file name (as cleaned by `SorterCommon`), the name being cut
+    at the first year or resolution.
+    """
+    if file_name[-1] == ')':
+        file = delete_from_to(path[::-1], ")", "(")[::-1]
+        file = os.path.basename(file)
+    else:
+        file = file_name
+    file = os.path.splitext(file)[0].replace(".", " ").replace("_", " ")
+    if file[0] == "[" and "]" in file:
+        file = delete_from_to(file, "[", "]").strip()
+    for words in ["movie", "film", "vostfr"]:
+        if words in file.lower():
+            if words in file:
+                file = file.split(words)[0]
+            elif words.upper() in file:
+                file = file.split(words.upper())[0]
+            elif f"{words[0].upper()}{words[1:]}" in file:
+                file = file.split(f"{words[0].upper()}{words[1:]}")[0]
+    if "-" in file[-3:]:
+        file = "-".join(file.split("-")[:-1])
+
+    new = file[0]
+    file = file[1:]
+    for language in list_language:
+        if language in file:
+            file = file.split(language)[0]
+        elif language in file.lower():
+            file = file.split(f"{language[0].upper()}{language[1:]}")[0]
+    if "(" in file:
+        file = file.split("(")[0]
+    file += "/"
+    i = 0
+    while file[i] != "/":
+        test = file[i:i + 4]
+        if len(test) == 4 and test.isnumeric() and (1900 < int(test) <= datetime.datetime.now().year
+                                                    or int(test) in [1080, 720, 480, 2160]):
+            break
+        i += 1
+    return strip_brackets(new + file[:i])
+
+
 class SorterMovie(SorterCommon):
 
     def __init__(self, file_path, file_reachable=True):
@@ -382,58 +355,13 @@ class SorterMovie(SorterCommon):
         temp = super().find_tmdb_title(self.title, movie=True)
         if temp == False:
             raise ValueError(f"{file_path}, cannot determine the movie")
-        self.movie = Movie("ok", temp)
+        self.movie = get_media(temp, "movie")
         self.tmdb_info = self.movie.info
         self.id = self.movie.id
         self.title = self.movie.title
 
     def determine_title(self):
-        if self.file_name[-1] == ')':
-            file = delete_from_to(self.path[::-1], ")", "(")[::-1]
-            file = os.path.basename(file)
-        else:
-            file = self.file_name
-        file = os.path.splitext(file)[0].replace(".", " ").replace("_", " ")
-        if file[0] == "[" and "]" in file:
-            file = delete_from_to(file, "[", "]").strip()
-        for words in ["movie", "film", "vostfr"]:
-            if words in file.lower():
-                if words in file:
-                    file = file.split(words)[0]
-                elif words.upper() in file:
-                    file = file.split(words.upper())[0]
-                elif f"{words[0].upper()}{words[1:]}" in file:
-                    file = file.split(f"{words[0].upper()}{words[1:]}")[0]
-        if "-" in file[-3:]:
-            file = "-".join(file.split("-")[:-1])
-
-        new = file[0]
-        file = file[1:]
-        for language in list_language:
-            if language in file:
-                file = file.split(language)[0]
-            elif language in file.lower():
-                file = file.split(f"{language[0].upper()}{language[1:]}")[0]
-        if "(" in file:
-            file = file.split("(")[0]
-        file += "/"
-        while file[0] != "/":
-            if len(file) >= 4:
-                test = file[0:4]
-                if test.isnumeric() and (1900 < int(test) <= datetime.datetime.now().year or int(test) in [1080, 720,
-                                                                                                           480, 2160]):
-                    break
-                else:
-                    new += file[0]
-                    file = file[1:]
-            else:
-                new += file[0]
-                file = file[1:]
-        for banned_car in [("[", "]"), ("{", "}"), ("(", ")")]:
-            car1, car2 = banned_car
-            while car1 in new and car2 in new:
-                new = delete_from_to(new, car1, car2)
-        return new
+        return movie_title(self.path, self.file_name)
 
     def __str__(self):
         if not self.file_reachable:
@@ -502,7 +430,7 @@ class Movie(Server):
                 "height": file.resolution,
                 "codec": file.codec,
             }
-            json.dump(DataBase.movies, open(os.path.join(VAR_DIR, MOVIES_LIB), "w", encoding="utf-8"), indent=5)
+            DataBase.store.put_media("movie", str(self.id), DataBase.movies[str(self.id)])
 
 
 class Show(Server):
@@ -530,8 +458,15 @@ class Show(Server):
         if self.info is None:
             raise Exception(f"Show {title} no information found")
         self.id = self.info["id"]
-        self.seasons_created = self.list_season()
-        self.seasons_theoric = self.info["seasons"]
+
+    @property
+    def seasons_created(self) -> dict | None:
+        """The seasons of the show in the library, read when accessed so a cached object follows the library."""
+        return self.list_season()
+
+    @property
+    def seasons_theoric(self) -> list:
+        return self.info["seasons"]
 
     def list_season(self):
         """
@@ -620,7 +555,7 @@ class Show(Server):
 
             e = Episode(Season(self, elt['path'], elt), ep["path"])
             e.delete()
-            DataBase.delete_episode(self.id, ep_number, season_number, show=self.is_show, anime=(not self.is_show))
+            DataBase.delete_episode(self.id, season_number, ep_number, show=self.is_show, anime=(not self.is_show))
             return True
 
     def delete_season(self, season_number: int) -> bool:
@@ -751,6 +686,143 @@ class Episode(Server):
         os.remove(self.path)
 
 
+MEDIA_CLASSES = {"anime": Anime, "show": Show, "movie": Movie}
+
+
+def get_media(title: str, kind: str) -> Show | Anime | Movie:
+    """
+    Returns the media object of a title resolved by `find_tmdb_title`, `kind` being "anime", "show" or "movie".
+
+    The objects are kept in `Server.media_objects`, one per kind and TMDB id, so the episodes of a feed or of a sorted
+    folder share the object of their show instead of building it again. `Server.forget_media` drops the object of an
+    id when its tmdb_db entry or its library entry changes, the seasons of a show are read from the library when
+    accessed.
+
+    Raises:
+        Exception: If the media is not found or no information is found, like the constructors.
+    """
+    with Server.tmdb_lock:
+        info = Server.tmdb_db.get(title, None)
+        if info is not None:
+            media = Server.media_objects.get((kind, info["id"]), None)
+            if media is not None:
+                return media
+        media = MEDIA_CLASSES[kind]("ok", title)
+        entry = {"anime": DataBase.animes, "show": DataBase.shows, "movie": DataBase.movies}[kind].get(str(media.id))
+        if entry is not None:
+            media.path = entry["path"]
+        Server.media_objects[(kind, media.id)] = media
+        return media
+
+
+@dataclass(slots=True)
+class EpisodeRef:
+    """
+    Parsed episode of an unreachable file, with the attributes of `SorterShows` read by the feeds and the
+    connectors. The `Show` (or `Anime`) is only built when `show` is read.
+    """
+    name: str
+    id: int
+    title: str
+    season: str
+    ep: str
+    source: str | None
+    ext: str
+    kind: str = "show"
+    _show: Show | None = field(default=None, repr=False, compare=False)
+
+    @property
+    def show(self) -> Show:
+        if self._show is None:
+            self._show = get_media(self.title, self.kind)
+        return self._show
+
+
+@dataclass(slots=True)
+class MovieRef:
+    """
+    Parsed unreachable movie file, the `Movie` is only built when `movie` is read.
+    """
+    name: str
+    id: int
+    title: str
+    ext: str
+    _movie: Movie | None = field(default=None, repr=False, compare=False)
+
+    @property
+    def movie(self) -> Movie:
+        if self._movie is None:
+            self._movie = get_media(self.title, "movie")
+        return self._movie
+
+
+def resolve_title(server: Server, title: str, kind: str) -> tuple[str, int] | None:
+    """
+    Returns the TMDB title and id of a parsed title the way `SorterShows` and `SorterMovie` resolve it, None if it
+    is not found.
+    """
+    # the connectors resolve titles from concurrent threads, the lookups, TMDB searches and tmdb_db updates of a
+    # title are made under tmdb_lock
+    with Server.tmdb_lock:
+        if kind == "movie":
+            tmdb_title = server.find_tmdb_title(title, movie=True)
+            if tmdb_title == False:
+                return None
+            # like Movie("ok", tmdb_title)
+            movie_title = server.find_tmdb_title(tmdb_title, movie=True)
+            info = server.get_tmdb_info(tmdb_title, movie=True)
+            return movie_title, info["id"]
+        tmdb_title = server.find_tmdb_title(title, anime=(kind == "anime"), shows=(kind == "show"))
+        if not tmdb_title:
+            return None
+        # like Show("ok", tmdb_title) and Anime("ok", tmdb_title)
+        show_title = server.find_tmdb_title(tmdb_title, shows=(kind == "show"), anime=(kind == "anime"), movie=False)
+        info = server.get_tmdb_info(show_title, show=True)
+        return show_title, info["id"]
+
+
+def parse_many(names: list[str], kind: str) -> list[EpisodeRef | MovieRef | None]:
+    """
+    Parses unreachable files (torrent or feed entry names) in bulk, `kind` being "anime", "show" or "movie".
+
+    Gives the id, title, season and episode a `SorterShows` (or the id and title a `SorterMovie`) built with
+    file_reachable=False would give, without building one per name: each distinct parsed title is resolved once
+    for the whole list.
+
+    Returns:
+        list: One EpisodeRef (MovieRef for movies) per name, in order, None for the names that could not be parsed
+        or whose show could not be determined.
+    """
+    if kind not in ("anime", "show", "movie"):
+        raise ValueError(f"kind should be anime, show or movie, not {kind}")
+    server = Server()
+    resolved = {}
+    records = []
+    for name in names:
+        file_name = os.path.basename(strip_brackets(name))
+        ext = os.path.splitext(file_name)[1]
+        try:
+            if kind == "movie":
+                title = movie_title(name, file_name)
+            else:
+                release = parse_release(file_name)
+                title = release.title
+            if title not in resolved:
+                resolved[title] = resolve_title(server, title, kind)
+        except (ValueError, IndexError, KeyError, AttributeError, requests.exceptions.RequestException) as e:
+            log(f"{name}: {e}", debug=True)
+            records.append(None)
+            continue
+        if resolved[title] is None:
+            records.append(None)
+        elif kind == "movie":
+            records.append(MovieRef(name, resolved[title][1], resolved[title][0], ext))
+        else:
+            records.append(EpisodeRef(name, resolved[title][1], resolved[title][0], release.season, release.episode,
+                                      release.group, ext, kind))
+    return records
+
+
 class ConnectorShowBase(Server):
     connector_conf_dir = os.path.join(CONF_DIR, "connectors")
     connector_conf_file = "common.conf"
@@ -758,6 +830,18 @@ class ConnectorShowBase(Server):
     wanted_nfo_specification = ["format", "codec id", "duration", "width",
                                 "height", "language", "resolution", "hauteur", "largeur", "duree"]
     wanted_nfo_title = ["text", "video", "audio", "mkv"]
+    # classification of the NFO keys, shared by the connectors and kept across runs
+    nfo_key_cache = NfoKeyCache(os.path.join(VAR_DIR, NFO_KEY_CACHE), size=int(Server.conf.get("nfo_key_cache_size", 4096)))
+    nfo_titles = NfoKeyMap(wanted_nfo_title, 65, aliases=MEDIAINFO_SECTIONS, cache=nfo_key_cache)
+    nfo_specifications = NfoKeyMap(wanted_nfo_specification, 80, aliases=MEDIAINFO_KEYS, cache=nfo_key_cache)
+    # one rate limiter per connector, shared by its instances, see get_limiter
+    limiters = {}
+    # connector registry, see get_connector
+    instances = {}
+    # {(id, movie): (titles, fetched_at)}, see get_titles
+    titles_cache = {}
+    # {conf file path: ((mtime, size), conf)}, see parse_conf
+    conf_cache = {}
 
     if not os.path.isfile(os.path.join(connector_conf_dir, connector_conf_file)):
         with open(os.path.join(connector_conf_dir, connector_conf_file), "w") as f:
@@ -770,9 +854,47 @@ class ConnectorShowBase(Server):
 
         # should add config for connector
         self.target_title_lang = ["de", "en", "fr", "ja", "ko", "DE", "JP", 'EN', 'FR', 'GB', 'gb', 'US']
-        self.alt_titles = list(set(self.get_titles(id)))
+        self.id = id
+        self.conf_stamp = None
+        self.get_titles(id)
+
+    @property
+    def alt_titles(self) -> list[str]:
+        return list(set(self.get_titles(self.id)))
+
+    def get_connector(connector: type, id: int, movie=False) -> "ConnectorShowBase":
+        """
+        Returns the connector of a show, built on first use and kept for the next episodes and runs. It is built
+        again only when its .conf file changed.
+        """
+        key = (connector, int(id), movie)
+        con = ConnectorShowBase.instances.get(key, None)
+        if con is None or con.conf_stamp != ConnectorShowBase.file_stamp(con.conf_path):
+            con = connector(id, movie=True) if movie else connector(id)
+            ConnectorShowBase.instances[key] = con
+        return con
+
+    def file_stamp(path: str) -> tuple[int, int] | None:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
 
     def get_titles(self, id: int) -> list[str] | None:
+        """
+        Returns the titles of a show (or movie) in the wanted languages, its translations and alternative titles.
+        They are cached per TMDB id for connector_titles_ttl seconds, so the alternative titles are requested once
+        per show and not once per searched episode.
+        """
+        cached = ConnectorShowBase.titles_cache.get((int(id), self.is_movie), None)
+        if cached is not None and time.time() - cached[1] < int(Server.conf.get("connector_titles_ttl", 86400)):
+            return cached[0]
+        titles = self.fetch_titles(id)
+        ConnectorShowBase.titles_cache[(int(id), self.is_movie)] = (titles, time.time())
+        return titles
+
+    def fetch_titles(self, id: int) -> list[str] | None:
         is_anime = self.is_anime_by_id(id)
         title = self.get_tmdb_info_by_id(id, anime=is_anime, show=(not self.is_movie and not is_anime), movie=self.is_movie)
         if self.is_movie:
@@ -788,14 +910,42 @@ class ConnectorShowBase(Server):
                 if title.get('translations', None).get("translations", None) is None:
                     raise Exception(f"cannot find all titles for the show {id}")
                 else:
-                    alt = tmdb.TV(id=title["id"]).alternative_titles()["results"]
+                    alt = Server.tmdb_refresher.api(tmdb.TV(id=title["id"])).alternative_titles()["results"]
                     alt = [i['title'] for i in alt if i["iso_3166_1"] in self.target_title_lang ]
                     return [ *[t["data"][text] for t in title.get("translations").get("translations") if
                             t["data"][text] != "" and t["iso_639_1"] in self.target_title_lang] , *alt]
     
     
 
+    def get_limiter(name: str, rate: float) -> RateLimiter:
+        """
+        Returns the rate limiter named `name`, a connector or the host it requests, created with `rate` requests per
+        second on first use. Every request of the connector waits for it, whatever instance or thread makes it.
+        """
+        return ConnectorShowBase.limiters.setdefault(name, RateLimiter(rate))
+
+    def stats() -> dict:
+        """
+        Returns the seconds waited for each rate limiter, the hits and misses of the NFO key classification, a miss
+        being a key scored with fuzz.ratio, and the connections reused and FlareSolverr calls of `Server.http`.
+        """
+        titles, specifications = ConnectorShowBase.nfo_titles.stats(), ConnectorShowBase.nfo_specifications.stats()
+        hits, misses = titles["hits"] + specifications["hits"], titles["misses"] + specifications["misses"]
+        return {"waited": {name: round(limiter.waited, 2) for name, limiter in ConnectorShowBase.limiters.items()},
+                "nfo_keys": {"hits": hits, "misses": misses,
+                             "hit_rate": round(hits / (hits + misses), 3) if hits + misses != 0 else None,
+                             "titles": titles, "specifications": specifications,
+                             "cached": ConnectorShowBase.nfo_key_cache.stats()["size"]},
+                "http": Server.http.stats()}
+
     def parse_conf(self, conf_file_path: str):
+        """
+        Parses a connector .conf file, read again only when it changed since it was last parsed.
+        """
+        self.conf_stamp = ConnectorShowBase.file_stamp(conf_file_path)
+        cached = ConnectorShowBase.conf_cache.get(conf_file_path, None)
+        if cached is not None and cached[0] == self.conf_stamp:
+            return dict(cached[1])
         conf = {}
         with open(conf_file_path, "r") as f:
             for lines in f:
@@ -814,7 +964,8 @@ class ConnectorShowBase(Server):
                         value = lines[1].replace("\n", "").split(" ")
 
                     conf[key] = value
-        return conf
+        ConnectorShowBase.conf_cache[conf_file_path] = (self.conf_stamp, conf)
+        return dict(conf)
 
     def exclude_zero_seeders(self, dic: list):
         temp = deepcopy(dic)
@@ -867,9 +1018,32 @@ class ConnectorShowBase(Server):
         return results
 
 
+def stored_nfos(data) -> dict:
+    """
+    Returns the {torrent id: nfo} of the torrents stored in the "web" part of yggdata.json.
+    """
+    nfos = {}
+    if isinstance(data, dict):
+        if "torrent_id" in data and "nfo" in data:
+            if data["nfo"]:
+                nfos[str(data["torrent_id"])] = data["nfo"]
+        else:
+            for value in data.values():
+                nfos.update(stored_nfos(value))
+    elif isinstance(data, list):
+        for value in data:
+            nfos.update(stored_nfos(value))
+    return nfos
+
+
 class YggConnector(ConnectorShowBase):
     id_parsed_ep = []
     id_parsed_batches = []
+    # yggdata.json, loaded by the first instance and shared by all of them
+    shared_data = None
+    # the NFOs are fetched once per torrent and the search pages at most once per ygg_page_cache_ttl seconds
+    nfo_cache = NfoCache(os.path.join(VAR_DIR, NFO_CACHE))
+    page_cache = PageCache(os.path.join(VAR_DIR, PAGE_CACHE), ttl=int(Server.conf.get("ygg_page_cache_ttl", 21600)))
     connector_name = "YggTorrent.conf"
     stored_data_file = "yggdata.json"
     conf_path = os.path.join(ConnectorShowBase.connector_conf_dir, connector_name)
@@ -886,6 +1060,8 @@ class YggConnector(ConnectorShowBase):
             f.write(f"trusted_sources_file_movie = putherethesearchpageforyggtorrent\n")
             f.write(f'trusted_sources_batch_anime = anime_batch_urls\n')
             f.write(f'trusted_sources_batch_show = anime_batch_urls\n')
+            f.write(f"rate_limit = 4\n")
+            f.write(f"page_workers = 4\n")
 
     def __init__(self, id: int, movie=False):
         super().__init__(id, movie=movie)
@@ -905,13 +1081,19 @@ class YggConnector(ConnectorShowBase):
                 f.write(f"trusted_sources_file_movie = putherethesearchpageforyggtorrent\n")
                 f.write(f'trusted_sources_batch_anime = anime_batch_urls\n')
                 f.write(f'trusted_sources_batch_show = anime_batch_urls\n')
+                f.write(f"rate_limit = 4\n")
+                f.write(f"page_workers = 4\n")
         self.stored_data_path = os.path.join(ConnectorShowBase.connector_conf_dir, self.stored_data_file)
         if not (os.path.isfile(self.stored_data_path) and check_json(self.stored_data_path)):
             with open(os.path.join(ConnectorShowBase.connector_conf_dir, self.stored_data_file), "w") as f:
                 f.write('{"rss": {},'
                         ' "web": {} }')
-        with open(os.path.join(ConnectorShowBase.connector_conf_dir, self.stored_data_file), "r") as f:
-            self.stored_data = json.load(f)
+        if YggConnector.shared_data is None:
+            with open(os.path.join(ConnectorShowBase.connector_conf_dir, self.stored_data_file), "r") as f:
+                YggConnector.shared_data = json.load(f)
+            # the NFOs parsed by the runs made before the cache existed
+            YggConnector.nfo_cache.put_missing(stored_nfos(YggConnector.shared_data["web"]))
+        self.stored_data = YggConnector.shared_data
         self.conf = self.parse_conf(self.conf_path)
         self.domain = self.conf["DOMAIN"][0]
         self.pass_key = self.conf["pass_key"][0]
@@ -924,25 +1106,39 @@ class YggConnector(ConnectorShowBase):
         self.trusted_sources_batch_anime = [self.domain + i for i in self.conf["trusted_sources_batch_anime"]]
         self.trusted_sources_batch_show = [self.domain + i for i in self.conf["trusted_sources_batch_show"]]
         self.id = id
-        self.cookies = None
-        self.user_agent = None
+        # every request to the domain waits for the same limiter, whatever page, feed or NFO it fetches
+        self.limiter = ConnectorShowBase.get_limiter(urlparse(self.domain).netloc,
+                                                     float(self.conf.get("rate_limit", [4])[0]))
+        self.page_workers = max(1, int(self.conf.get("page_workers", [4])[0]))
 
         self.active = self.conf["active"]
 
-    def get_cookies_user_agent(self):
-        self.cookies, self.user_agent = flareSolverr_cookies_useragent(self.domain)
+    def getresponse(self, url, headers: dict | None = None):
+        return Server.http.get_protected(url, headers=headers, limiter=self.limiter)
 
-    def getresponse(self, url):
-        response = requests.get(url, cookies=self.cookies, headers={"User-Agent": self.user_agent})
-        if response.status_code == 403:
-            self.get_cookies_user_agent()
-            return requests.get(url, cookies=self.cookies, headers={"User-Agent": self.user_agent})
-        else:
-            return response
+    def get_page(self, url: str) -> bytes:
+        """
+        Returns the content of a search page, from the page cache while it is fresh. A stale page is revalidated
+        with a conditional request.
+        """
+        content, headers = YggConnector.page_cache.get(url)
+        if content is not None:
+            return content
+        response = self.getresponse(url, headers=headers)
+        if response.status_code == 304:
+            content = YggConnector.page_cache.not_modified(url)
+            if content is not None:
+                return content
+            response = self.getresponse(url)
+        if response.status_code == 200:
+            YggConnector.page_cache.put(url, response.content, response.headers.get("ETag", None),
+                                        response.headers.get("Last-Modified", None))
+        return response.content
 
     def extract_feed_info(self, url: str):
+        self.limiter.acquire()
         feed = feedparser.parse(url)
-        rss_feed = {}
+        rss_feed, entries = {}, []
         for entry in feed.entries:
             if 'title' in entry and "link" in entry:
                 title = " ".join(entry.title.split(" ")[:-1])
@@ -953,20 +1149,22 @@ class YggConnector(ConnectorShowBase):
                 link = "/".join(link.split("/")[1:])
                 if os.path.splitext(title)[1] == "":
                     title = title + ".mkv"
-                try:
-                    episode = SorterShows(title, file_reachable=False, is_anime=self.is_anime_by_id(int(self.id)))
-                    if rss_feed.get(str(episode.id), None) is None:
-                        rss_feed[str(episode.id)] = {}
-                    if rss_feed[str(episode.id)].get(episode.season, None) is None:
-                        rss_feed[str(episode.id)][episode.season] = {}
-                    if rss_feed[str(episode.id)][episode.season].get(episode.ep, None) is None:
-                        rss_feed[str(episode.id)][episode.season][episode.ep] = []
-                    rss_feed[str(episode.id)][episode.season][episode.ep].append({"torrent_title": entry.title,
-                                                                                  "link": link,
-                                                                                  "seeders": seeders,
-                                                                                  "size": size})
-                except ValueError as e:
-                    log(str(e), warning=True)
+                entries.append((title, {"torrent_title": entry.title,
+                                        "link": link,
+                                        "seeders": seeders,
+                                        "size": size}))
+        kind = "anime" if self.is_anime_by_id(int(self.id)) else "show"
+        for (title, torrent), episode in zip(entries, parse_many([title for title, torrent in entries], kind)):
+            if episode is None:
+                log(f"{title}, cannot determine the show", warning=True)
+                continue
+            if rss_feed.get(str(episode.id), None) is None:
+                rss_feed[str(episode.id)] = {}
+            if rss_feed[str(episode.id)].get(episode.season, None) is None:
+                rss_feed[str(episode.id)][episode.season] = {}
+            if rss_feed[str(episode.id)][episode.season].get(episode.ep, None) is None:
+                rss_feed[str(episode.id)][episode.season][episode.ep] = []
+            rss_feed[str(episode.id)][episode.season][episode.ep].append(torrent)
         self.stored_data["rss"] = {**self.stored_data["rss"], **rss_feed}
         json.dump(self.stored_data,
                   open(os.path.join(ConnectorShowBase.connector_conf_dir, self.stored_data_file), "w"), indent=5)
@@ -985,113 +1183,32 @@ class YggConnector(ConnectorShowBase):
             return n_url
 
     def parse_page(self, url) -> tuple[dict | None, int | None]:
-        def extract_text_from_tr(html):
-            matching_trs = html.find_all('tr')
-            results = []
-            list_trs = []
-            for tr in matching_trs:
-                for td in tr.find_all("td"):
-                    if td.find("a", {"id": "torrent_name"}) is not None:
-                        list_trs.append(tr)
-            for tr in list_trs:
-                tds = tr.find_all('td')
-                before_last_td = tds[-2]
-                text = before_last_td.get_text(strip=True)
-                results.append(text)
-
-            return results
         try:
-            response = self.getresponse(url)
+            content = self.get_page(url)
         except requests.exceptions.ConnectionError:
             time.sleep(5)
-            self.parse_page(url)
-        html = BeautifulSoup(response.content, features="html.parser")
-        h2_tags_with_font = [h2_tag for h2_tag in html.find_all("h2") if h2_tag.find("font", style="float: right")]
-        if len(h2_tags_with_font) == 0:
+            return self.parse_page(url)
+        rows, total_result = parse_result_page(content)
+        if rows is None:
             return None, None
-        text_contents = [font_tag.text.strip() for h2_tag in h2_tags_with_font for font_tag in
-                         h2_tag.find_all("font")]
-        total_result = int(text_contents[0].split(" ")[0])
-        target_elements = html.find_all("a", id="get_nfo")
-        target_values = [element["target"] for element in target_elements]
-        torrent_name_elements = html.find_all("a", id="torrent_name")
-        torrent_names = [element.text.strip() for element in torrent_name_elements]
-        seeders = extract_text_from_tr(html)
-        return {f"{name}": {"id": id, "seeders": seed} for name, id, seed in
-                zip(torrent_names, target_values, seeders)}, total_result
-
-    def get_value(self, part: str) -> tuple:
-        key, value = "", ""
-        while part != "" and part[0] != ":":
-            key += part[0]
-            part = part[1:]
-        part, key = part[1:], key.replace(".", "").lower().strip()
-        while part != "":
-            value += part[0]
-            part = part[1:]
-        value = value.strip()
-        return (key, value)
+        return {row.name: {"id": row.torrent_id, "seeders": row.seeders} for row in rows}, total_result
 
     def get_nfo(self, id_torrent: int):
-        time.sleep(0.1)
+        cached = YggConnector.nfo_cache.get(id_torrent)
+        if cached is not None:
+            return cached
         response = self.getresponse(f'{self.domain}engine/get_nfo?torrent={id_torrent}')
-        content, result = self.prepare_nfo(str(response.content)), {}
-        temp, title = {}, None
-        for part in content:
-            key, value = self.get_value(part)
-            if key == "" and value == "":
-                continue
-            elif key != "" and value == "":
-                if title is not None:
-                    if temp != {title: {}}:
-                        result = {**result, **deepcopy(temp)}
-                    temp.clear()
-                key = self.wanted_title(key)
-                if key:
-                    title = key
-                    temp[title] = {}
-                else:
-                    key = "None"
-            if title is not None and title != key and len(key) < 30 and len(value) < 60 and key != "None":
-
-                key = self.wanted_info(key)
-                if temp.get(title, None) is None:
-                    temp[title] = {}
-                if key:
-                    temp[title][key] = value
-        result = {**result, **deepcopy(temp)}
-        return delete_empty_dictionnaries(result)
+        result = parse_nfo(str(response.content), ConnectorShowBase.nfo_titles, ConnectorShowBase.nfo_specifications)
+        # an entry never expires, so a refused or failed request, or a page without any NFO key, is fetched again
+        if response.status_code == 200 and result:
+            YggConnector.nfo_cache.put(id_torrent, result)
+        return result
 
     def wanted_title(self, key: str) -> str | bool:
-        key = remove_non_ascii(key).lower()
-        for wanted in ConnectorShowBase.wanted_nfo_title:
-            wanted_ori = wanted
-            wanted = remove_non_ascii(wanted).lower()
-            if fuzz.ratio(key, wanted) > 65:
-                return wanted_ori
-        return False
+        return ConnectorShowBase.nfo_titles(key)
 
     def wanted_info(self, key: str) -> str | bool:
-        key = remove_non_ascii(key).lower()
-        for wanted in ConnectorShowBase.wanted_nfo_specification:
-            wanted_ori = wanted
-            wanted = remove_non_ascii(wanted).lower()
-            if fuzz.ratio(key, wanted) > 80:
-                return wanted_ori
-        return False
-
-    def prepare_nfo(self, nfo_content: str):
-        content = bytes(str(nfo_content).replace('b"<pre>', "").replace('\n</pre>"', ""), "utf-8").decode(
-            'unicode_escape', errors='ignore')
-        content, result = content.split("\n"), {}
-        temp, title, result = {}, None, []
-        for lines in content:
-            temp = ""
-            for car in lines:
-                if (car.isalnum() or car == " " or car == "." or car == ":") and car != "â":
-                    temp += car
-            result.append(temp.strip())
-        return result
+        return ConnectorShowBase.nfo_specifications(key)
 
     def find_from_data_ep(self, season_number: int, episode_number: int) -> list | None:
         s = str(season_number).zfill(2)
@@ -1121,21 +1238,28 @@ class YggConnector(ConnectorShowBase):
         return None
 
     def get_results(self, url: str, title: str):
-        results = {}
+        """
+        Returns the results of a search, all its pages merged in order.
+
+        The first page gives the total number of results, hence the URLs of the other pages, which are then fetched
+        by up to `page_workers` threads, each request waiting for the rate limiter of the domain.
+        """
         title = title.replace(" ", "+")
         url = url.replace("toreplace", title)
-        item, n_tot = self.parse_page(url)
-        if item is None:
+        results, n_tot = self.parse_page(url)
+        if results is None:
             return None
-        results = {**results, **item}
-        time.sleep(1)
+        urls = []
         url = self.get_next_page_url(url, n_tot)
         while url is not None:
-            item, temp = self.parse_page(url)
-            if item is not None:
-                results = {**results, **item}
-            time.sleep(1)
+            urls.append(url)
             url = self.get_next_page_url(url, n_tot)
+        if urls == []:
+            return results
+        with ThreadPoolExecutor(max_workers=min(self.page_workers, len(urls))) as executor:
+            for item, temp in executor.map(self.parse_page, urls):
+                if item is not None:
+                    results.update(item)
         return results
 
     def scrap_ep(self, anime=False, show=False):
@@ -1154,14 +1278,12 @@ class YggConnector(ConnectorShowBase):
                 if new_results is None:
                     continue
                 results = {**results, **new_results}
-        for torrent in results:
+        torrents = list(results)
+        sort_names = [torrent + ".mkv" if os.path.splitext(torrent)[1] == "" else torrent for torrent in torrents]
+        kind = "anime" if self.is_anime_by_id(int(self.id)) else "show"
+        for torrent, ep in zip(torrents, parse_many(sort_names, kind)):
             orignal_name = torrent
-            sort_name = torrent
-            if os.path.splitext(torrent)[1] == "":
-                sort_name = torrent + ".mkv"
-            try:
-                ep = SorterShows(sort_name, file_reachable=False, is_anime=self.is_anime_by_id(int(self.id)))
-            except ValueError as e:
+            if ep is None:
                 continue
             id = str(ep.id)
             if feed.get(id, None) is None:
@@ -1175,8 +1297,8 @@ class YggConnector(ConnectorShowBase):
                                                "seeders": results[torrent]["seeders"],
                                                "torrent_id": results[torrent]["id"],
                                                "nfo": self.get_nfo(results[torrent]["id"])})
-            self.stored_data["web"] = {**self.stored_data["web"], **feed}
-            json.dump(self.stored_data, open(os.path.join(ConnectorShowBase.connector_conf_dir, self.stored_data_file), "w"), indent=5)
+        self.stored_data["web"] = {**self.stored_data["web"], **feed}
+        json.dump(self.stored_data, open(os.path.join(ConnectorShowBase.connector_conf_dir, self.stored_data_file), "w"), indent=5)
         return feed
 
     def scrap_batch(self, anime=False, show=False):
@@ -1194,15 +1316,11 @@ class YggConnector(ConnectorShowBase):
                 new_results = self.get_results(url, titles)
                 if new_results is not None:
                     results = {**results, **new_results}
-        for torrent in results:
+        torrents = list(results)
+        sort_names = [torrent + ".mkv" if os.path.splitext(torrent)[1] == "" else torrent for torrent in torrents]
+        for torrent, ep in zip(torrents, parse_many(sort_names, "anime" if anime else "show")):
             original_name = torrent
-            sort_name = torrent
-
-            if os.path.splitext(torrent)[1] == "":
-                sort_name = torrent + ".mkv"
-            try:
-                ep = SorterShows(sort_name, file_reachable=False, is_anime=anime)
-            except (ValueError, IndexError) as e:
+            if ep is None:
                 continue
             id = str(ep.id)
             if feed.get(id, None) is None:
@@ -1214,9 +1332,9 @@ class YggConnector(ConnectorShowBase):
                                                  "seed": results[torrent]['seeders'],
                                                  "torrent_id": results[torrent]["id"],
                                                  "nfo": self.get_nfo(results[torrent]["id"])})
-            self.stored_data["web"] = {**self.stored_data["web"], **feed}
-            json.dump(self.stored_data,
-                    open(os.path.join(ConnectorShowBase.connector_conf_dir, self.stored_data_file), "w"), indent=5)
+        self.stored_data["web"] = {**self.stored_data["web"], **feed}
+        json.dump(self.stored_data,
+                  open(os.path.join(ConnectorShowBase.connector_conf_dir, self.stored_data_file), "w"), indent=5)
         return feed
 
     def scrap_movie(self):
@@ -1226,16 +1344,11 @@ class YggConnector(ConnectorShowBase):
                 new_results = self.get_results(url, titles)
                 if new_results is not None:
                     results = {**results, **new_results}
-        for torrent in results:
+        torrents = list(results)
+        sort_names = [torrent + ".mkv" if os.path.splitext(torrent)[1] == "" else torrent for torrent in torrents]
+        for torrent, ep in zip(torrents, parse_many(sort_names, "movie")):
             original_name = torrent
-            sort_name = torrent
-            season = None
-
-            if os.path.splitext(torrent)[1] == "":
-                sort_name = torrent + ".mkv"
-            try:
-                ep = SorterMovie(sort_name, file_reachable=False)
-            except ValueError as e:
+            if ep is None:
                 continue
             id = str(ep.id)
             if feed.get(id, None) is None:
@@ -1262,7 +1375,6 @@ class YggConnector(ConnectorShowBase):
             trusted_source = self.trusted_sources_rss_show
         for trusted in trusted_source:
             feed = self.extract_feed_info(trusted)
-            time.sleep(1)
             if self.dict_have_ep(feed, self.id, season_number, episode_number) is None:
                 continue
             else:
@@ -1327,6 +1439,7 @@ class NyaaConnector(ConnectorShowBase):
             f.write(f"active = FALSE\n")
             f.write(f"trusted_sources_rss_url = PutHereURLForNyaaRSSFeed\n")
             f.write(f"words = write words specific to nyaa search engine\n")
+            f.write(f"rate_limit = 1\n")
 
     def __init__(self, id: int):
         super().__init__(id)
@@ -1337,10 +1450,12 @@ class NyaaConnector(ConnectorShowBase):
                 f.write(f"active = FALSE\n")
                 f.write(f"trusted_sources_rss_url = PutHereURLForNyaaRSSFeed\n")
                 f.write(f"words = write words specific to nyaa search engine\n")
+                f.write(f"rate_limit = 1\n")
         self.conf = self.parse_conf(self.conf_path)
         self.trusted_sources_rss_url = self.conf["trusted_sources_rss_url"]
         self.words = self.conf["words"]
         self.id = id
+        self.limiter = ConnectorShowBase.get_limiter(self.connector_name, float(self.conf.get("rate_limit", [1])[0]))
         self.active = self.conf["active"]
 
     def make_url(self, source: str, *arg):
@@ -1357,8 +1472,9 @@ class NyaaConnector(ConnectorShowBase):
             return None
 
     def extract_feed_info(self, url: str):
+        self.limiter.acquire()
         feed = feedparser.parse(url)
-        rss_feed = {}
+        rss_feed, entries = {}, []
         for entry in feed.entries:
             if 'title' in entry and "link" in entry:
                 if os.path.splitext(entry.title)[1] == "":
@@ -1366,22 +1482,21 @@ class NyaaConnector(ConnectorShowBase):
 
                 else:
                     filename = entry.title
-                try:
-                    seeders = entry["nyaa_seeders"]
-                    size = entry["nyaa_size"]
-                    episode = SorterShows(filename, file_reachable=False, is_anime=True)
-                    if rss_feed.get(str(episode.id), None) is None:
-                        rss_feed[str(episode.id)] = {}
-                    if rss_feed[str(episode.id)].get(episode.season, None) is None:
-                        rss_feed[str(episode.id)][episode.season] = {}
-                    if rss_feed[str(episode.id)][episode.season].get(episode.ep, None) is None:
-                        rss_feed[str(episode.id)][episode.season][episode.ep] = []
-                    rss_feed[str(episode.id)][episode.season][episode.ep].append({"torrent_title": entry.title,
-                                                                                  "link": entry.link,
-                                                                                  "seeders": seeders,
-                                                                                  "size": size})
-                except ValueError as e:
-                    log(str(e), warning=True)
+                entries.append((filename, {"torrent_title": entry.title,
+                                           "link": entry.link,
+                                           "seeders": entry["nyaa_seeders"],
+                                           "size": entry["nyaa_size"]}))
+        for (filename, torrent), episode in zip(entries, parse_many([name for name, torrent in entries], "anime")):
+            if episode is None:
+                log(f"{filename}, cannot determine the show", warning=True)
+                continue
+            if rss_feed.get(str(episode.id), None) is None:
+                rss_feed[str(episode.id)] = {}
+            if rss_feed[str(episode.id)].get(episode.season, None) is None:
+                rss_feed[str(episode.id)][episode.season] = {}
+            if rss_feed[str(episode.id)][episode.season].get(episode.ep, None) is None:
+                rss_feed[str(episode.id)][episode.season][episode.ep] = []
+            rss_feed[str(episode.id)][episode.season][episode.ep].append(torrent)
 
         return rss_feed
 
@@ -1391,7 +1506,6 @@ class NyaaConnector(ConnectorShowBase):
         for trusted in self.trusted_sources_rss_url:
             url = self.make_url(trusted, *self.words)
             feed = self.extract_feed_info(url)
-            time.sleep(1)
             if feed.get(str(self.id), None) is None:
                 continue
             if feed[str(self.id)].get(str(season_number).zfill(2), None) is None:
@@ -1417,22 +1531,38 @@ def choose_best_version(v_cur: Episode, v_new: SorterShows) -> SorterShows | Epi
         return v_new
 
 
+def media_aliases(id: str, entry: dict) -> set[str]:
+    """
+    Returns the normalized titles a library entry is known by: its library title and its tmdb_db titles.
+    """
+    titles = [entry.get("title", None), *Server.tmdb_id_index.get(int(id), [])]
+    return {normalize_title(title) for title in titles if title} - {""}
+
+
 class DataBase(Server):
-    try:
-        animes = json.load(open(os.path.join(VAR_DIR, ANIME_LIB), "r", encoding="utf-8"))
-    except IOError as e:
-        log(f"can't acces to {ANIME_LIB}", error=True)
-        quit()
-    try:
-        shows = json.load(open(os.path.join(VAR_DIR, SHOWS_LIB), "r", encoding="utf-8"))
-    except IOError as e:
-        log(f"can't acces to {SHOWS_LIB}", error=True)
-        quit()
-    try:
-        movies = json.load(open(os.path.join(VAR_DIR, MOVIES_LIB), "r", encoding="utf-8"))
-    except IOError as e:
-        log(f"can't acces to {MOVIES_LIB}", error=True)
-        quit()
+    # the libraries live in library.db, anime.json, shows.json and movie.json are only imported once and then
+    # kept as exports (see export_libraries)
+    store = LibraryStore(os.path.join(VAR_DIR, LIBRARY_DB))
+    library_files = {"anime": ANIME_LIB, "show": SHOWS_LIB, "movie": MOVIES_LIB}
+    for kind, lib in library_files.items():
+        if not store.is_imported(kind):
+            try:
+                store.import_library(kind, json.load(open(os.path.join(VAR_DIR, lib), "r", encoding="utf-8")))
+                log(f"{lib} imported in {LIBRARY_DB}")
+            except IOError as e:
+                log(f"can't acces to {lib}", error=True)
+                quit()
+    animes = store.load("anime")
+    shows = store.load("show")
+    movies = store.load("movie")
+    # kept in sync by add, add_ep_database, delete, delete_episode, delete_season and check_database
+    episode_index = EpisodeIndex()
+    missing_episodes = MissingEpisodes()
+    for kind, lib in [("anime", animes), ("show", shows), ("movie", movies)]:
+        for identifier in lib:
+            episode_index.add_media(kind, identifier, lib[identifier], media_aliases(identifier, lib[identifier]))
+            if kind != "movie":
+                missing_episodes.add_media(kind, identifier, lib[identifier])
 
     def __init__(self):
         super().__init__(enable=True)
@@ -1444,19 +1574,10 @@ class DataBase(Server):
         self.to_sort_show = Server.conf["sorter_show_dir"]
         self.to_sort_movie = Server.conf["sorter_movie_dir"]
         self.check_database()
-        self.cookies = None
-        self.user_agent = None
         self.ban_ids = open(BAN_ID_FILE, "r").read().split("\n")
     
-    def get_cookies_user_agent(self, url :str):
-        self.cookies, self.user_agent = flareSolverr_cookies_useragent(url=url)
-
     def getresponse(self, url :str):
-        response = requests.get(url, cookies=self.cookies, headers={"User-Agent": self.user_agent})
-        if response.status_code == 403:
-            self.get_cookies_user_agent(f"{urlparse(url).scheme}://{urlparse(url).netloc}/")
-            return requests.get(url, cookies=self.cookies, headers={"User-Agent": self.user_agent})
-        return response
+        return Server.http.get_protected(url)
 
 
     def check_database(self):
@@ -1469,8 +1590,12 @@ class DataBase(Server):
             if media in self.ban_ids:
                 Anime(DataBase.animes[media]["path"], DataBase.animes[media]["title"]).delete()
         if not compare_dictionaries(DataBase.animes, ls):
+            for media in [i for i in DataBase.animes if i not in ls]:
+                DataBase.store.delete_media("anime", media)
+                DataBase.episode_index.remove_media("anime", media, DataBase.animes[media])
+                DataBase.missing_episodes.remove_media("anime", media, DataBase.animes[media])
+                Server.forget_media(media)
             DataBase.animes = ls.copy()
-            json.dump(DataBase.animes, open(os.path.join(VAR_DIR, ANIME_LIB), "w", encoding="utf-8"), indent=5)
         ls.clear()
         ls = DataBase.shows.copy()
         for media in DataBase.shows:
@@ -1479,8 +1604,12 @@ class DataBase(Server):
             if media in self.ban_ids:
                 Anime(DataBase.shows[media]["path"], DataBase.shows[media]["title"]).delete()
         if not compare_dictionaries(DataBase.shows, ls):
+            for media in [i for i in DataBase.shows if i not in ls]:
+                DataBase.store.delete_media("show", media)
+                DataBase.episode_index.remove_media("show", media, DataBase.shows[media])
+                DataBase.missing_episodes.remove_media("show", media, DataBase.shows[media])
+                Server.forget_media(media)
             DataBase.shows = ls.copy()
-            json.dump(DataBase.shows, open(os.path.join(VAR_DIR, SHOWS_LIB), "w", encoding="utf-8"), indent=5)
         ls.clear()
         ls = DataBase.movies.copy()
         for media in DataBase.movies:
@@ -1489,9 +1618,16 @@ class DataBase(Server):
             if media in self.ban_ids:
                 Anime(DataBase.movies[media]["path"], DataBase.movies[media]["title"]).delete()
         if not compare_dictionaries(DataBase.movies, ls):
+            for media in [i for i in DataBase.movies if i not in ls]:
+                DataBase.store.delete_media("movie", media)
+                DataBase.episode_index.remove_media("movie", media, DataBase.movies[media])
+                Server.forget_media(media)
             DataBase.movies = ls.copy()
-            json.dump(DataBase.movies, open(os.path.join(VAR_DIR, MOVIES_LIB), "w", encoding="utf-8"), indent=5)
 
+    def export_libraries(self):
+        """Writes the libraries back to anime.json, shows.json and movie.json for the tools reading the JSON files."""
+        for kind, lib in DataBase.library_files.items():
+            atomic_json_dump(DataBase.store.load(kind), os.path.join(VAR_DIR, lib))
 
     def var(self, anime=False, shows=False, movie=False) -> tuple[
         dict | None, Anime | Show | Movie | None, list | None, str | None]:
@@ -1537,37 +1673,30 @@ class DataBase(Server):
 
         if not isinstance(title, str):
             raise ValueError(f"title should be a string, not {type(title)}")
-        serv = Server()
-        tmdb_title = serv.find_tmdb_title(title, anime, shows, movie)
-
-        if not tmdb_title:
-            return False
-        info = serv.get_tmdb_info(tmdb_title, anime=anime, show=shows, movie=movie)
-        if info is None:
-            return False
-
-        identifier = str(info["id"])
-
         if anime:
-            if DataBase.animes.get(identifier, None) is None:
-                return False
-            else:
-                path = DataBase.animes[identifier]["path"]
-                return Anime(path, tmdb_title)
+            dic, kind = DataBase.animes, "anime"
         elif shows:
-            if DataBase.shows.get(identifier, None) is None:
-                return False
-            else:
-                path = DataBase.shows[identifier]["path"]
-                return Show(path, tmdb_title)
+            dic, kind = DataBase.shows, "show"
         elif movie:
-            if DataBase.movies.get(identifier, None) is None:
-                return False
-            else:
-                path = DataBase.movies[identifier]["path"]
-                return Movie(path, tmdb_title)
+            dic, kind = DataBase.movies, "movie"
         else:
             raise ValueError("You should choose between anime, show, or movie")
+        # a title already resolved to a media of the library is not matched again
+        alias = normalize_title(title)
+        identifier = DataBase.episode_index.find_id(kind, alias)
+        if identifier is not None and dic.get(identifier, None) is not None:
+            tmdb_title = Server.get_tmdb_title_by_id(int(identifier))
+            if tmdb_title is not None:
+                return get_media(tmdb_title, kind)
+        tmdb_title = Server().find_tmdb_title(title, anime, shows, movie)
+        if not tmdb_title:
+            return False
+        media = get_media(tmdb_title, kind)
+        if dic.get(str(media.id), None) is None:
+            return False
+        if alias != "":
+            DataBase.episode_index.add_title(kind, str(media.id), alias)
+        return media
 
     def get_dir_freer(self, anime=False, shows=False, movie=False) -> str:
         """return the direcotires with the more free space
@@ -1583,13 +1712,13 @@ class DataBase(Server):
             raise ValueError(f"Can't find the show corresponding to {title}")
         if anime:
             title_info = "name"
-            dic, file = deepcopy(DataBase.animes), ANIME_LIB
+            dic, kind = DataBase.animes, "anime"
         elif shows:
             title_info = "name"
-            dic, file = deepcopy(DataBase.shows), SHOWS_LIB
+            dic, kind = DataBase.shows, "show"
         elif movie:
             title_info = "title"
-            dic, file = deepcopy(DataBase.movies), MOVIES_LIB
+            dic, kind = DataBase.movies, "movie"
         else:
             raise ValueError("You have to choose between anime|shows|movie")
         info = super().get_tmdb_info(tmdb_title, show=shows, anime=anime, movie=movie)
@@ -1620,27 +1749,21 @@ class DataBase(Server):
         if dic.get(identifier, None) is not None:
             return True
         else:
-            dic[identifier] = {
+            entry = {
                 "title": info[title_info],
                 "path": path,
                 "seasons": season_dict
             }
             if season_dict == {}:
-                dic[identifier].pop("seasons")
-                dic[identifier]["file_info"] = {}
-            if anime:
-                DataBase.animes = deepcopy(dic)
-            elif shows:
-                DataBase.shows = deepcopy(dic)
-            elif movie:
-                DataBase.movies = deepcopy(dic)
-            json.dump(dic, open(os.path.join(VAR_DIR, file), "w", encoding="utf-8"), indent=5)
-            if anime:
-                DataBase.animes = dic
-            elif shows:
-                DataBase.shows = dic
-            elif movie:
-                DataBase.movies = dic
+                entry.pop("seasons")
+                entry["file_info"] = {}
+            # the library is only touched once the store transaction succeeded, a failing write leaves both unchanged
+            DataBase.store.put_media(kind, identifier, entry)
+            dic[identifier] = entry
+            DataBase.episode_index.add_media(kind, identifier, entry, media_aliases(identifier, entry))
+            if kind != "movie":
+                DataBase.missing_episodes.add_media(kind, identifier, entry)
+            Server.forget_media(identifier)
             return True
 
     def add_file(file: SorterShows | SorterMovie, anime=False, shows=False, movie=False) -> bool:
@@ -1666,9 +1789,9 @@ class DataBase(Server):
                     
                 return True
             elif choose_best_version(ep, file) == file:
-                save_path = DataBase.add_ep_database(file)
                 delete_path = DataBase.delete_episode(file.id, int(file.season), int(file.ep), show=file.show.is_show,
                                                       anime=(not file.show.is_show))
+                save_path = DataBase.add_ep_database(file)
                 if delete_path is not False and os.path.isfile(delete_path):
                     os.remove(delete_path)
                 safe_move(file.path, save_path)
@@ -1727,7 +1850,7 @@ class DataBase(Server):
                 raise Exception(
                     f"Database error: no current_episode associated with the show {id} season {season}, please check JSON")
 
-            DataBase.shows[id]["seasons"][season]["current_episode"][ep] = {
+            episode = {
                 "renamed": file.__str__(),
                 "path": path,
                 "language": file.lang,
@@ -1736,8 +1859,10 @@ class DataBase(Server):
                 "height": file.resolution,
                 "codec": file.codec,
             }
-
-            json.dump(DataBase.shows, open(os.path.join(VAR_DIR, SHOWS_LIB), "w", encoding="utf-8"), indent=5)
+            DataBase.store.put_episode("show", id, season, ep, episode)
+            DataBase.shows[id]["seasons"][season]["current_episode"][ep] = episode
+            DataBase.episode_index.add_episode("show", id, season, ep)
+            DataBase.missing_episodes.add_episode("show", id, season, ep)
 
             return path
 
@@ -1757,7 +1882,7 @@ class DataBase(Server):
                 raise Exception(
                     f"Database error: no current_episode associated with the anime {id} season {season}, please check JSON")
 
-            DataBase.animes[id]["seasons"][season]["current_episode"][ep] = {
+            episode = {
                 "original_filename": file.file_name,
                 "renamed": file.__str__(),
                 "path": path,
@@ -1767,8 +1892,10 @@ class DataBase(Server):
                 "height": file.resolution,
                 "codec": file.codec,
             }
-
-            json.dump(DataBase.animes, open(os.path.join(VAR_DIR, ANIME_LIB), "w", encoding="utf-8"), indent=5)
+            DataBase.store.put_episode("anime", id, season, ep, episode)
+            DataBase.animes[id]["seasons"][season]["current_episode"][ep] = episode
+            DataBase.episode_index.add_episode("anime", id, season, ep)
+            DataBase.missing_episodes.add_episode("anime", id, season, ep)
 
             return path
 
@@ -1795,8 +1922,7 @@ class DataBase(Server):
             "height": file.resolution,
             "codec": file.codec,
         }
-
-        json.dump(DataBase.movies, open(os.path.join(VAR_DIR, MOVIES_LIB), "w", encoding="utf-8"), indent=5)
+        DataBase.store.put_media("movie", id, DataBase.movies[id])
 
         return path
 
@@ -1879,22 +2005,30 @@ class DataBase(Server):
         if anime:
             if DataBase.animes.get(id) is None:
                 return False
+            DataBase.store.delete_media("anime", id)
+            DataBase.episode_index.remove_media("anime", id, DataBase.animes[id])
+            DataBase.missing_episodes.remove_media("anime", id, DataBase.animes[id])
             DataBase.animes.pop(id)
-            json.dump(DataBase.animes, open(os.path.join(VAR_DIR, ANIME_LIB), "w", encoding="utf-8"), indent=5)
+            Server.forget_media(id)
             return True
 
         if shows:
             if DataBase.shows.get(id) is None:
                 return False
+            DataBase.store.delete_media("show", id)
+            DataBase.episode_index.remove_media("show", id, DataBase.shows[id])
+            DataBase.missing_episodes.remove_media("show", id, DataBase.shows[id])
             DataBase.shows.pop(id)
-            json.dump(DataBase.shows, open(os.path.join(VAR_DIR, SHOWS_LIB), "w", encoding="utf-8"), indent=5)
+            Server.forget_media(id)
             return True
 
         if movie:
             if DataBase.movies.get(id) is None:
                 return False
+            DataBase.store.delete_media("movie", id)
+            DataBase.episode_index.remove_media("movie", id, DataBase.movies[id])
             DataBase.movies.pop(id)
-            json.dump(DataBase.movies, open(os.path.join(VAR_DIR, MOVIES_LIB), "w", encoding="utf-8"), indent=5)
+            Server.forget_media(id)
             return True
 
     def delete_episode(id: int, season_number: int, episode_number: int, show: bool = False, anime: bool = False) -> \
@@ -1925,27 +2059,25 @@ class DataBase(Server):
         if not isinstance(id, int):
             raise TypeError("ID should be of type int")
 
-        id, dic, file = str(id), None, None
+        id, dic, kind = str(id), None, None
         season_number = str(season_number).zfill(2)
         episode_number = str(episode_number).zfill(2)
 
         if anime:
-            dic, file = deepcopy(DataBase.animes), ANIME_LIB
+            dic, kind = DataBase.animes, "anime"
         elif show:
-            dic, file = deepcopy(DataBase.shows), SHOWS_LIB
+            dic, kind = DataBase.shows, "show"
         if dic.get(id) is None:
             return False
-        elif dic[id].get(season_number) is None:
+        elif dic[id].get("seasons", {}).get(season_number) is None:
             return False
-        elif dic[id][season_number].get(episode_number) is None:
+        elif dic[id]["seasons"][season_number]["current_episode"].get(episode_number) is None:
             return False
-        path = dic[id][season_number][episode_number]["path"]
-        dic[id][season_number].pop(episode_number)
-        json.dump(dic, open(os.path.join(VAR_DIR, file), "w", encoding="utf-8"), indent=5)
-        if anime:
-            DataBase.animes = deepcopy(dic)
-        elif show:
-            DataBase.shows = deepcopy(dic)
+        path = dic[id]["seasons"][season_number]["current_episode"][episode_number]["path"]
+        DataBase.store.delete_episode(kind, id, season_number, episode_number)
+        dic[id]["seasons"][season_number]["current_episode"].pop(episode_number)
+        DataBase.episode_index.remove_episode(kind, id, season_number, episode_number)
+        DataBase.missing_episodes.remove_episode(kind, id, season_number, episode_number)
         return path
 
     def delete_season(id: int, season_number: int, show: bool = False, anime: bool = False):
@@ -1978,45 +2110,85 @@ class DataBase(Server):
         if anime:
             if DataBase.animes.get(id) is None:
                 return False
-            elif DataBase.animes[id].get(season_number) is None:
+            elif DataBase.animes[id].get("seasons", {}).get(season_number) is None:
                 return False
-            DataBase.animes[id].pop(season_number)
-            json.dump(DataBase.animes, open(os.path.join(VAR_DIR, ANIME_LIB), "w", encoding="utf-8"), indent=5)
+            DataBase.store.delete_season("anime", id, season_number)
+            DataBase.episode_index.remove_season("anime", id, season_number, DataBase.animes[id])
+            DataBase.missing_episodes.remove_season("anime", id, season_number)
+            DataBase.animes[id]["seasons"].pop(season_number)
             return True
 
         if show:
             if DataBase.shows.get(id) is None:
                 return False
-            elif DataBase.shows[id].get(season_number) is None:
+            elif DataBase.shows[id].get("seasons", {}).get(season_number) is None:
                 return False
-            DataBase.shows[id].pop(season_number)
-            json.dump(DataBase.shows, open(os.path.join(VAR_DIR, SHOWS_LIB), "w", encoding="utf-8"), indent=5)
+            DataBase.store.delete_season("show", id, season_number)
+            DataBase.episode_index.remove_season("show", id, season_number, DataBase.shows[id])
+            DataBase.missing_episodes.remove_season("show", id, season_number)
+            DataBase.shows[id]["seasons"].pop(season_number)
             return True
 
-    def list_missing_episodes(self):
-        missing, temp = {"anime": {}, "show": {}}, {}
-        for name, lib in [("anime", self.animes), ("show", self.shows)]:
-            for shows in lib:
-                for seasons in lib[shows]["seasons"]:
-                    for i in range(1, lib[shows]["seasons"][seasons]["season_info"]["episode_count"] + 1):
-                        if lib[shows]["seasons"][seasons]["current_episode"].get(str(i).zfill(2), None) is None:
-                            if temp.get(shows, None) is None:
-                                temp[shows] = {}
-                            if temp[shows].get(seasons, None) is None:
-                                temp[shows][seasons] = []
-                            temp[shows][seasons].append(str(i).zfill(2))
-                    try:
-                        if len(temp[shows][seasons]) == 1:
-                            if temp[shows][seasons][0] == "00":
-                                temp[shows][seasons] = []
-                    except KeyError:
-                        pass
-            missing[name] = deepcopy(temp)
-            temp.clear()
-        return missing
+    def list_missing_episodes(self) -> dict:
+        """
+        Returns the missing episodes of the libraries, {"anime": {id: {season: [episodes]}}, "show": {...}}.
+
+        They are read from `DataBase.missing_episodes`, kept up to date as episodes are added and deleted and as
+        update_tmdb changes the episode_count of the seasons, so nothing is recomputed.
+        """
+        return DataBase.missing_episodes.missing()
+
+    def update_season_info(id: int, info: dict):
+        """
+        Copies the refreshed TMDB seasons of an id to its library seasons whose episode_count changed, and updates
+        their missing episodes.
+        """
+        seasons = {str(season["season_number"]).zfill(2): season for season in info.get("seasons", [])}
+        for kind, dic in [("anime", DataBase.animes), ("show", DataBase.shows)]:
+            entry = dic.get(str(id), None)
+            if entry is None:
+                continue
+            for season, season_entry in entry.get("seasons", {}).items():
+                if season not in seasons:
+                    continue
+                if seasons[season].get("episode_count") == season_entry["season_info"].get("episode_count"):
+                    continue
+                DataBase.store.put_season_info(kind, str(id), season, seasons[season])
+                season_entry["season_info"] = seasons[season]
+                DataBase.missing_episodes.set_season(kind, str(id), season, season_entry)
+
+    def build_connectors(self, id: int) -> list:
+        """
+        Builds the active connectors of a show, once for all the episodes searched for it.
+        """
+        connectors = []
+        for connector in ConnectorShowBase.__subclasses__():
+            con = ConnectorShowBase.get_connector(connector, id)
+            if not isinstance(con, ConnectorShowBase):
+                raise Exception(f"Malformed connector {connector}")
+            if con.active:
+                connectors.append(con)
+        return connectors
+
+    def search_connectors(self, connectors: list, search, executor: ThreadPoolExecutor | None = None) -> dict | None:
+        """
+        Returns the first result of `search(connector)` that is not None, in the order of `connectors`.
+
+        With an executor the connectors are searched concurrently, each one behind its own rate limiter, and all
+        of them are waited for so a connector never runs two searches at once.
+        """
+        if executor is None:
+            for con in connectors:
+                result = search(con)
+                if result is not None:
+                    return result
+            return None
+        results = [future.result() for future in [executor.submit(search, con) for con in connectors]]
+        return next((result for result in results if result is not None), None)
 
     def search_episode_source(self, anime_id: int, season_number: int, episode_number: int, anime=False,
-                              show=False) -> dict | None:
+                              show=False, connectors: list | None = None,
+                              executor: ThreadPoolExecutor | None = None) -> dict | None:
         if not (anime or show):
             raise ValueError("You should choose anime or show in function parameter")
         show_info = self.get_tmdb_info_by_id(anime_id, anime=anime, show=show, movie=False)
@@ -2033,18 +2205,14 @@ class DataBase(Server):
         else:
             return Server.feed_storage.get(str(anime_id)).get(str(season_number).zfill(2)).get(
                 str(episode_number).zfill(2))
-        for connector in ConnectorShowBase.__subclasses__():
-            con = connector(anime_id)
-            if not isinstance(con, ConnectorShowBase):
-                raise Exception(f"Malformed connector {connector}")
-            else:
-                if con.active:
-                    result = con.find_ep(season_number, episode_number, anime, show)
-                    if result is not None:
-                        return result
-        return None
-
-    def search_season_source(self, show_id: int, season_number: int, anime=False, show=False) -> dict | None:
+        if connectors is None:
+            connectors = self.build_connectors(anime_id)
+        return self.search_connectors(connectors, lambda con: con.find_ep(season_number, episode_number, anime, show),
+                                      executor)
+
+    def search_season_source(self, show_id: int, season_number: int, anime=False, show=False,
+                             connectors: list | None = None,
+                             executor: ThreadPoolExecutor | None = None) -> dict | None:
         if not (anime or show):
             raise ValueError("You should choose anime or show in function parameter")
         anime = self.get_tmdb_info_by_id(show_id, anime=anime, show=(not anime), movie=False)
@@ -2054,16 +2222,10 @@ class DataBase(Server):
             raise ValueError(f"The season {season_number} does not exist for show {show_id}")
         else:
             season = season[0]
-        for connector in ConnectorShowBase.__subclasses__():
-            con = connector(show_id)
-            if not isinstance(con, ConnectorShowBase):
-                raise Exception(f"Malformed connector {connector}")
-            else:
-                if con.active and hasattr(connector, "find_batch"):
-                    result = con.find_batch(season_number, anime, show)
-                    if result is not None:
-                        return result
-        return None
+        if connectors is None:
+            connectors = self.build_connectors(show_id)
+        return self.search_connectors([con for con in connectors if hasattr(con, "find_batch")],
+                                      lambda con: con.find_batch(season_number, anime, show), executor)
 
     def dl_torrent(self, url: str, name: str, show=False, anime=False, movie=False):
         target_directory = None
@@ -2082,50 +2244,109 @@ class DataBase(Server):
         with open(os.path.join(target_directory, forbidden_car(name)), "wb") as f:
             f.write(torrent_content)
 
-    def get_episode(self, list_ep: list, season: int, identifier: int, anime=False, show=False) -> bool:
+    def get_episode(self, list_ep: list, season: int, identifier: int, anime=False, show=False,
+                    connectors: list | None = None, executor: ThreadPoolExecutor | None = None,
+                    stages: dict | None = None, counts: dict | None = None) -> bool:
+        """
+        Searches and downloads the episodes of `list_ep`, on `connectors` (built for the show if None).
+
+        The seconds spent searching and downloading are added to `stages` and the episodes searched and found to
+        `counts`, see fetch_missing_ep.
+        """
         if not (show or anime):
             raise ValueError("You should choose between show and anime in function parameter")
+        stages = defaultdict(float) if stages is None else stages
+        counts = defaultdict(int) if counts is None else counts
         find = False
+        if connectors is None:
+            connectors = self.build_connectors(int(identifier))
         for ep in list_ep:
-            episode = self.search_episode_source(int(identifier), int(season), int(ep), anime=anime, show=show)
+            st = time.perf_counter()
+            episode = self.search_episode_source(int(identifier), int(season), int(ep), anime=anime, show=show,
+                                                 connectors=connectors, executor=executor)
+            stages["episode"] += time.perf_counter() - st
+            counts["episode_searched"] += 1
             if episode is None:
                 continue
             find = True
+            st = time.perf_counter()
             self.dl_torrent(episode["link"], episode["torrent_title"], anime=anime, show=show, movie=False)
+            stages["download"] += time.perf_counter() - st
+            counts["episode_found"] += 1
         return find
 
-    def get_batch(self, season: int, identifier: int, anime=False, show=False) -> bool:
+    def get_batch(self, season: int, identifier: int, anime=False, show=False, connectors: list | None = None,
+                  executor: ThreadPoolExecutor | None = None, stages: dict | None = None,
+                  counts: dict | None = None) -> bool:
+        """
+        Searches and downloads the batch of a season, like get_episode.
+        """
         if not (show or anime):
             raise ValueError("You should choose between show and anime in function parameter")
+        stages = defaultdict(float) if stages is None else stages
+        counts = defaultdict(int) if counts is None else counts
         find = False
-        batch = self.search_season_source(int(identifier), int(season), anime=anime, show=show)
+        st = time.perf_counter()
+        batch = self.search_season_source(int(identifier), int(season), anime=anime, show=show,
+                                          connectors=connectors, executor=executor)
+        stages["batch"] += time.perf_counter() - st
+        counts["batch_searched"] += 1
         if batch is not None:
             find = True
+            st = time.perf_counter()
             self.dl_torrent(batch["link"], batch["torrent_title"], anime=anime, show=show, movie=False)
+            stages["download"] += time.perf_counter() - st
+            counts["batch_found"] += 1
 
         return find
 
-    def fetch_missing_ep(self):
+    def fetch_missing_ep(self) -> dict:
+        """
+        Searches and downloads the missing episodes of the libraries, show by show.
+
+        The connectors of a show are built once for all its missing episodes, and every batch or episode is searched
+        on all the connectors concurrently, each connector waiting for its own rate limiter.
+
+        Returns:
+            dict: The number of seasons and episodes searched and found, and the seconds spent building the
+            connectors, searching batches, searching episodes and downloading torrents.
+        """
+        stages = {"connectors": 0.0, "batch": 0.0, "episode": 0.0, "download": 0.0}
+        counts = {"batch_searched": 0, "batch_found": 0, "episode_searched": 0, "episode_found": 0}
         list_missing = self.list_missing_episodes()
-        for target in list_missing:
-            anime = target == "anime"
-            show_status = not anime
-            for show in list_missing[target]:
-                info = self.get_tmdb_info_by_id(int(show), anime=anime, show=show_status)
-                if info is None:
-                    continue
-                for season in list_missing[target][show]:
-                    if info["last_episode_to_air"] is not None:
-                        if info["last_episode_to_air"]["season_number"] != int(season) or info["last_episode_to_air"][
-                            "episode_number"] == info["seasons"][int(season) - 1]["episode_count"]:
-                            log(f"searching batch season {season} for {info['name']}")
-                            if self.get_batch(int(season), int(show), anime=anime, show=show):
-                                log(f"Found batch for Season {season} of {info['name']}")
-                                continue
-                    log(f"searching batch ep  {season} for {info['name']}")
-                    if self.get_episode(list_missing[target][show][season], int(season), int(show), anime=anime,
-                                        show=show_status):
-                        log(f"episodes found for {info['name']} season {season}")
+        with ThreadPoolExecutor(max_workers=max(1, len(ConnectorShowBase.__subclasses__()))) as executor:
+            for target in list_missing:
+                anime = target == "anime"
+                show_status = not anime
+                for show in list_missing[target]:
+                    info = self.get_tmdb_info_by_id(int(show), anime=anime, show=show_status)
+                    if info is None:
+                        continue
+                    st = time.perf_counter()
+                    connectors = self.build_connectors(int(show))
+                    stages["connectors"] += time.perf_counter() - st
+                    for season in list_missing[target][show]:
+                        if info["last_episode_to_air"] is not None:
+                            if info["last_episode_to_air"]["season_number"] != int(season) or \
+                                    info["last_episode_to_air"]["episode_number"] == \
+                                    info["seasons"][int(season) - 1]["episode_count"]:
+                                log(f"searching batch season {season} for {info['name']}")
+                                if self.get_batch(int(season), int(show), anime=anime, show=show_status,
+                                                  connectors=connectors, executor=executor, stages=stages,
+                                                  counts=counts):
+                                    log(f"Found batch for Season {season} of {info['name']}")
+                                    continue
+                        log(f"searching batch ep  {season} for {info['name']}")
+                        if self.get_episode(list_missing[target][show][season], int(season), int(show), anime=anime,
+                                            show=show_status, connectors=connectors, executor=executor,
+                                            stages=stages, counts=counts):
+                            log(f"episodes found for {info['name']} season {season}")
+        ConnectorShowBase.nfo_key_cache.flush()
+        connector_stats = ConnectorShowBase.stats()
+        log(f"missing episodes fetched: {counts}, seconds per stage {({k: round(v, 2) for k, v in stages.items()})}, "
+            f"seconds waited per connector {connector_stats['waited']}, NFO keys {connector_stats['nfo_keys']}, "
+            f"HTTP {connector_stats['http']}")
+        return {**counts, "stages": stages, **connector_stats}
 
     def fetch_requested_shows(self, show=False, anime=False):
         if not (show or anime):
@@ -2181,7 +2402,7 @@ class DataBase(Server):
             list_file = []
             for directory in directory:
                 list_file += list_all_files(directory)
-        for file in list_file:
+        for file in prefetch_video_specs(list_file):
             if os.path.isfile(file) and is_video(file):
                 try:
                     s = sorter(file, **arg)
@@ -2207,20 +2428,13 @@ class DataBase(Server):
                     if os.listdir(directory):
                         self.sort(anime=anime, shows=show, movie=movie)
 
-    def have_ep(self, file: SorterShows, anime=False, shows=False, movie=False) -> bool:
-        elt = DataBase.find(file.title, anime, shows, movie)
-        if elt == False:
+    def have_ep(self, file: SorterShows | EpisodeRef, anime=False, shows=False, movie=False) -> bool:
+        if not (anime or shows or movie):
+            raise ValueError("You should choose between anime, show, or movie")
+        if movie:
             return False
-        elif not movie:
-            if elt.seasons_created.get(file.season, None) is None:
-                return False
-            else:
-                ep = elt.seasons_created[file.season]["current_episode"].get(file.ep, None)
-            if ep is None:
-                return False
-            else:
-                return True
-        return False
+        # the file is already resolved to its TMDB id, the same one DataBase.find gives for its title
+        return DataBase.episode_index.has_episode("anime" if anime else "show", str(file.id), file.season, file.ep)
     
     def move_media(self, id : int, path: str, anime=False, show=False, movie=False) -> bool:
         if not os.path.isdir(path):
@@ -2246,15 +2460,16 @@ class DataBase(Server):
                 for episodes in media_info["seasons"][season]["current_episode"]:
                     media_info["seasons"][season]["current_episode"][episodes]["path"] = str(media_info["seasons"][season]["current_episode"][episodes]["path"]).replace(original_path, media_info["path"])
         if os.path.isdir(os.path.join(path, os.path.basename(original_path))):
+            Server.forget_media(id)
             if anime:
+                DataBase.store.put_media("anime", str(id), media_info)
                 self.animes[str(id)] = media_info
-                json.dump(DataBase.animes, open(os.path.join(VAR_DIR, ANIME_LIB), "w", encoding="utf-8"), indent=5)
             elif movie:
+                DataBase.store.put_media("movie", str(id), media_info)
                 self.movies[str(id)] = media_info
-                json.dump(DataBase.movies, open(os.path.join(VAR_DIR, MOVIES_LIB), "w", encoding="utf-8"), indent=5)
             elif show:
+                DataBase.store.put_media("show", str(id), media_info)
                 self.shows[str(id)] = media_info
-                json.dump(DataBase.shows, open(os.path.join(VAR_DIR, SHOWS_LIB), "w", encoding="utf-8"), indent=5)
             return True
         else:
             return False 
@@ -2330,18 +2545,46 @@ class DataBase(Server):
         self.adjust_directories(dic_media_size, movie=True)
 
                 
-    def update_tmdb(self):
-        ids_to_update = [[self.tmdb_db[i]["id"], i] for i in self.tmdb_db]
-        for id in ids_to_update:
-            is_movie = False
-            is_anime = [] != [i for i in self.tmdb_db[id[1]]["genres"] if i["name"] == "Animation" and self.tmdb_db[id[1]].get("seasons", None) is not None]
-            if not is_anime:
-                is_movie = self.tmdb_db[id[1]].get("seasons", None) is None
-            self.store_tmdb_info(id[0], show=(not is_anime), anime=is_anime, movie=is_movie)
-            log(f"{id} updated in tmdb_db")
-            
+    def update_tmdb(self, force: bool = False) -> dict:
+        """
+        Refreshes the stale tmdb_db entries, or all of them if `force` (see TmdbRefresher.is_stale).
+
+        Each TMDB id is fetched once even if it is stored under several titles, the fetches run concurrently under
+        the TMDB rate limit and tmdb_db.json is written once per batch.
+
+        Returns:
+            dict: The number of ids refreshed and failed, and of entries still fresh.
+        """
+        ids, fresh = {}, 0
+        with Server.tmdb_lock:
+            entries = list(self.tmdb_db.values())
+        for entry in entries:
+            if force or Server.tmdb_refresher.is_stale(entry):
+                ids.setdefault(entry["id"], tmdb_media_type(entry))
+            else:
+                fresh += 1
+        refreshed, failed = 0, 0
+        for batch in Server.tmdb_refresher.refresh(list(ids.items())):
+            with Server.tmdb_lock:
+                for id, kind, info in batch:
+                    if isinstance(info, Exception):
+                        log(f"{id} could not be updated in tmdb_db: {info}", warning=True)
+                        failed += 1
+                        continue
+                    # the other titles of the id are refreshed too, not only the one named after the TMDB title
+                    for title in list(Server.tmdb_id_index.get(id, [])):
+                        self.update_tmdb_db(title, info, save=False)
+                    self.update_tmdb_db(info["title" if kind == "movie" else "name"], info, save=False)
+                    if kind != "movie":
+                        DataBase.update_season_info(id, info)
+                    refreshed += 1
+                atomic_json_dump(Server.tmdb_db, os.path.join(VAR_DIR, TMDB_DB))
+        log(f"tmdb_db updated: {refreshed} refreshed, {failed} failed, {fresh} fresh")
+        return {"refreshed": refreshed, "failed": failed, "fresh": fresh}
+
     def save_tmdb_title(self):
-        json.dump(Server.tmdb_title, open(os.path.join(VAR_DIR, TMDB_TITLE), "w", encoding="utf-8"), indent=5)
+        with Server.tmdb_lock:
+            json.dump(Server.tmdb_title, open(os.path.join(VAR_DIR, TMDB_TITLE), "w", encoding="utf-8"), indent=5)
 
 
 if __name__ == "__main__":
@@ -72,61 +72,54 @@ class Feed(DataBase):
                 r.clear()
                 feed = feedparser.parse(feeds)
                 dic = self.get_ep_with_link(feed, feed_link)
-                for ep in dic:
-                    title = ep
-                    link = dic[ep]["link"]
-                    seeders = dic[ep]["seeders"]
-                    if os.path.splitext(title)[1] == '':
-                        ep += ".mkv"
-                    if not "movie" in feed_list:
-                        try:
-                            if "anime" in feed_list:
-                                ep = SorterShows(ep, file_reachable=False, is_anime=True)
-                            elif "show" in feed_list:
-                                ep = SorterShows(ep, file_reachable=False)
-                            if Server.feed_storage.get(str(ep.id), None) is None:
-                                Server.feed_storage[str(ep.id)] = {}
-                            if Server.feed_storage[str(ep.id)].get(ep.season, None) is None:
-                                Server.feed_storage[str(ep.id)][ep.season] = {}
-                            Server.feed_storage[str(ep.id)][ep.season][ep.ep] = {
-                                "torrent_title": title,
-                                "link": link,
-                                "origin_feed": feed_link,
-                                "seeders": seeders,
-                                "id": ep.id
-                            }
-                        except AttributeError as e:
-                            log(f"can't determine the show {ep}", error=True)
-                            continue
-                        except ValueError as e:
-                            log(str(e), warning=True)
-                            continue
-                        if "anime" in feed_list:
+                if "anime" in feed_list:
+                    kind = "anime"
+                elif "show" in feed_list:
+                    kind = "show"
+                else:
+                    kind = "movie"
+                names = [ep + ".mkv" if os.path.splitext(ep)[1] == '' else ep for ep in dic]
+                # one TMDB resolution per show of the feed instead of one per entry
+                for title, ep in zip(list(dic), parse_many(names, kind)):
+                    link = dic[title]["link"]
+                    seeders = dic[title]["seeders"]
+                    if ep is None:
+                        log(f"{title}, cannot determine the {kind}", warning=True)
+                        continue
+                    if kind != "movie":
+                        if Server.feed_storage.get(str(ep.id), None) is None:
+                            Server.feed_storage[str(ep.id)] = {}
+                        if Server.feed_storage[str(ep.id)].get(ep.season, None) is None:
+                            Server.feed_storage[str(ep.id)][ep.season] = {}
+                        Server.feed_storage[str(ep.id)][ep.season][ep.ep] = {
+                            "torrent_title": title,
+                            "link": link,
+                            "origin_feed": feed_link,
+                            "seeders": seeders,
+                            "id": ep.id
+                        }
+                        if kind == "anime":
                             if not self.have_ep(ep, anime=True):
                                 try:
                                     r[f"{ep.title} - S{ep.season}E{ep.ep} {ep.ext}"] = link
                                 except (AttributeError, requests.exceptions.ReadTimeout) as e:
                                     log(f"{e} ---> {ep} for anime in sort_feed method", debug=True)
-                        elif "show" in feed_list:
+                        else:
                             if not self.have_ep(ep, shows=True):
                                 try:
                                     r[f"{ep.title} - S{ep.season}E{ep.ep} {ep.ext}"] = link
                                 except (AttributeError, requests.exceptions.ReadTimeout) as e:
                                     log(f"{e} ---> {ep} for show in sort_feed method", debug=True)
-                
+
                     else:
-                        try:
-                            mv = SorterMovie(ep, file_reachable=False)
-                        except (AttributeError, requests.exceptions.ReadTimeout) as e:
-                                    log(f"{e} ---> {ep} for show in sort_feed method", debug=True)
-                        Server.feed_storage[str(mv.id)] = {
+                        Server.feed_storage[str(ep.id)] = {
                             "torrent_title": title,
                             "link": link,
                             "origin_feed": feed_link,
-                            "id" : mv.id
+                            "id" : ep.id
                         }
                         if not self.have_ep(ep, movie=True):
-                            r[f"{mv.title} - {mv.ext}"] = link
+                            r[f"{ep.title} - {ep.ext}"] = link
                 ls.append(r)
             dic.clear()
             self.feed_dict[feed_list] = ls
@@ -148,9 +141,13 @@ class Feed(DataBase):
                 else:
                     raise ValueError
                 os.makedirs(torrent_dir, exist_ok=True)
+                episodes = dict(zip(feed, parse_many(list(feed), "anime" if anime else "show")))
                 for key in feed:
                     file_name = forbidden_car(f"{key}.torrent")
-                    if file_name not in os.listdir(torrent_dir) and feed[key]["id"] not in self.ban_ids and not self.have_ep(SorterShows(key, file_reachable=False, is_anime=anime), anime=anime, shows=show, movie=movie):
+                    if episodes[key] is None:
+                        log(f"{key}, cannot determine the show", warning=True)
+                        continue
+                    if file_name not in os.listdir(torrent_dir) and feed[key]["id"] not in self.ban_ids and not self.have_ep(episodes[key], anime=anime, shows=show, movie=movie):
                         try:
                             d.dl_torrent(feed[key], file_name,show=show, anime=anime, movie=movie)
                             log(f"Downloaded {file_name} to torrent directory {torrent_dir}")
@@ -160,8 +157,13 @@ class Feed(DataBase):
                         time.sleep(1)  # avoid ban ip
 
     def run(self):
+        Server.title_cache.purge_expired()
         self.sort_feed()
+        stats = Server.title_cache.stats()
+        log(f"Feeds sorted (title cache: {stats['hits']} hits, {stats['misses']} misses, "
+            f"{stats['size']} entries)")
         self.dl_torrent()
+        ConnectorShowBase.nfo_key_cache.flush()
 
 if __name__ == '__main__':
     d = Feed()
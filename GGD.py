@@ -3,74 +3,237 @@ from Database import *
 
 class Gg_drive():
     dict_ep = json.load(open(os.path.join(VAR_DIR, GGD_LIB), "r", encoding="utf-8"))
+    index = json.load(open(os.path.join(VAR_DIR, GGD_INDEX), "r", encoding="utf-8"))
 
     def __init__(self):
         self.d_dirs = Server.conf["GGD_dir"]
+        self.checkpoint_files = int(Server.conf.get("ggd_checkpoint_files", 200))
+        self.checkpoint_seconds = int(Server.conf.get("ggd_checkpoint_seconds", 60))
 
-    def update_dict_ep(self):
-        # add list all file and update Server.TASK_GGD_SCAN so we can track evolution
-        Server.TASK_GGD_SCAN = 0
-        list_files = []
-        if type(self.d_dirs) == str:
-            list_files = list_all_files(self.d_dirs)
+    def load_state(self, file: str) -> dict | None:
+        path = os.path.join(VAR_DIR, file)
+        if not (os.path.isfile(path) and check_json(path)):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("dirs", None) != self.d_dirs:
+            return None
+        return state
+
+    def load_done_files(self, fingerprints: dict) -> set[str]:
+        """
+        Returns the changed files an interrupted scan of the same directories already flushed to ggd_lib.json, and
+        that did not change since.
+
+        The interrupted scan saved its change set in ggd_pending.json when it started, split between the files done
+        by the scan it resumed and the files left, and the last flushed file in ggd_cursor.json. Its left files are
+        handled in sorted order, so they are done up to that file.
+        """
+        pending = self.load_state(GGD_PENDING)
+        if pending is None:
+            return set()
+        cursor = self.load_state(GGD_CURSOR)
+        last_path = cursor.get("last_path", None) if cursor is not None else None
+        done = {path for path, fingerprint in pending["done"].items() if fingerprints.get(path) == fingerprint}
+        if last_path is not None:
+            done.update(path for path, fingerprint in pending["left"].items()
+                        if path <= last_path and fingerprints.get(path) == fingerprint)
+        return done
+
+    def save_pending(self, done: dict, left: dict):
+        # the cursor of the interrupted scan does not apply to the files left by this one
+        self.clear_cursor()
+        atomic_json_dump({"dirs": self.d_dirs, "done": done, "left": left}, os.path.join(VAR_DIR, GGD_PENDING))
+
+    def save_cursor(self, last_path: str):
+        atomic_json_dump({"dirs": self.d_dirs, "last_path": last_path}, os.path.join(VAR_DIR, GGD_CURSOR))
+
+    def clear_cursor(self):
+        for file in (GGD_CURSOR, GGD_PENDING):
+            path = os.path.join(VAR_DIR, file)
+            if os.path.isfile(path):
+                os.remove(path)
+
+    def walk_changes(self, directory: str, new_index: dict, changed_files: list) -> int:
+        """
+        Walks `directory` and records in `new_index` its mtime, its files (size, mtime) and its sub-directories.
+
+        A directory whose mtime did not change since the last scan is not listed again: its entries are taken from
+        `Gg_drive.index`. In a listed directory, only the files that are new or whose size or mtime changed are
+        appended to `changed_files`.
+
+        Returns:
+            int: The number of files left untouched.
+        """
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+        except OSError:
+            return 0
+        old_entry = Gg_drive.index.get(directory, None)
+        skipped = 0
+        if old_entry is not None and old_entry["mtime"] == mtime:
+            entry = old_entry
+            skipped += len(entry["files"])
         else:
-            for dir in self.d_dirs:
-                list_files += list_all_files(dir)
-        total_file = len(list_files)
-        compteur_file = 0
-        dictionary_episode = {}
-        for episode_path in list_files:
-            if is_video(episode_path):
+            entry = {"mtime": mtime, "files": {}, "dirs": []}
+            old_files = old_entry["files"] if old_entry is not None else {}
+            with os.scandir(directory) as dir:
+                for dir_entry in dir:
+                    if dir_entry.is_dir():
+                        if not dir_entry.is_symlink():
+                            entry["dirs"].append(dir_entry.name)
+                    elif dir_entry.is_file():
+                        st = dir_entry.stat()
+                        entry["files"][dir_entry.name] = [st.st_size, st.st_mtime_ns]
+                        if old_files.get(dir_entry.name, None) == entry["files"][dir_entry.name]:
+                            skipped += 1
+                        else:
+                            changed_files.append(dir_entry.path)
+        new_index[directory] = entry
+        for sub_directory in entry["dirs"]:
+            skipped += self.walk_changes(os.path.join(directory, sub_directory), new_index, changed_files)
+        return skipped
+
+    def indexed_files(index: dict) -> set[str]:
+        return {os.path.join(directory, file) for directory in index for file in index[directory]["files"]}
+
+    def indexed_fingerprints(index: dict) -> dict:
+        """Returns the [size, mtime] of the files of an index, by path."""
+        return {os.path.join(directory, file): fingerprint for directory in index
+                for file, fingerprint in index[directory]["files"].items()}
+
+    def prune_paths(paths: set[str]) -> int:
+        """
+        Removes the given file paths from `Gg_drive.dict_ep` along with the episodes, seasons and shows left empty.
+
+        Returns:
+            int: The number of removed files.
+        """
+        removed = 0
+        for id in list(Gg_drive.dict_ep):
+            for season in list(Gg_drive.dict_ep[id]):
+                for ep in list(Gg_drive.dict_ep[id][season]):
+                    for path in [p for p in Gg_drive.dict_ep[id][season][ep] if p in paths]:
+                        Gg_drive.dict_ep[id][season][ep].pop(path)
+                        removed += 1
+                    if Gg_drive.dict_ep[id][season][ep] == {}:
+                        Gg_drive.dict_ep[id][season].pop(ep)
+                if Gg_drive.dict_ep[id][season] == {}:
+                    Gg_drive.dict_ep[id].pop(season)
+            if Gg_drive.dict_ep[id] == {}:
+                Gg_drive.dict_ep.pop(id)
+        return removed
+
+    def add_episode(self, episode_path: str) -> bool:
+        """
+        Parses a video file and stores its information in `Gg_drive.dict_ep`.
+
+        Returns:
+            bool: True if the file was added, False if the show or the file could not be determined.
+        """
+        try:
+            try:
+                ep_info = SorterShows(episode_path)
+            except subprocess.CalledProcessError as e:
                 try:
-                    try:
-                        ep_info = SorterShows(episode_path)
-                    except subprocess.CalledProcessError as e:
-                        try:
-                            ep_info = SorterShows(episode_path)
-                        except subprocess.CalledProcessError:
-                            continue
-                        except UnicodeError:
-                            continue
-                        except ValueError as e:
-                            continue
-                    except ValueError as e:
-                        continue
-                    id = str(ep_info.id)
-                    season = str(ep_info.season)
-                    ep = str(ep_info.ep)
-                    if Gg_drive.dict_ep.get(id, None) is None:
-                        Gg_drive.dict_ep[id] = {}
-                    if Gg_drive.dict_ep[id].get(season, None) is None:
-                        Gg_drive.dict_ep[id][season] = {}
-                    if Gg_drive.dict_ep[id][season].get(ep, None) is None:
-                        Gg_drive.dict_ep[id][season][ep] = {}
-
-                    Gg_drive.dict_ep[id][season][ep][ep_info.path] = {
-                        "original_filename": ep_info.file_name,
-                        "renamed": ep_info.__str__(),
-                        "language": ep_info.lang,
-                        "list_subs_language": ep_info.list_subs_lang,
-                        "list_audio_language": ep_info.list_audio_lang,
-                        "title": ep_info.title,
-                        "height": ep_info.resolution,
-                        "codec": ep_info.codec,
-                    }
-                except AttributeError as e:
-                    pass
+                    ep_info = SorterShows(episode_path)
+                except subprocess.CalledProcessError:
+                    return False
+                except UnicodeError:
+                    return False
+                except ValueError as e:
+                    return False
+            except ValueError as e:
+                return False
+            id = str(ep_info.id)
+            season = str(ep_info.season)
+            ep = str(ep_info.ep)
+            if Gg_drive.dict_ep.get(id, None) is None:
+                Gg_drive.dict_ep[id] = {}
+            if Gg_drive.dict_ep[id].get(season, None) is None:
+                Gg_drive.dict_ep[id][season] = {}
+            if Gg_drive.dict_ep[id][season].get(ep, None) is None:
+                Gg_drive.dict_ep[id][season][ep] = {}
+
+            Gg_drive.dict_ep[id][season][ep][ep_info.path] = {
+                "original_filename": ep_info.file_name,
+                "renamed": ep_info.__str__(),
+                "language": ep_info.lang,
+                "list_subs_language": ep_info.list_subs_lang,
+                "list_audio_language": ep_info.list_audio_lang,
+                "title": ep_info.title,
+                "height": ep_info.resolution,
+                "codec": ep_info.codec,
+            }
+            return True
+        except AttributeError as e:
+            return False
+
+    def update_dict_ep(self) -> dict:
+        """
+        Scans the GGD directories and updates `Gg_drive.dict_ep` with the files added, modified or removed since the
+        previous scan.
+
+        Returns:
+            dict: The number of files skipped and removed by the scan, and of new and modified files it added to
+            `Gg_drive.dict_ep`.
+        """
+        # update Server.TASK_GGD_SCAN so we can track evolution
+        Server.TASK_GGD_SCAN = 0
+        roots = [self.d_dirs] if type(self.d_dirs) == str else self.d_dirs
+        new_index, list_files, skipped = {}, [], 0
+        for dir in roots:
+            if os.path.isdir(dir):
+                skipped += self.walk_changes(dir, new_index, list_files)
+        # files are scanned in sorted order so an interrupted scan can resume after the last flushed file
+        list_files.sort()
+        fingerprints = Gg_drive.indexed_fingerprints(new_index)
+        done_files = self.load_done_files(fingerprints)
+        if done_files:
+            log(f"Resuming GGD scan, {len(done_files)} files already done")
+        list_files_left = [file for file in list_files if file not in done_files]
+        self.save_pending({path: fingerprints[path] for path in list_files if path in done_files},
+                          {path: fingerprints[path] for path in list_files_left})
+        old_files = Gg_drive.indexed_files(Gg_drive.index)
+        deleted_files = old_files - Gg_drive.indexed_files(new_index)
+        # modified files are pruned too since they may now be parsed as another episode
+        Gg_drive.prune_paths(deleted_files | (old_files & set(list_files_left)))
+        Server.probe_cache.evict(list(deleted_files))
+        total_file = len(list_files)
+        compteur_file = total_file - len(list_files_left)
+        checkpoint = JsonCheckpoint(os.path.join(VAR_DIR, GGD_LIB), every=self.checkpoint_files,
+                                    interval=self.checkpoint_seconds)
+        added, modified = 0, 0
+        for episode_path in prefetch_video_specs(list_files_left):
+            if is_video(episode_path) and self.add_episode(episode_path):
+                if episode_path in old_files:
+                    modified += 1
+                else:
+                    added += 1
             compteur_file += 1
             Server.TASK_GGD_SCAN = round((compteur_file / total_file) * 100, 2)
-            json.dump(Gg_drive.dict_ep, open(os.path.join(VAR_DIR, GGD_LIB), "w", encoding="utf-8"), indent=5)
-        json.dump(Gg_drive.dict_ep, open(os.path.join(VAR_DIR, GGD_LIB), "w", encoding="utf-8"), indent=5)
-        return dictionary_episode
+            if checkpoint.step(Gg_drive.dict_ep):
+                self.save_cursor(episode_path)
+        checkpoint.flush(Gg_drive.dict_ep)
+        # the index is only saved once every changed file is in dict_ep, an interrupted scan finds the same changes
+        Gg_drive.index = new_index
+        atomic_json_dump(Gg_drive.index, os.path.join(VAR_DIR, GGD_INDEX))
+        self.clear_cursor()
+        Server.TASK_GGD_SCAN = 100
+        return {"skipped": skipped, "added": added, "modified": modified, "removed": len(deleted_files)}
 
     def run(self):
         try:
-            self.update_dict_ep()
-            log("GGD drive(s) updated")
+            scan = self.update_dict_ep()
+            stats = Server.probe_cache.stats()
+            log(f"GGD drive(s) updated: {scan['skipped']} files skipped, {scan['added']} added, "
+                f"{scan['modified']} modified, {scan['removed']} removed (probe cache: {stats['hits']} hits, "
+                f"{stats['misses']} misses, {stats['evicted']} evicted, {stats['size']} entries)")
         except KeyboardInterrupt:
-            json.dump(Gg_drive.dict_ep, open(os.path.join(VAR_DIR, GGD_LIB), "w", encoding="utf-8"), indent=5)
-            json.dump(Server.tmdb_db, open(os.path.join(VAR_DIR, TMDB_DB), "w", encoding="utf-8"), indent=5)
+            atomic_json_dump(Gg_drive.dict_ep, os.path.join(VAR_DIR, GGD_LIB))
+            with Server.tmdb_lock:
+                json.dump(Server.tmdb_db, open(os.path.join(VAR_DIR, TMDB_DB), "w", encoding="utf-8"), indent=5)
 
 if __name__ == '__main__':
     d = Gg_drive()
-    d.run()
\ No newline at end of file
+    d.run()
@@ -0,0 +1,160 @@
+import json
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# answers of a protected site retried by get_protected
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def site_of(url: str) -> str:
+    """
+    Returns the scheme and host of an URL, as in "https://yggtorrent.wtf/".
+    """
+    parsed = urlparse(url)
+    return f"{parsed.scheme}://{parsed.netloc}/"
+
+
+class HttpClient():
+    """
+    HTTP client shared by the whole process.
+
+    Each host gets its own `requests.Session`, so its connections are kept alive and reused. The session pools up to
+    `pool_size` connections, has a default timeout of `timeout` seconds, and retries failed connections up to
+    `retries` times, with an exponential backoff of `backoff` seconds. A connection that failed sent nothing, so
+    this applies to POST requests too.
+
+    Sites behind Cloudflare are requested through `get_protected`. That method sends the cookies and user agent
+    FlareSolverr (at `solver_url`) got for the site. They are asked again only when the site answers 403, and only
+    once for all the threads that got that 403. It also retries the 429/5xx answers, waiting for the rate limiter of
+    the site before each attempt.
+    """
+
+    def __init__(self, timeout: float = 30, retries: int = 3, backoff: float = 0.5, pool_size: int = 10,
+                 solver_url: str | None = None, solver_timeout: int = 60000):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.pool_size = pool_size
+        self.solver_url = solver_url
+        self.solver_timeout = solver_timeout
+        self.sessions = {}
+        self.lock = threading.Lock()
+        # {site: (cookies, user agent)} and the lock of each site, held while FlareSolverr solves it
+        self.clearances = {}
+        self.site_locks = {}
+        self.solver_calls = 0
+
+    def session(self, url: str) -> requests.Session:
+        host = urlparse(url).netloc
+        with self.lock:
+            session = self.sessions.get(host, None)
+            if session is None:
+                # only the failed connections, the answers are retried by get_protected behind the rate limiter
+                retry = Retry(total=self.retries, read=0, backoff_factor=self.backoff,
+                              respect_retry_after_header=False, raise_on_status=False)
+                adapter = HTTPAdapter(pool_connections=2, pool_maxsize=self.pool_size, max_retries=retry)
+                session = requests.Session()
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self.sessions[host] = session
+            return session
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session(url).request(method, url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def solve(self, url: str) -> tuple[dict | None, str | None]:
+        """
+        Asks FlareSolverr to open `url` and returns the cookies and user agent it used, (None, None) if it failed.
+        """
+        with self.lock:
+            self.solver_calls += 1
+        data = {"cmd": "request.get", "url": url, "maxTimeout": self.solver_timeout}
+        # FlareSolverr may take up to maxTimeout to solve the challenge
+        response = self.post(self.solver_url, json=data, headers={'Content-Type': 'application/json'},
+                             timeout=self.solver_timeout / 1000 + self.timeout)
+        if response.status_code == 200:
+            solution = json.loads(response.content)["solution"]
+            return {cookie["name"]: cookie["value"] for cookie in solution["cookies"]}, solution["userAgent"]
+        return None, None
+
+    def clearance(self, url: str) -> tuple[dict | None, str | None]:
+        """
+        Returns the cookies and user agent stored for the site of `url`, (None, None) if it was never solved.
+        """
+        with self.lock:
+            return self.clearances.get(site_of(url), (None, None))
+
+    def refresh_clearance(self, url: str, rejected: tuple | None = None) -> tuple[dict | None, str | None]:
+        """
+        Solves the site of `url` again, unless its clearance changed since `rejected` was refused, in which case
+        another thread already solved it and the new clearance is returned.
+        """
+        site = site_of(url)
+        with self.lock:
+            site_lock = self.site_locks.setdefault(site, threading.Lock())
+        with site_lock:
+            current = self.clearance(site)
+            if rejected is not None and current != rejected:
+                return current
+            current = self.solve(site)
+            with self.lock:
+                self.clearances[site] = current
+            return current
+
+    def get_protected(self, url: str, headers: dict | None = None, limiter=None) -> requests.Response:
+        """
+        GETs `url` with the stored clearance of its site. A 403 answer refreshes the clearance and retries once, a
+        429/5xx answer is retried up to `retries` times after its Retry-After header or the exponential backoff.
+        `limiter` (see Throttle.RateLimiter) is waited for before each request.
+        """
+        clearance = self.clearance(url)
+        response = self.get_with(url, clearance, headers, limiter)
+        if response.status_code == 403:
+            clearance = self.refresh_clearance(url, rejected=clearance)
+            response = self.get_with(url, clearance, headers, limiter)
+        for attempt in range(self.retries):
+            if response.status_code not in RETRY_STATUSES:
+                break
+            retry_after = response.headers.get("Retry-After", "")
+            time.sleep(int(retry_after) if retry_after.isdigit() else self.backoff * 2 ** attempt)
+            response = self.get_with(url, clearance, headers, limiter)
+        return response
+
+    def get_with(self, url: str, clearance: tuple, headers: dict | None, limiter) -> requests.Response:
+        cookies, user_agent = clearance
+        if limiter is not None:
+            limiter.acquire()
+        return self.get(url, cookies=cookies, headers={**(headers or {}), "User-Agent": user_agent})
+
+    def stats(self) -> dict:
+        """
+        Returns the number of requests sent and of connections opened, the other requests reusing a kept-alive
+        connection, and the number of FlareSolverr calls. A connection closed by the server and opened again by the
+        pool counts once.
+        """
+        requests_sent, connections = 0, 0
+        with self.lock:
+            sessions = list(self.sessions.values())
+        for session in sessions:
+            for adapter in set(session.adapters.values()):
+                pools = adapter.poolmanager.pools
+                for key in pools.keys():
+                    pool = pools.get(key, None)
+                    if pool is not None:
+                        requests_sent += pool.num_requests
+                        connections += pool.num_connections
+        return {"hosts": len(sessions), "requests": requests_sent, "connections": connections,
+                "reused": requests_sent - connections, "solver_calls": self.solver_calls,
+                "solved_sites": len(self.clearances)}
@@ -0,0 +1,183 @@
+import threading
+from bisect import bisect_right
+
+from thefuzz import process
+from thefuzz.utils import full_process
+
+
+def make_trigrams(processed: str) -> set[str]:
+    padded = f"  {processed} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TitleMatcher():
+    """
+    Fuzzy matcher of a title against the tmdb_db titles, giving the same answer as
+    `process.extractOne(title, list(tmdb_db))` above a score threshold.
+
+    A title whose processed form (see thefuzz.utils.full_process) equals the processed form of a cached title scores
+    100 and is returned without scoring anything. Otherwise the cached titles sharing the most trigrams with the
+    processed title are picked from a trigram index and only those `candidates` titles are scored.
+
+    The partial ratios of WRatio score a title contained in the other string at 90, whatever their trigrams, so the
+    titles containing the processed title, or contained in it, are always scored too. Likewise token_set_ratio scores a
+    title at 95 when its words are a subset or a superset of the words of the other string, so the titles sharing all
+    their words with the processed title, or all of its words, are scored too.
+
+    Titles are ranked in the order they were added, like the keys of tmdb_db, so equal scores resolve to the same
+    title as extractOne over the tmdb_db keys.
+    """
+
+    def __init__(self, candidates: int = 50):
+        self.candidates = candidates
+        self.rank = {}
+        self.next_rank = 0
+        self.exact = {}
+        self.trigrams = {}
+        self.title_trigrams = {}
+        self.tokens = {}
+        self.title_tokens = {}
+        self.blob = None
+        self.blob_starts = []
+        self.blob_titles = []
+        # the connectors of the missing episode fetch match titles from several threads
+        self.lock = threading.RLock()
+
+    def add(self, title: str):
+        with self.lock:
+            if title in self.title_trigrams:
+                return
+            self.rank[title] = self.next_rank
+            self.next_rank += 1
+            processed = full_process(title)
+            self.exact.setdefault(processed, []).append(title)
+            self.exact[processed].sort(key=self.rank.get)
+            self.title_trigrams[title] = make_trigrams(processed)
+            for gram in self.title_trigrams[title]:
+                self.trigrams.setdefault(gram, set()).add(title)
+            self.title_tokens[title] = set(processed.split())
+            for token in self.title_tokens[title]:
+                self.tokens.setdefault(token, set()).add(title)
+            self.blob = None
+
+    def remove(self, title: str):
+        with self.lock:
+            if title not in self.title_trigrams:
+                return
+            processed = full_process(title)
+            self.rank.pop(title)
+            self.exact[processed].remove(title)
+            if self.exact[processed] == []:
+                self.exact.pop(processed)
+            for gram in self.title_trigrams.pop(title):
+                self.trigrams[gram].discard(title)
+                if not self.trigrams[gram]:
+                    self.trigrams.pop(gram)
+            for token in self.title_tokens.pop(title):
+                self.tokens[token].discard(title)
+                if not self.tokens[token]:
+                    self.tokens.pop(token)
+            self.blob = None
+
+    def clear(self):
+        with self.lock:
+            self.rank.clear()
+            self.next_rank = 0
+            self.exact.clear()
+            self.trigrams.clear()
+            self.title_trigrams.clear()
+            self.tokens.clear()
+            self.title_tokens.clear()
+            self.blob = None
+
+    def build_blob(self):
+        """
+        Joins every processed title in a single string, so the titles containing a string are found by str.find.
+        """
+        parts, self.blob_starts, self.blob_titles, start = [], [], [], 0
+        for processed, titles in self.exact.items():
+            parts.append(processed)
+            self.blob_starts.append(start)
+            self.blob_titles.append(titles)
+            start += len(processed) + 1
+        self.blob = "\n".join(parts)
+
+    def find_containing(self, processed: str) -> set[str]:
+        """
+        Returns the cached titles whose processed form contains `processed`.
+        """
+        if self.blob is None:
+            self.build_blob()
+        found = set()
+        i = self.blob.find(processed)
+        while i != -1:
+            n = bisect_right(self.blob_starts, i) - 1
+            found.update(self.blob_titles[n])
+            # skip to the next title
+            i = self.blob.find(processed, self.blob_starts[n + 1] if n + 1 < len(self.blob_starts) else len(self.blob))
+        return found
+
+    def find_contained(self, processed: str) -> set[str]:
+        """
+        Returns the cached titles whose processed form is a part of `processed` or of its sorted words.
+        """
+        found = set()
+        for string in {processed, " ".join(sorted(processed.split()))}:
+            for i in range(len(string)):
+                for j in range(i + 1, len(string) + 1):
+                    found.update(self.exact.get(string[i:j], ()))
+        return found
+
+    def find_token_sets(self, processed: str) -> set[str]:
+        """
+        Returns the cached titles whose words are a subset or a superset of the words of `processed`.
+        """
+        query_tokens = set(processed.split())
+        shared = {}
+        for token in query_tokens:
+            for title in self.tokens.get(token, ()):
+                shared[title] = shared.get(title, 0) + 1
+        return {title for title, count in shared.items()
+                if count == len(query_tokens) or count == len(self.title_tokens[title])}
+
+    def find_candidates(self, processed: str) -> list[str]:
+        """
+        Returns the cached titles sharing the largest part of their trigrams with `processed`, in rank order.
+        """
+        query_trigrams = make_trigrams(processed)
+        shared = {}
+        for gram in query_trigrams:
+            for title in self.trigrams.get(gram, ()):
+                shared[title] = shared.get(title, 0) + 1
+        # containment in the shorter of both strings, so a title that is a part of a long release name (or the
+        # other way around) ranks as high as it is scored by the partial ratios of WRatio
+        containment = {title: shared[title] / min(len(query_trigrams), len(self.title_trigrams[title]))
+                       for title in shared}
+        best = sorted(containment, key=containment.get, reverse=True)
+        if len(best) > self.candidates:
+            # titles tied with the last candidate are kept, one of them may be the first best score in rank order
+            cutoff = containment[best[self.candidates - 1]]
+            best = [title for title in best if containment[title] >= cutoff]
+        best = set(best) | self.find_containing(processed) | self.find_contained(processed) \
+            | self.find_token_sets(processed)
+        return sorted(best, key=self.rank.get)
+
+    def match(self, title: str, threshold: int = 90) -> tuple[str, int] | None:
+        """
+        Returns the best cached title for `title` and its WRatio score, None if no title scores at least
+        `threshold`.
+        """
+        processed = full_process(title)
+        if processed == "":
+            return None
+        with self.lock:
+            titles = self.exact.get(processed, None)
+            if titles:
+                return titles[0], 100
+            candidates = self.find_candidates(processed)
+        if candidates == []:
+            return None
+        best = process.extractOne(title, candidates)
+        if best is None or best[1] < threshold:
+            return None
+        return best[0], best[1]
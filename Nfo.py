@@ -0,0 +1,131 @@
+import re
+
+from thefuzz import fuzz
+
+# characters dropped from the lines of an NFO: everything but letters, digits, spaces, dots and colons
+NFO_NOISE = re.compile(r"[^\w .:]|[_â]")
+
+# keys of the MediaInfo dumps found in the NFOs, as returned by split_value
+MEDIAINFO_SECTIONS = ["general", "video", "audio", "text", "menu", "mkv", "audio 1", "audio 2", "audio 3", "text 1",
+                      "text 2", "text 3", "text 4", "text 5"]
+MEDIAINFO_KEYS = ["unique id", "complete name", "format", "format version", "format info", "format profile",
+                  "format level", "format settings", "format settings cabac", "format settings reference frames",
+                  "format settings gop", "codec id", "codec idinfo", "codec id info", "duration", "bit rate",
+                  "bit rate mode", "overall bit rate", "maximum bit rate", "nominal bit rate", "width", "height",
+                  "display aspect ratio", "frame rate", "frame rate mode", "original frame rate", "frame count",
+                  "color space", "chroma subsampling", "bit depth", "scan type", "bitspixelframe", "stream size",
+                  "title", "language", "default", "forced", "channels", "channel s", "channel layout",
+                  "channel positions", "sampling rate", "compression mode", "delay relative to video",
+                  "writing application", "writing library", "encoding settings", "encoded date", "file size",
+                  "movie name", "count of elements", "resolution", "hauteur", "largeur", "duree", "langue",
+                  "debit", "codec"]
+
+
+def prepare_nfo(nfo_content: str) -> list[str]:
+    """
+    Splits the text of an NFO, as returned by `str(response.content)` for the get_nfo page of ygg, into lines
+    stripped of their noise characters.
+    """
+    content = bytes(str(nfo_content).replace('b"<pre>', "").replace('\n</pre>"', ""), "utf-8").decode(
+        'unicode_escape', errors='ignore')
+    return [NFO_NOISE.sub("", line).strip() for line in content.split("\n")]
+
+
+def split_value(part: str) -> tuple[str, str]:
+    """
+    Splits a line of `prepare_nfo` at its first colon into a lower case key without dots and a value.
+
+    Example:
+        >>> split_value("Codec ID : V_MPEGH/ISO/HEVC")
+        ('codec id', 'V_MPEGH/ISO/HEVC')
+    """
+    key, separator, value = part.partition(":")
+    return key.replace(".", "").lower().strip(), value.strip()
+
+
+class NfoKeyMap():
+    """
+    Maps the keys of an NFO to the first of the `wanted` names scoring above `threshold` with fuzz.ratio, False if
+    none does.
+
+    The answer for the wanted names themselves and for the `aliases`, usually the keys of a MediaInfo dump, is
+    computed once when the map is built. Any other key is scored on its first lookup and stored in `cache` (see
+    Cache.NfoKeyCache), which is shared by the maps, bounded and kept across runs. Without a cache it is memoized in
+    the map, up to `max_size` keys.
+    """
+
+    def __init__(self, wanted: list[str], threshold: int, aliases: list[str] = (), cache=None,
+                 max_size: int = 10000):
+        self.wanted = [(name, NfoKeyMap.normalize(name)) for name in wanted]
+        self.threshold = threshold
+        self.cache = cache
+        self.max_size = max_size
+        self.kind = f"{threshold}:{'|'.join(wanted)}"
+        self.hits = 0
+        self.misses = 0
+        self.table = {}
+        for key in (*[normalized for name, normalized in self.wanted], *aliases):
+            self.table[key] = self.score(key)
+        self.memo = {}
+
+    def normalize(key: str) -> str:
+        # remove_non_ascii, without its removal of "\u" escapes which prepare_nfo already strips
+        return key.encode("ascii", "ignore").decode("ascii").lower()
+
+    def score(self, key: str) -> str | bool:
+        key = NfoKeyMap.normalize(key)
+        for name, normalized in self.wanted:
+            if fuzz.ratio(key, normalized) > self.threshold:
+                return name
+        return False
+
+    def __call__(self, key: str) -> str | bool:
+        found = self.table.get(key, None)
+        if found is None:
+            found = self.cache.get(self.kind, key) if self.cache is not None else self.memo.get(key, None)
+        if found is not None:
+            self.hits += 1
+            return found
+        self.misses += 1
+        found = self.score(key)
+        if self.cache is not None:
+            self.cache.put(self.kind, key, found)
+        elif len(self.memo) < self.max_size:
+            self.memo[key] = found
+        return found
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups != 0 else None}
+
+
+def parse_nfo(nfo_content: str, titles: NfoKeyMap, specifications: NfoKeyMap) -> dict:
+    """
+    Parses an NFO into {section: {specification: value}}, the sections being named by `titles` and their
+    specifications by `specifications`. Sections without any wanted specification are left out.
+    """
+    result, section, title = {}, {}, None
+    for part in prepare_nfo(nfo_content):
+        key, value = split_value(part)
+        if key == "" and value == "":
+            continue
+        elif key != "" and value == "":
+            if title is not None:
+                if section != {title: {}}:
+                    result.update(section)
+                section = {}
+            key = titles(key)
+            if key:
+                title = key
+                section[title] = {}
+            else:
+                key = "None"
+        if title is not None and title != key and len(key) < 30 and len(value) < 60 and key != "None":
+            key = specifications(key)
+            if section.get(title, None) is None:
+                section[title] = {}
+            if key:
+                section[title][key] = value
+    result.update(section)
+    return {i: result[i] for i in result if result[i] != {}}
@@ -0,0 +1,256 @@
+import os
+import re
+from itertools import groupby
+from dataclasses import dataclass
+
+UNWANTED_WORDS = ["2nd Season", "1st Season", "3rd Season", "Cour 2", "INTEGRAL", "integrale", "intégrale", "INTEGRALE"]
+SEASON_WORDS = ["Season", "season", "Saison", "saison"]
+
+# first "S" followed 3 characters later by an "E", as in "S01E02"
+SEASON_EPISODE_TAG = re.compile(r"S(?=..E)", re.DOTALL)
+RESOLUTION_TAG = re.compile(r"(?<![0-9])(2160|1080|720|576|480)[pP](?![0-9a-zA-Z])")
+# groups removed from the names before they are parsed, see strip_brackets
+BRACKET_PAIRS = [("[", "]"), ("{", "}"), ("(", ")")]
+
+
+@dataclass(slots=True, frozen=True)
+class ParsedRelease:
+    title: str
+    season: str
+    episode: str
+    group: str | None
+    resolution: str | None
+    language: str | None
+
+
+def isolate_numbers(temp_file):
+    """
+    Retrieves a list of all numbers present in the given string.
+
+    Args:
+        temp_file (str): The input string.
+
+    Returns:
+        list: A list of all numbers found in the string.
+
+    Example:
+        >>> isolate_numbers("abc 123 xyz 456")
+        ['123', '456']
+    """
+    return ["".join(run) for numeric, run in groupby(temp_file, str.isnumeric) if numeric]
+
+
+def delete_from_to(string, fromm, to):
+    """
+    Deletes a substring from the given string, starting from the specified 'from' substring
+    and ending at the specified 'to' substring (both inclusive).
+
+    Args:
+        string (str): The original string.
+        fromm (str): The starting substring to be deleted.
+        to (str): The ending substring to be deleted.
+
+    Returns:
+        str: The modified string after deleting the specified substring.
+
+    Raises:
+        ValueError: If the 'from' or 'to' substrings are not found in the original string.
+
+    Example:
+        >>> delete_from_to("Hello [world], how are you?", "[", "]")
+        'Hello , how are you?'
+    """
+    if fromm not in string:
+        raise ValueError(f"'{fromm}' not found in '{string}'")
+    if to not in string:
+        raise ValueError(f"'{to}' not found in '{string}'")
+
+    start = string.index(fromm)
+    end = string.find(to, start)
+    if end == -1:
+        raise ValueError(f"'{to}' not found after '{fromm}' in '{string}'")
+    return string[:start] + string[end + 1:]
+
+
+def strip_brackets(string: str, pairs=BRACKET_PAIRS) -> str:
+    """
+    Removes every group opened and closed by one of the `pairs`, both included, with one scan of the string per
+    pair.
+
+    The pairs are handled in order, and a group ends at the first closing character after its opening one, so the
+    result is the one of calling `delete_from_to` until the string no longer contains both characters of a pair.
+    An opening character left without closing one after it is kept.
+
+    Example:
+        >>> strip_brackets("[Judas] Vinland Saga - S02E23 (1080p) [Multi Subs].mkv")
+        ' Vinland Saga - S02E23  .mkv'
+    """
+    for fromm, to in pairs:
+        parts, i = [], 0
+        while True:
+            start = string.find(fromm, i)
+            if start == -1:
+                break
+            end = string.find(to, start + 1)
+            if end == -1:
+                break
+            parts.append(string[i:start])
+            i = end + 1
+        parts.append(string[i:])
+        string = "".join(parts)
+    return string
+
+
+def clean_release_name(file_name: str) -> str:
+    """
+    Returns the file name without extension, with dots and underscores replaced by spaces.
+    """
+    return os.path.splitext(file_name)[0].replace(".", " ").replace("_", " ")
+
+
+def parse_season(clean_name: str) -> str:
+    if "oav" in clean_name.lower():
+        return "00"
+    if "nd Season" in clean_name:
+        return "02"
+    if "st Season" in clean_name:
+        return "01"
+    if "rd Season" in clean_name:
+        return "03"
+
+    # a number at the start of the name is part of the title
+    start = 0
+    while start < len(clean_name) and clean_name[start].isnumeric():
+        start += 1
+    file = clean_name[start:]
+    numbers = isolate_numbers(file)
+    if len(numbers) == 1:
+        return "01"
+
+    # the text before the first occurrence of each number, in order
+    prefixes = [(number, file[:file.find(number)]) for number in numbers]
+    for number, prefix in prefixes:
+        if prefix != "" and prefix[-1] in "sS":
+            return f"{int(number):02}"
+    for number, prefix in prefixes:
+        if len(prefix) >= 7 and prefix.endswith("eason "):
+            return f"{int(number):02}"
+    return "01"
+
+
+def parse_title(clean_name: str, season: str) -> str:
+    file = clean_name
+    for word in UNWANTED_WORDS:
+        file = file.replace(word, "")
+    for word in SEASON_WORDS:
+        if word in file:
+            file = file.split(word)[0]
+            break
+
+    if " - " in file:
+        file = file.split(" - ")[0]
+        if f"S{season}" in file:
+            file = file.split(f"S{season}")[0]
+        if f"S{season[1]}" in file:
+            file = file.split(f"S{season[1]}")[0]
+        if file[-1].isnumeric() and file[-2] == " ":
+            file = file[:-1].strip()
+        return file.strip()
+
+    tag = SEASON_EPISODE_TAG.search(file)
+    if tag is not None:
+        return file[:tag.start()].strip()
+
+    for i, char in enumerate(file):
+        if char.isnumeric():
+            return file[:i].strip()
+
+    return file.split(" ")[0]
+
+
+def format_episode(number: str) -> str:
+    if len(number) <= 2:
+        return f"{int(number):02}"
+    elif len(number) == 3:
+        return f"{int(number):03}"
+    elif len(number) == 4:
+        return f"{int(number):04}"
+
+
+def parse_episode(clean_name: str, title: str, season: str) -> str:
+    file, temp = clean_name, None
+    if title in file:
+        file = file.split(title)[-1]
+
+    numbers = isolate_numbers(file)
+    if numbers == []:
+        return "MOVIE"
+    if len(numbers) == 1:
+        return f"{numbers[0]:02}"
+
+    for number in numbers:
+        prefix = file[:file.find(number)]
+        if prefix != "" and prefix[-1] == "E" and len(number) <= 4:
+            return format_episode(number)
+        if len(number) == 2:
+            if f"{int(number):02}" == season:
+                temp = number
+            else:
+                return f"{int(number):02}"
+    if temp is not None:
+        return f"{int(temp):02}"
+    return format_episode(str(max([int(i) for i in numbers])))
+
+
+def parse_group(file_name: str) -> str | None:
+    if file_name[0] == "[" and "]" in file_name:
+        return file_name[1:file_name.index("]")]
+
+    if "-" in file_name:
+        file = os.path.splitext(file_name)[0][::-1].strip()
+        if "-" in file[:15]:
+            return "-".join(file[:15].split("-")[:-1])[::-1]
+    return None
+
+
+def parse_language(file_name: str) -> str | None:
+    lower = file_name.lower()
+    if "vf" in lower and "vostfr" in lower:
+        return "VF/VOSTFR"
+    elif "vf" in lower:
+        return "VF"
+    elif "vostfr" in lower:
+        return "VOSTFR"
+    return None
+
+
+def parse_resolution(file_name: str) -> str | None:
+    tag = RESOLUTION_TAG.search(file_name)
+    if tag is None:
+        return None
+    return f"{tag.group(1)}p"
+
+
+def parse_release(file_name: str) -> ParsedRelease:
+    """
+    Parses the name of an episode file, whose (), [] and {} groups are already removed as done by
+    `SorterCommon.make_clean_file_name`.
+
+    Every field is extracted by a single scan of the name, or by a precompiled regex, with the same results as the
+    heuristics of `SorterShows`. `language` is only the language tag found in the name (see
+    `SorterCommon.determine_language` for the one read from the tracks) and `resolution` the height tag, None if
+    the name has none.
+
+    Example:
+        >>> parse_release("Vinland Saga S02E23 VOSTFR 1080p-Trix.mkv")
+        ParsedRelease(title='Vinland Saga', season='02', episode='23', group='Trix', resolution='1080p', language='VOSTFR')
+    """
+    clean_name = clean_release_name(file_name)
+    season = parse_season(clean_name)
+    title = parse_title(clean_name, season)
+    return ParsedRelease(title=title,
+                         season=season,
+                         episode=parse_episode(clean_name, title, season),
+                         group=parse_group(file_name),
+                         resolution=parse_resolution(file_name),
+                         language=parse_language(file_name))
@@ -0,0 +1,132 @@
+import datetime
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import tmdbsimple as tmdb
+
+from Throttle import RateLimiter
+
+
+def anime_seasons(groups: list) -> list:
+    """
+    Converts the groups of the "Seasons" episode group of an anime to the "seasons" list of the TMDB info.
+    """
+    seasons = []
+    for group in groups:
+        seasons.append({
+            "air_date": group["episodes"][0]["air_date"],
+            "episode_count": len(group["episodes"]),
+            "id": 0,
+            "name": group["name"],
+            "overview": "",
+            "poster_path": "",
+            "season_number": group["order"],
+            "vote_average": 0
+        })
+    return seasons
+
+
+class TmdbRefresher():
+    """
+    Fetches TMDB information for the tmdb_db entries.
+
+    Every TMDB request goes through a shared rate limiter (`rate` requests per second), so the `workers` threads of
+    `refresh` and the single fetches made by `Server.store_tmdb_info` never exceed it together.
+
+    An entry is stale once it is older than its time to live, which depends on its status and air dates:
+        - `ended_ttl` for ended or canceled shows and released movies
+        - `airing_ttl` for shows with an episode to air or aired in the last `recent_days` days
+        - `idle_ttl` for the others
+    Entries without "fetched_at" (stored before the refresher existed) are always stale.
+    """
+
+    ENDED_STATUS = ("Ended", "Canceled", "Released")
+
+    def __init__(self, workers: int = 4, rate: float = 20, batch_size: int = 50, base_uri: str | None = None,
+                 airing_ttl: int = 86400, idle_ttl: int = 7 * 86400, ended_ttl: int = 30 * 86400,
+                 recent_days: int = 60):
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self.base_uri = base_uri
+        self.airing_ttl = airing_ttl
+        self.idle_ttl = idle_ttl
+        self.ended_ttl = ended_ttl
+        self.recent_days = recent_days
+        self.limiter = RateLimiter(rate, burst=self.workers)
+
+    def api(self, obj: tmdb.base.TMDB) -> tmdb.base.TMDB:
+        """
+        Waits for the rate limiter and points `obj` to `base_uri` when one is set (a proxy or a stub server).
+        """
+        self.limiter.acquire()
+        if self.base_uri is not None:
+            obj.base_uri = self.base_uri
+        return obj
+
+    def fetch_anime_seasons(self, id: int) -> list | None:
+        """
+        Returns the seasons of an anime as numbered by its "Seasons" episode group, None if it has none.
+        """
+        groups = [i for i in self.api(tmdb.TV(id)).episode_groups()["results"] if i["name"] == "Seasons"]
+        if groups == []:
+            return None
+        return anime_seasons(self.api(tmdb.TV_Episode_Groups(id=groups[0]["id"])).info()["groups"])
+
+    def fetch(self, id: int, kind: str) -> dict:
+        """
+        Fetches the TMDB information of an id, `kind` being "anime", "show" or "movie", and stamps it with the time
+        it was fetched.
+        """
+        if kind == "movie":
+            info = self.api(tmdb.Movies(id)).info(append_to_response="translations")
+        elif kind in ("anime", "show"):
+            info = self.api(tmdb.TV(id)).info(append_to_response="seasons,translations")
+            if kind == "anime":
+                seasons = self.fetch_anime_seasons(info["id"])
+                if seasons is not None:
+                    info["seasons"] = seasons
+        else:
+            raise ValueError(f"kind should be anime, show or movie, not {kind}")
+        info["fetched_at"] = time.time()
+        return info
+
+    def ttl(self, info: dict) -> int:
+        if info.get("status", None) in TmdbRefresher.ENDED_STATUS:
+            return self.ended_ttl
+        if info.get("next_episode_to_air", None) is not None:
+            return self.airing_ttl
+        air_date = info.get("last_air_date", None) or info.get("release_date", None)
+        try:
+            days = abs((datetime.date.today() - datetime.date.fromisoformat(air_date)).days)
+        except (TypeError, ValueError):
+            return self.idle_ttl
+        return self.airing_ttl if days <= self.recent_days else self.idle_ttl
+
+    def is_stale(self, info: dict, now: float | None = None) -> bool:
+        fetched_at = info.get("fetched_at", None)
+        if fetched_at is None:
+            return True
+        if now is None:
+            now = time.time()
+        return now - fetched_at > self.ttl(info)
+
+    def refresh(self, items: list[tuple[int, str]]):
+        """
+        Fetches the (id, kind) items concurrently, `batch_size` items at a time.
+
+        Yields:
+            list: For each batch, the (id, kind, info) tuples in the order of `items`, info being the exception
+            raised by the fetch if it failed.
+        """
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for start in range(0, len(items), self.batch_size):
+                batch = items[start:start + self.batch_size]
+                futures = [executor.submit(self.fetch, id, kind) for id, kind in batch]
+                results = []
+                for (id, kind), future in zip(batch, futures):
+                    try:
+                        results.append((id, kind, future.result()))
+                    except (requests.exceptions.RequestException, KeyError, IndexError, ValueError) as e:
+                        results.append((id, kind, e))
+                yield results
@@ -0,0 +1,133 @@
+from dataclasses import dataclass
+from html.parser import HTMLParser
+
+
+@dataclass(slots=True, frozen=True)
+class ResultRow:
+    name: str
+    torrent_id: str
+    seeders: str
+
+
+class ResultPageParser(HTMLParser):
+    """
+    Single pass parser of a ygg search page.
+
+    Every <tr> holding a torrent name link (a#torrent_name) is a result row: its torrent id is the "target" of its
+    NFO link (a#get_nfo) and its seeders the text of its next to last <td>. The total number of results is the first
+    number of the <font> tags of the <h2> holding a right-floated <font>.
+
+    As with the html.parser tree builder of BeautifulSoup, a <tr> left open is closed by the next <tr> of the same
+    table, by the end of its <tbody> or <table>, or by the end of the page. A <td> left open is closed by the next
+    <td> of its row.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.rows = []
+        self.total = None
+        # <h2> being read: its <font> texts and whether one of them floats right
+        self.h2_depth = 0
+        self.h2_fonts = []
+        self.h2_float = False
+        self.open_fonts = []
+        # <tr> being read, the innermost one last, and the number of <table> open
+        self.trs = []
+        self.table_depth = 0
+        self.link = None
+
+    def handle_starttag(self, tag: str, attrs: list):
+        if tag == "h2":
+            self.h2_depth += 1
+        elif tag == "font" and self.h2_depth > 0:
+            self.h2_fonts.append([])
+            self.open_fonts.append(self.h2_fonts[-1])
+            if ("style", "float: right") in attrs:
+                self.h2_float = True
+        elif tag == "table":
+            self.table_depth += 1
+        elif tag == "tr":
+            self.close_rows(sibling=True)
+            self.trs.append({"tds": [], "open_tds": [], "name": None, "id": None, "depth": self.table_depth})
+        elif tag == "td" and self.trs:
+            row = self.trs[-1]
+            # a <td> left open ends at the next <td> of its row
+            row["open_tds"] = [td for td in row["open_tds"] if td != len(row["tds"]) - 1]
+            row["open_tds"].append(len(row["tds"]))
+            row["tds"].append([])
+        elif tag == "a" and self.trs:
+            attrs = dict(attrs)
+            if attrs.get("id", None) == "torrent_name" and self.trs[-1]["open_tds"]:
+                self.trs[-1]["name"] = []
+                self.link = self.trs[-1]["name"]
+            elif attrs.get("id", None) == "get_nfo" and self.trs[-1]["id"] is None:
+                self.trs[-1]["id"] = attrs.get("target", None)
+
+    def handle_endtag(self, tag: str):
+        if tag == "h2" and self.h2_depth > 0:
+            self.h2_depth -= 1
+            if self.h2_depth == 0:
+                if self.h2_float and self.total is None:
+                    texts = ["".join(font).strip() for font in self.h2_fonts]
+                    self.total = int(texts[0].split(" ")[0])
+                self.h2_fonts, self.h2_float, self.open_fonts = [], False, []
+        elif tag == "font" and self.open_fonts:
+            self.open_fonts.pop()
+        elif tag == "a":
+            self.link = None
+        elif tag == "td" and self.trs and self.trs[-1]["open_tds"]:
+            self.trs[-1]["open_tds"].pop()
+        elif tag == "tr" and self.trs:
+            self.end_row()
+        elif tag in ("tbody", "table"):
+            self.close_rows()
+            if tag == "table" and self.table_depth > 0:
+                self.table_depth -= 1
+
+    def end_row(self):
+        row = self.trs.pop()
+        if row["name"] is not None and len(row["tds"]) >= 2:
+            self.rows.append(ResultRow(name="".join(row["name"]).strip(),
+                                       torrent_id=row["id"],
+                                       seeders="".join(row["tds"][-2])))
+
+    def close_rows(self, sibling: bool = False):
+        """
+        Ends the rows left open in the current table, only the innermost one if `sibling` (a new <tr> starts).
+        """
+        while self.trs and self.trs[-1]["depth"] == self.table_depth:
+            self.end_row()
+            if sibling:
+                return
+
+    def close(self):
+        super().close()
+        while self.trs:
+            self.end_row()
+
+    def handle_data(self, data: str):
+        for font in self.open_fonts:
+            font.append(data)
+        if self.link is not None:
+            self.link.append(data)
+        if self.trs:
+            row = self.trs[-1]
+            stripped = data.strip()
+            if stripped != "":
+                for td in row["open_tds"]:
+                    row["tds"][td].append(stripped)
+
+
+def parse_result_page(content: bytes | str) -> tuple[list[ResultRow] | None, int | None]:
+    """
+    Returns the result rows of a ygg search page and its total number of results, (None, None) if the page has no
+    result count.
+    """
+    if isinstance(content, bytes):
+        content = content.decode("utf-8", errors="replace")
+    parser = ResultPageParser()
+    parser.feed(content)
+    parser.close()
+    if parser.total is None:
+        return None, None
+    return parser.rows, parser.total
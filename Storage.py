@@ -0,0 +1,280 @@
+import json
+import os
+import sqlite3
+import threading
+
+
+class LibraryStore():
+    """
+    SQLite storage of the anime, show and movie libraries.
+
+    A library is stored as one row per media, one row per season and one row per episode, so adding or deleting an
+    episode writes a single row instead of the whole library. `load` rebuilds the nested dictionaries used by
+    `DataBase`:
+
+        {id: {"title": ..., "path": ..., "seasons": {season: {"season_info": ..., "path": ...,
+                                                              "current_episode": {episode: {...}}}}}}
+
+    Every method runs in its own transaction, a failing write leaves the store untouched.
+    """
+
+    KINDS = ("anime", "show", "movie")
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS media ("
+                              "kind TEXT NOT NULL, id TEXT NOT NULL, title TEXT, path TEXT, extra TEXT NOT NULL, "
+                              "PRIMARY KEY (kind, id))")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS seasons ("
+                              "kind TEXT NOT NULL, id TEXT NOT NULL, season TEXT NOT NULL, path TEXT, "
+                              "season_info TEXT NOT NULL, "
+                              "PRIMARY KEY (kind, id, season))")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS episodes ("
+                              "kind TEXT NOT NULL, id TEXT NOT NULL, season TEXT NOT NULL, episode TEXT NOT NULL, "
+                              "data TEXT NOT NULL, "
+                              "PRIMARY KEY (kind, id, season, episode))")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS imported (kind TEXT PRIMARY KEY)")
+
+    def check_kind(kind: str):
+        if kind not in LibraryStore.KINDS:
+            raise ValueError(f"kind should be one of {LibraryStore.KINDS}, not {kind}")
+
+    def _write_media(self, kind: str, id: str, entry: dict):
+        self.conn.execute("DELETE FROM episodes WHERE kind = ? AND id = ?", (kind, id))
+        self.conn.execute("DELETE FROM seasons WHERE kind = ? AND id = ?", (kind, id))
+        extra = {key: value for key, value in entry.items() if key not in ("title", "path", "seasons")}
+        self.conn.execute("INSERT OR REPLACE INTO media (kind, id, title, path, extra) VALUES (?, ?, ?, ?, ?)",
+                          (kind, id, entry.get("title", None), entry.get("path", None), json.dumps(extra)))
+        for season, season_entry in entry.get("seasons", {}).items():
+            self.conn.execute("INSERT INTO seasons (kind, id, season, path, season_info) VALUES (?, ?, ?, ?, ?)",
+                              (kind, id, season, season_entry.get("path", None),
+                               json.dumps(season_entry.get("season_info", {}))))
+            self.conn.executemany("INSERT INTO episodes (kind, id, season, episode, data) VALUES (?, ?, ?, ?, ?)",
+                                  [(kind, id, season, episode, json.dumps(data))
+                                   for episode, data in season_entry.get("current_episode", {}).items()])
+
+    def is_imported(self, kind: str) -> bool:
+        with self.lock:
+            return self.conn.execute("SELECT 1 FROM imported WHERE kind = ?", (kind,)).fetchone() is not None
+
+    def import_library(self, kind: str, library: dict):
+        """
+        One-shot import of a whole library dictionary (as stored in anime.json, shows.json or movie.json).
+        """
+        LibraryStore.check_kind(kind)
+        with self.lock, self.conn:
+            for id, entry in library.items():
+                self._write_media(kind, str(id), entry)
+            self.conn.execute("INSERT OR REPLACE INTO imported (kind) VALUES (?)", (kind,))
+
+    def load(self, kind: str) -> dict:
+        """
+        Rebuilds the library dictionary of `kind` from the store.
+        """
+        LibraryStore.check_kind(kind)
+        library = {}
+        with self.lock:
+            for id, title, path, extra in self.conn.execute(
+                    "SELECT id, title, path, extra FROM media WHERE kind = ? ORDER BY rowid", (kind,)):
+                library[id] = {"title": title, "path": path}
+                if kind != "movie":
+                    library[id]["seasons"] = {}
+                library[id].update(json.loads(extra))
+            for id, season, path, season_info in self.conn.execute(
+                    "SELECT id, season, path, season_info FROM seasons WHERE kind = ? ORDER BY rowid", (kind,)):
+                library[id].setdefault("seasons", {})[season] = {"season_info": json.loads(season_info),
+                                                                 "path": path,
+                                                                 "current_episode": {}}
+            for id, season, episode, data in self.conn.execute(
+                    "SELECT id, season, episode, data FROM episodes WHERE kind = ? ORDER BY rowid", (kind,)):
+                library[id]["seasons"][season]["current_episode"][episode] = json.loads(data)
+        return library
+
+    def put_media(self, kind: str, id: str, entry: dict):
+        """
+        Writes (or replaces) one media with all its seasons and episodes.
+        """
+        LibraryStore.check_kind(kind)
+        with self.lock, self.conn:
+            self._write_media(kind, str(id), entry)
+
+    def delete_media(self, kind: str, id: str) -> bool:
+        LibraryStore.check_kind(kind)
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM episodes WHERE kind = ? AND id = ?", (kind, str(id)))
+            self.conn.execute("DELETE FROM seasons WHERE kind = ? AND id = ?", (kind, str(id)))
+            return self.conn.execute("DELETE FROM media WHERE kind = ? AND id = ?", (kind, str(id))).rowcount > 0
+
+    def delete_season(self, kind: str, id: str, season: str) -> bool:
+        LibraryStore.check_kind(kind)
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM episodes WHERE kind = ? AND id = ? AND season = ?", (kind, str(id), season))
+            return self.conn.execute("DELETE FROM seasons WHERE kind = ? AND id = ? AND season = ?",
+                                     (kind, str(id), season)).rowcount > 0
+
+    def put_season_info(self, kind: str, id: str, season: str, season_info: dict) -> bool:
+        LibraryStore.check_kind(kind)
+        with self.lock, self.conn:
+            return self.conn.execute("UPDATE seasons SET season_info = ? WHERE kind = ? AND id = ? AND season = ?",
+                                     (json.dumps(season_info), kind, str(id), season)).rowcount > 0
+
+    def put_episode(self, kind: str, id: str, season: str, episode: str, data: dict):
+        """
+        Writes (or replaces) a single episode row.
+        """
+        LibraryStore.check_kind(kind)
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO episodes (kind, id, season, episode, data) VALUES (?, ?, ?, ?, ?)",
+                              (kind, str(id), season, episode, json.dumps(data)))
+
+    def delete_episode(self, kind: str, id: str, season: str, episode: str) -> bool:
+        LibraryStore.check_kind(kind)
+        with self.lock, self.conn:
+            return self.conn.execute("DELETE FROM episodes WHERE kind = ? AND id = ? AND season = ? AND episode = ?",
+                                     (kind, str(id), season, episode)).rowcount > 0
+
+
+class EpisodeIndex():
+    """
+    In-memory presence index over the anime and show libraries, kept in sync with them by `DataBase`.
+
+    `episodes` holds the (kind, id, season, episode) of every episode of the libraries, so knowing if an episode is
+    already in the library is a set lookup. `titles` maps a normalized title to the (kind, id) of the media it was
+    resolved to, the library title of every media and the titles already found by `DataBase.find`.
+    """
+
+    def __init__(self):
+        self.episodes = set()
+        self.titles = {}
+        self.media_titles = {}
+
+    def add_media(self, kind: str, id: str, entry: dict, titles=()):
+        """
+        Indexes the episodes of a library entry, and `titles` as aliases of the media (see `add_title`).
+        """
+        for season, season_entry in entry.get("seasons", {}).items():
+            for episode in season_entry.get("current_episode", {}):
+                self.episodes.add((kind, id, season, episode))
+        for title in titles:
+            self.add_title(kind, id, title)
+
+    def remove_media(self, kind: str, id: str, entry: dict):
+        for season in entry.get("seasons", {}):
+            self.remove_season(kind, id, season, entry)
+        for title in self.media_titles.pop((kind, id), ()):
+            if self.titles.get((kind, title), None) == id:
+                self.titles.pop((kind, title))
+
+    def remove_season(self, kind: str, id: str, season: str, entry: dict):
+        for episode in entry["seasons"][season].get("current_episode", {}):
+            self.episodes.discard((kind, id, season, episode))
+
+    def add_episode(self, kind: str, id: str, season: str, episode: str):
+        self.episodes.add((kind, id, season, episode))
+
+    def remove_episode(self, kind: str, id: str, season: str, episode: str):
+        self.episodes.discard((kind, id, season, episode))
+
+    def has_episode(self, kind: str, id: str, season: str, episode: str) -> bool:
+        return (kind, id, season, episode) in self.episodes
+
+    def add_title(self, kind: str, id: str, title: str):
+        """
+        Records `title`, already normalized by the caller, as an alias of the media `id`.
+        """
+        self.titles[(kind, title)] = id
+        self.media_titles.setdefault((kind, id), set()).add(title)
+
+    def find_id(self, kind: str, title: str) -> str | None:
+        return self.titles.get((kind, title), None)
+
+    def clear(self):
+        self.episodes.clear()
+        self.titles.clear()
+        self.media_titles.clear()
+
+
+class MissingEpisodes():
+    """
+    Missing episodes of the anime and show libraries, kept in sync with them by `DataBase`.
+
+    A season misses the episodes "01" to its season_info episode_count (zero-padded to two digits, like the keys of
+    current_episode) that are not in its current_episode. Only the seasons missing episodes are kept in `gaps`, as
+    {kind: {id: {season: set of episodes}}}, so listing them costs the number of missing episodes and not the size
+    of the libraries.
+    """
+
+    def __init__(self):
+        self.gaps = {"anime": {}, "show": {}}
+        self.counts = {}
+        # the API thread reads the gaps while the sorter and the feeds update them
+        self.lock = threading.RLock()
+
+    def expected(episode: str, count: int) -> bool:
+        return episode.isdigit() and episode == str(int(episode)).zfill(2) and 1 <= int(episode) <= count
+
+    def set_season(self, kind: str, id: str, season: str, season_entry: dict):
+        """
+        (Re)computes the missing episodes of a season from its library entry.
+        """
+        with self.lock:
+            count = season_entry.get("season_info", {}).get("episode_count", 0) or 0
+            self.counts[(kind, id, season)] = count
+            present = season_entry.get("current_episode", {})
+            missing = {str(i).zfill(2) for i in range(1, count + 1)} - present.keys()
+            if missing:
+                self.gaps[kind].setdefault(id, {})[season] = missing
+            else:
+                self.remove_gap(kind, id, season)
+
+    def add_media(self, kind: str, id: str, entry: dict):
+        with self.lock:
+            for season, season_entry in entry.get("seasons", {}).items():
+                self.set_season(kind, id, season, season_entry)
+
+    def remove_media(self, kind: str, id: str, entry: dict):
+        with self.lock:
+            for season in entry.get("seasons", {}):
+                self.remove_season(kind, id, season)
+
+    def remove_season(self, kind: str, id: str, season: str):
+        with self.lock:
+            self.counts.pop((kind, id, season), None)
+            self.remove_gap(kind, id, season)
+
+    def remove_gap(self, kind: str, id: str, season: str):
+        seasons = self.gaps[kind].get(id, None)
+        if seasons is not None and seasons.pop(season, None) is not None and seasons == {}:
+            self.gaps[kind].pop(id)
+
+    def add_episode(self, kind: str, id: str, season: str, episode: str):
+        with self.lock:
+            missing = self.gaps[kind].get(id, {}).get(season, None)
+            if missing is not None:
+                missing.discard(episode)
+                if not missing:
+                    self.remove_gap(kind, id, season)
+
+    def remove_episode(self, kind: str, id: str, season: str, episode: str):
+        with self.lock:
+            if MissingEpisodes.expected(episode, self.counts.get((kind, id, season), 0)):
+                self.gaps[kind].setdefault(id, {}).setdefault(season, set()).add(episode)
+
+    def missing(self) -> dict:
+        """
+        Returns the missing episodes like `DataBase.list_missing_episodes`: {kind: {id: {season: [episodes]}}}.
+        """
+        with self.lock:
+            return {kind: {id: {season: sorted(episodes, key=int) for season, episodes in seasons.items()}
+                           for id, seasons in self.gaps[kind].items()}
+                    for kind in self.gaps}
+
+    def count(self) -> dict:
+        with self.lock:
+            return {kind: sum(len(episodes) for seasons in self.gaps[kind].values() for episodes in seasons.values())
+                    for kind in self.gaps}
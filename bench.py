@@ -0,0 +1,599 @@
+import sys
+import threading
+from contextlib import contextmanager
+
+from API import *
+from Downloader import *
+from GGD import *
+
+def bench_probe_pool(n_files=64, pool_sizes=(1, 4, 16)):
+    import shutil
+    import subprocess
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as directory:
+        # a short clip generated by ffmpeg, so ffprobe reads real streams instead of failing on random bytes
+        sample = os.path.join(directory, "sample.mkv")
+        subprocess.run(["ffmpeg", "-v", "error", "-f", "lavfi", "-i", "testsrc=duration=2:size=640x360:rate=24",
+                        "-f", "lavfi", "-i", "sine=duration=2", "-c:v", "libx264", "-c:a", "aac", sample],
+                       check=True)
+        list_files = []
+        for i in range(n_files):
+            path = os.path.join(directory, f"Synthetic Show S01E{i:03}.mkv")
+            shutil.copyfile(sample, path)
+            list_files.append(path)
+        for workers in pool_sizes:
+            # every run starts from an empty cache, otherwise the runs after the first only get hits
+            Server.probe_cache.evict(list_files)
+            st = time.perf_counter()
+            if workers <= 1:
+                # prefetch_video_specs does not probe with a single worker, the consumer probes each file in turn
+                for path in list_files:
+                    cache_video_spec(path)
+            else:
+                for _ in prefetch_video_specs(list_files, workers=workers):
+                    pass
+            et = time.perf_counter()
+            print(f"{n_files} files, {workers} workers : {et - st:.2f} seconds")
+        Server.probe_cache.evict(list_files)
+
+def bench_library_add(n_library=10000, n_add=1000):
+    import tempfile
+    import tracemalloc
+
+    def synthetic_show(i):
+        return {"title": f"Show {i}", "path": f"/media/show/Show {i}",
+                "seasons": {"01": {"season_info": {"season_number": 1, "episode_count": 12},
+                                   "path": f"/media/show/Show {i}/Season 01",
+                                   "current_episode": {}}}}
+
+    with tempfile.TemporaryDirectory() as directory:
+        # before: the library was deep-copied twice and dumped in full for every added show
+        library = {str(i): synthetic_show(i) for i in range(n_library)}
+        tracemalloc.start()
+        st = time.perf_counter()
+        for i in range(n_library, n_library + n_add):
+            dic = deepcopy(library)
+            dic[str(i)] = synthetic_show(i)
+            library = deepcopy(dic)
+            json.dump(dic, open(os.path.join(directory, "shows.json"), "w", encoding="utf-8"), indent=5)
+            library = dic
+        et = time.perf_counter()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"before : {et - st:.2f} seconds, peak memory {peak / 1024 / 1024:.1f} MiB")
+
+        # after: one store transaction and an in-place insertion per added show
+        library = {str(i): synthetic_show(i) for i in range(n_library)}
+        store = LibraryStore(os.path.join(directory, "library.db"))
+        store.import_library("show", library)
+        tracemalloc.start()
+        st = time.perf_counter()
+        for i in range(n_library, n_library + n_add):
+            entry = synthetic_show(i)
+            store.put_media("show", str(i), entry)
+            library[str(i)] = entry
+        et = time.perf_counter()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"after : {et - st:.2f} seconds, peak memory {peak / 1024 / 1024:.1f} MiB")
+
+def bench_tmdb_lookup(n_entries=50000, n_lookups=1000):
+    import random
+
+    saved_tmdb_db = Server.tmdb_db
+    Server.tmdb_db = {f"Title {i}": {"id": i, "name": f"Title {i}", "genres": [{"name": "Animation"}],
+                                     "seasons": []} for i in range(n_entries)}
+    Server.rebuild_tmdb_index()
+    ids = [random.randrange(n_entries) for _ in range(n_lookups)]
+    try:
+        st = time.perf_counter()
+        for id in ids:
+            [Server.tmdb_db[i] for i in Server.tmdb_db if Server.tmdb_db[i]["id"] == id][0]
+        et = time.perf_counter()
+        print(f"linear scan : {(et - st) / n_lookups * 1e6:.1f} us per lookup")
+        st = time.perf_counter()
+        for id in ids:
+            Server.tmdb_db[Server.get_tmdb_title_by_id(id)]
+        et = time.perf_counter()
+        print(f"id index : {(et - st) / n_lookups * 1e6:.1f} us per lookup")
+    finally:
+        Server.tmdb_db = saved_tmdb_db
+        Server.rebuild_tmdb_index()
+
+def bench_title_matcher(corpus=None):
+    from thefuzz import process
+
+    if corpus is None:
+        corpus = ["86 Eighty-Six", "KonoSuba An Explosion on This Wonderful World", "Iseleve",
+                  "Dragons Rescue Riders", "Kono Subarashii Sekai ni Bakuen wo!", "Kaminaki Sekai no Kamisama Katsudou",
+                  "Vinland Saga", "Rougo ni Sonaete Isekai de 8-manmai no Kinka o Tamemasu",
+                  "Saving 80,000 Gold in Another World for my Retirement",
+                  "Butareba -The Story of a Man Who Turned into a Pig-", "The iDOLMASTER Million Live!",
+                  "Bocchi the Rock!", "law and order svu", "Les Feux De L'amour The Young and The Restless",
+                  "The Full Monty The Serie", "Youre the Worst", "Greys Anatomy", "Une mauvaise mère"]
+        corpus = [*corpus, *Server.tmdb_title, *Server.tmdb_db]
+    titles = [i for i in Server.tmdb_db]
+    mismatch = 0
+    extract_time, matcher_time = 0, 0
+    for title in corpus:
+        st = time.perf_counter()
+        best = process.extractOne(title, titles)
+        expected = best[0] if best is not None and best[1] >= 90 else None
+        et = time.perf_counter()
+        match = Server.title_matcher.match(title, threshold=90)
+        found = match[0] if match is not None else None
+        extract_time += et - st
+        matcher_time += time.perf_counter() - et
+        if found != expected:
+            mismatch += 1
+            print(f"mismatch for {title}: extractOne {expected}, matcher {found}")
+    print(f"{len(corpus)} titles against {len(titles)} tmdb_db keys, {mismatch} mismatch")
+    print(f"extractOne : {extract_time:.3f} s, matcher : {matcher_time:.3f} s")
+
+def bench_tmdb_refresh(n_ids=200, rate=50, workers=(1, 4), latency=0.05):
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from Refresh import TmdbRefresher
+
+    class StubTmdb(BaseHTTPRequestHandler):
+        # answers like api.themoviedb.org/3 for tv/{id}, tv/{id}/episode_groups, tv/episode_group/{id}, movie/{id}
+        def do_GET(self):
+            time.sleep(latency)
+            path = urlparse(self.path).path.strip("/").split("/")
+            if path[0] == "tv" and path[1] == "episode_group":
+                body = {"groups": [{"name": "Season 1", "order": 1, "episodes": [{"air_date": "2023-01-01"}] * 12}]}
+            elif path[0] == "tv" and len(path) == 3:
+                body = {"results": [{"name": "Seasons", "id": f"g{path[1]}"}]}
+            elif path[0] == "tv":
+                body = {"id": int(path[1]), "name": f"Show {path[1]}", "status": "Returning Series",
+                        "last_air_date": "2023-01-01", "genres": [{"name": "Animation"}], "seasons": []}
+            else:
+                body = {"id": int(path[1]), "title": f"Movie {path[1]}", "status": "Released"}
+            data = json.dumps(body).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubTmdb)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    if tmdb.API_KEY is None:
+        tmdb.API_KEY = "stub"
+    items = [(i, ["anime", "show", "movie"][i % 3]) for i in range(n_ids)]
+    try:
+        for n in workers:
+            refresher = TmdbRefresher(workers=n, rate=rate, batch_size=50,
+                                      base_uri=f"http://127.0.0.1:{server.server_address[1]}")
+            st = time.perf_counter()
+            results = [result for batch in refresher.refresh(items) for result in batch]
+            et = time.perf_counter()
+            failed = [result for result in results if isinstance(result[2], Exception)]
+            stale = [result for result in results if refresher.is_stale(result[2], now=time.time() + 2 * 86400)]
+            print(f"{n} workers : {len(results)} ids in {et - st:.2f} s ({len(failed)} failed), "
+                  f"{len(stale)} stale two days later")
+    finally:
+        server.shutdown()
+
+def bench_release_parser(n_rounds=500):
+    # the golden corpus of tests/test_parser.py, which checks the parsed fields
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "tests", "fixtures", "releases.json"),
+              "r", encoding="utf-8") as f:
+        file_names = [strip_brackets(release["name"]) for release in json.load(f)]
+    st = time.perf_counter()
+    for _ in range(n_rounds):
+        for file_name in file_names:
+            parse_release(file_name)
+    et = time.perf_counter()
+    print(f"parse_release : {n_rounds * len(file_names) / (et - st):.0f} names/s")
+
+def bench_strip_brackets(n_tags=(10, 100, 1000)):
+    for n in n_tags:
+        # fansub names stacking tags, nested and unclosed groups
+        name = "[Erai-raws] Vinland Saga - S02E23 " + "[1080p][HEVC]{x265}(CR)[Multi [Subs]]" * n + "(v2.mkv"
+        st = time.perf_counter()
+        looped = name
+        for char1, char2 in BRACKET_PAIRS:
+            while char1 in looped and char2 in looped:
+                looped = delete_from_to(looped, char1, char2)
+        et = time.perf_counter()
+        stripped = strip_brackets(name)
+        ft = time.perf_counter()
+        if stripped != looped:
+            print(f"mismatch for {n} tags")
+        print(f"{len(name)} characters : delete_from_to loop {et - st:.4f} s, strip_brackets {ft - et:.6f} s")
+
+def bench_feed_storage_memory(n_entries=100000, n_shows=500):
+    import tracemalloc
+    from Parser import clean_release_name
+
+    names = [f"[Group] Synthetic Show {i % n_shows} - S01E{i // n_shows % 24 + 1:02} [1080p].mkv"
+             for i in range(n_entries)]
+    infos = [{"id": i, "name": f"Synthetic Show {i}", "seasons": []} for i in range(n_shows)]
+
+    def sorter_shows(i, name):
+        # what a SorterShows built with file_reachable=False keeps, its Show included, without the TMDB lookups
+        file_name = os.path.basename(strip_brackets(name))
+        release = parse_release(file_name)
+        info = infos[i % n_shows]
+        show = object.__new__(Show)
+        show.__dict__.update(search=tmdb.Search(), path="ok", is_show=True, title=info["name"], info=info,
+                             id=info["id"])
+        ep = object.__new__(SorterShows)
+        ep.__dict__.update(search=tmdb.Search(), path=name, file_reachable=False, file_name=file_name,
+                           clean_file_name=clean_release_name(file_name), ext=os.path.splitext(file_name)[1],
+                           spec={'audio': {'codec': ['Unknown'], 'language': ['Unknown']},
+                                 'subtitles': {'codec': ['Unknown'], 'language': ['Unknown']},
+                                 'video': {'codec': 'Unknown', 'height': -1}},
+                           codec="Unknown_codec", lang="unknown_language", list_subs_lang=[], list_audio_lang=[],
+                           resolution="Unknownp", release=release, season=release.season,
+                           original_title=release.title, title=show.title, show=show, tmdb_info=info, id=show.id,
+                           ep=release.episode, source=release.group)
+        return ep
+
+    def episode_ref(i, name):
+        file_name = os.path.basename(strip_brackets(name))
+        release = parse_release(file_name)
+        info = infos[i % n_shows]
+        return EpisodeRef(name, info["id"], info["name"], release.season, release.episode, release.group,
+                          os.path.splitext(file_name)[1], "show")
+
+    for label, build in [("SorterShows", sorter_shows), ("EpisodeRef", episode_ref)]:
+        tracemalloc.start()
+        st = time.perf_counter()
+        records = [build(i, name) for i, name in enumerate(names)]
+        feed_storage = {}
+        for ep in records:
+            feed_storage.setdefault(str(ep.id), {}).setdefault(ep.season, {})[ep.ep] = {
+                "torrent_title": ep.path if label == "SorterShows" else ep.name,
+                "link": "link",
+                "origin_feed": "feed",
+                "seeders": 10,
+                "id": ep.id
+            }
+        et = time.perf_counter()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{label} : {n_entries} entries in {et - st:.2f} s, {current / 2 ** 20:.1f} MiB held, "
+              f"{peak / 2 ** 20:.1f} MiB peak")
+        del records, feed_storage
+
+@contextmanager
+def synthetic_shows(n_shows: int):
+    """
+    Replaces tmdb_db, the show library and the episode index with `n_shows` synthetic shows of one 24 episodes
+    season, the first 12 of them in the library, and restores them on exit. Yields the seconds spent building the
+    episode index.
+    """
+    saved = Server.tmdb_db, DataBase.shows, DataBase.episode_index
+    Server.tmdb_db = {f"Synthetic Show {i}": {"id": i, "name": f"Synthetic Show {i}", "genres": [],
+                                              "seasons": [{"season_number": 1, "episode_count": 24}]}
+                      for i in range(n_shows)}
+    Server.rebuild_tmdb_index()
+    DataBase.shows = {str(i): {"title": f"Synthetic Show {i}", "path": f"/media/show/Synthetic Show {i}",
+                               "seasons": {"01": {"path": f"/media/show/Synthetic Show {i}/Season 01",
+                                                  "current_episode": {f"{e:02}": {} for e in range(1, 13)}}}}
+                      for i in range(n_shows)}
+    DataBase.episode_index = EpisodeIndex()
+    try:
+        st = time.perf_counter()
+        for identifier in DataBase.shows:
+            DataBase.episode_index.add_media("show", identifier, DataBase.shows[identifier],
+                                             media_aliases(identifier, DataBase.shows[identifier]))
+        yield time.perf_counter() - st
+    finally:
+        Server.tmdb_db, DataBase.shows, DataBase.episode_index = saved
+        Server.rebuild_tmdb_index()
+
+def bench_media_identity_map(n_shows=500, n_episodes=10000):
+    episodes = [EpisodeRef(f"Synthetic Show {i % n_shows} - S01E{i // n_shows % 24 + 1:02}", i % n_shows,
+                           f"Synthetic Show {i % n_shows}", "01", f"{i // n_shows % 24 + 1:02}", None, ".mkv")
+                for i in range(n_episodes)]
+    db = object.__new__(DataBase)
+    with synthetic_shows(n_shows):
+        Server.media_objects.clear()
+        # before: a Show was built for every episode, each one resolving its title and info again
+        st = time.perf_counter()
+        before = []
+        for ep in episodes:
+            show = Show(DataBase.shows[str(ep.id)]["path"], ep.title)
+            before.append(ep.ep in show.list_season().get(ep.season, {}).get("current_episode", {}))
+        et = time.perf_counter()
+        print(f"Show per episode : {et - st:.3f} s")
+        st = time.perf_counter()
+        found = [DataBase.find(ep.title, shows=True) for ep in episodes]
+        et = time.perf_counter()
+        print(f"DataBase.find : {et - st:.3f} s, {len({id(show) for show in found})} objects")
+        st = time.perf_counter()
+        after = [db.have_ep(ep, shows=True) for ep in episodes]
+        et = time.perf_counter()
+        print(f"have_ep : {et - st:.3f} s")
+        if before != after or any(show.id != ep.id for show, ep in zip(found, episodes)):
+            print("mismatch between both lookups")
+
+def bench_have_ep(n_shows=5000, n_candidates=10000):
+    import random
+
+    candidates = []
+    for _ in range(n_candidates):
+        i, e = random.randrange(n_shows), random.randint(1, 24)
+        candidates.append(EpisodeRef(f"Synthetic Show {i} - S01E{e:02}", i, f"Synthetic Show {i}", "01", f"{e:02}",
+                                     None, ".mkv"))
+    db = object.__new__(DataBase)
+    server = Server()
+    with synthetic_shows(n_shows) as index_seconds:
+        print(f"index of {n_shows} shows built in {index_seconds:.3f} s")
+        # before: DataBase.find resolved the title and built the show for every candidate
+        st = time.perf_counter()
+        before = []
+        for ep in candidates:
+            tmdb_title = server.find_tmdb_title(ep.title, shows=True)
+            info = server.get_tmdb_info(tmdb_title, show=True)
+            show = Show(DataBase.shows[str(info["id"])]["path"], tmdb_title)
+            before.append(ep.ep in show.seasons_created.get(ep.season, {}).get("current_episode", {}))
+        et = time.perf_counter()
+        print(f"find and build : {(et - st) / n_candidates * 1e6:.1f} us per candidate")
+        st = time.perf_counter()
+        after = [db.have_ep(ep, shows=True) for ep in candidates]
+        et = time.perf_counter()
+        print(f"presence index : {(et - st) / n_candidates * 1e6:.2f} us per candidate")
+        if before != after:
+            print("mismatch between both lookups")
+
+def bench_missing_episodes(n_shows=5000, n_rounds=10):
+    library = {str(i): {"seasons": {f"{s:02}": {"season_info": {"episode_count": 24},
+                                                "current_episode": {f"{e:02}": {} for e in range(1, 25) if e != i % 30}}
+                                    for s in range(1, 4)}}
+               for i in range(n_shows)}
+    tracker = MissingEpisodes()
+    for identifier in library:
+        tracker.add_media("show", identifier, library[identifier])
+
+    # before: every episode number of every season was checked, and the result deep-copied
+    st = time.perf_counter()
+    for _ in range(n_rounds):
+        temp = {}
+        for show in library:
+            for season in library[show]["seasons"]:
+                for i in range(1, library[show]["seasons"][season]["season_info"]["episode_count"] + 1):
+                    if library[show]["seasons"][season]["current_episode"].get(str(i).zfill(2), None) is None:
+                        temp.setdefault(show, {}).setdefault(season, []).append(str(i).zfill(2))
+        before = deepcopy(temp)
+    et = time.perf_counter()
+    print(f"recompute : {(et - st) / n_rounds * 1000:.1f} ms")
+    st = time.perf_counter()
+    for _ in range(n_rounds):
+        after = tracker.missing()["show"]
+    et = time.perf_counter()
+    print(f"tracker : {(et - st) / n_rounds * 1000:.2f} ms for {tracker.count()['show']} missing episodes")
+    if before != after:
+        print("mismatch between both lists")
+
+def bench_nfo_parser(corpus_dir=None, n_rounds=20):
+    from thefuzz import fuzz
+    from Nfo import parse_nfo
+
+    # the raw answers of engine/get_nfo saved in corpus_dir, else a generated MediaInfo dump per release
+    if corpus_dir is not None:
+        corpus = []
+        for name in sorted(os.listdir(corpus_dir)):
+            with open(os.path.join(corpus_dir, name), "rb") as f:
+                corpus.append(str(f.read()))
+    else:
+        corpus = []
+        for i in range(50):
+            dump = ["<pre>General", f"Unique ID                                : {i * 7919}",
+                    f"Complete name                            : Show.S01E{i:02}.MULTi.1080p.WEB.x264-GRP.mkv",
+                    "Format                                   : Matroska", "Format version                           : Version 4",
+                    f"File size                                : {i + 1}.{i} GiB", "Duration                                 : 23 min 40 s",
+                    "", "Video", "ID                                       : 1", "Format                                   : AVC",
+                    "Format/Info                              : Advanced Video Codec", "Format profile                           : High@L4",
+                    "Codec ID                                 : V_MPEG4/ISO/AVC", f"Width                                    : {1920 - i} pixels",
+                    "Height                                   : 1 080 pixels", "Display aspect ratio                     : 16:9",
+                    "Frame rate                               : 23.976 (24000/1001) FPS", "Writing library                          : x264 core 164 r3095 baf4e8e",
+                    "Encoding settings                        : " + "cabac=1 / ref=4 / " * 20]
+            for track in range(1 + i % 3):
+                dump += ["", f"Audio #{track + 1}", "Format                                   : E-AC-3",
+                         "Codec ID                                 : A_EAC3", "Duration                                 : 23 min 40 s",
+                         "Channel(s)                               : 6 channels", "Language                                 : French",
+                         "Default                                  : Yes"]
+            for track in range(i % 4):
+                dump += ["", f"Text #{track + 1}", "Format                                   : ASS",
+                         "Codec ID                                 : S_TEXT/ASS", "Title                                    : Français (Forcés)",
+                         "Language                                 : Français", "Forced                                   : No"]
+            dump += ["", "Menu", "00:00:00.000                             : en:Opening", "00:01:30.000                             : en:Part A</pre>"]
+            corpus.append(str("\n".join(dump).encode("utf-8")))
+
+    # before: the lines were rebuilt character by character and every key scored against every wanted name
+    def legacy(nfo_content):
+        content = bytes(str(nfo_content).replace('b"<pre>', "").replace('\n</pre>"', ""), "utf-8").decode(
+            'unicode_escape', errors='ignore')
+        lines = []
+        for line in content.split("\n"):
+            temp = ""
+            for car in line:
+                if (car.isalnum() or car == " " or car == "." or car == ":") and car != "â":
+                    temp += car
+            lines.append(temp.strip())
+
+        def get_value(part):
+            key, value = "", ""
+            while part != "" and part[0] != ":":
+                key += part[0]
+                part = part[1:]
+            part, key = part[1:], key.replace(".", "").lower().strip()
+            while part != "":
+                value += part[0]
+                part = part[1:]
+            return key, value.strip()
+
+        def wanted(key, names, threshold):
+            key = remove_non_ascii(key).lower()
+            for name in names:
+                if fuzz.ratio(key, remove_non_ascii(name).lower()) > threshold:
+                    return name
+            return False
+
+        result, temp, title = {}, {}, None
+        for part in lines:
+            key, value = get_value(part)
+            if key == "" and value == "":
+                continue
+            elif key != "" and value == "":
+                if title is not None:
+                    if temp != {title: {}}:
+                        result = {**result, **deepcopy(temp)}
+                    temp.clear()
+                key = wanted(key, ConnectorShowBase.wanted_nfo_title, 65)
+                if key:
+                    title = key
+                    temp[title] = {}
+                else:
+                    key = "None"
+            if title is not None and title != key and len(key) < 30 and len(value) < 60 and key != "None":
+                key = wanted(key, ConnectorShowBase.wanted_nfo_specification, 80)
+                if temp.get(title, None) is None:
+                    temp[title] = {}
+                if key:
+                    temp[title][key] = value
+        return delete_empty_dictionnaries({**result, **deepcopy(temp)})
+
+    mismatch = 0
+    for nfo in corpus:
+        if legacy(nfo) != parse_nfo(nfo, ConnectorShowBase.nfo_titles, ConnectorShowBase.nfo_specifications):
+            mismatch += 1
+    print(f"{len(corpus)} NFOs, {mismatch} mismatch")
+    st = time.perf_counter()
+    for _ in range(n_rounds):
+        for nfo in corpus:
+            legacy(nfo)
+    et = time.perf_counter()
+    print(f"legacy parser : {(et - st) / (n_rounds * len(corpus)) * 1000:.2f} ms/NFO")
+    st = time.perf_counter()
+    for _ in range(n_rounds):
+        for nfo in corpus:
+            parse_nfo(nfo, ConnectorShowBase.nfo_titles, ConnectorShowBase.nfo_specifications)
+    et = time.perf_counter()
+    print(f"parse_nfo : {(et - st) / (n_rounds * len(corpus)) * 1000:.3f} ms/NFO")
+
+def bench_result_page(fixtures_dir=None, n_rounds=20):
+    from bs4 import BeautifulSoup
+    from Scrape import parse_result_page
+
+    # the search pages saved in fixtures_dir, else generated pages of 50 results
+    if fixtures_dir is not None:
+        pages = []
+        for name in sorted(os.listdir(fixtures_dir)):
+            with open(os.path.join(fixtures_dir, name), "rb") as f:
+                pages.append(f.read())
+    else:
+        pages = []
+        for page in range(10):
+            rows = []
+            for i in range(50):
+                torrent_id = page * 1000 + i
+                rows.append(f"""<tr><td><div class="hidden">2179</div><span class="tag_subcat_2179"></span></td>
+<td><a id="torrent_name" href="/torrent/filmvideo/serie-tv/{torrent_id}-show">
+  Show.S{page + 1:02}E{i + 1:02}.MULTi.1080p.WEB.x264-GRP{'' if i % 7 else ' &amp; Co'}</a></td>
+<td><a target="{torrent_id}" id="get_nfo"><img src="/static/nfo.png"></a></td>
+<td>{i % 5}</td><td><div class="hidden">1700000000</div><span class="ico_clock-o"></span> il y a {i} jours</td>
+<td>{i + 1}.{page}Go</td><td>{i * 3}</td><td>{(i * 37) % 101}</td><td>{i % 4}</td></tr>""")
+            pages.append(f"""<html><body><div id="top"><h2>Résultats de recherche <font style="float: right">{500 + page} résultats trouvés</font></h2>
+<table class="table"><thead><tr><th>Type</th><th>Nom</th><th>NFO</th><th>Comm.</th><th>Age</th><th>Taille</th>
+<th>Compl.</th><th>Seed</th><th>Leech</th></tr></thead><tbody>{"".join(rows)}</tbody></table>
+<ul class="pagination"><li><a href="?page=50">2</a></li></ul></div></body></html>""".encode("utf-8"))
+
+    # before: a BeautifulSoup tree searched several times, the lists zipped by position
+    def legacy(content):
+        html = BeautifulSoup(content, features="html.parser")
+        h2_tags_with_font = [h2_tag for h2_tag in html.find_all("h2") if h2_tag.find("font", style="float: right")]
+        if len(h2_tags_with_font) == 0:
+            return None, None
+        text_contents = [font_tag.text.strip() for h2_tag in h2_tags_with_font for font_tag in
+                         h2_tag.find_all("font")]
+        total_result = int(text_contents[0].split(" ")[0])
+        target_values = [element["target"] for element in html.find_all("a", id="get_nfo")]
+        torrent_names = [element.text.strip() for element in html.find_all("a", id="torrent_name")]
+        list_trs = []
+        for tr in html.find_all("tr"):
+            for td in tr.find_all("td"):
+                if td.find("a", {"id": "torrent_name"}) is not None:
+                    list_trs.append(tr)
+        seeders = [tr.find_all("td")[-2].get_text(strip=True) for tr in list_trs]
+        return {f"{name}": {"id": id, "seeders": seed} for name, id, seed in
+                zip(torrent_names, target_values, seeders)}, total_result
+
+    def single_pass(content):
+        rows, total = parse_result_page(content)
+        if rows is None:
+            return None, None
+        return {row.name: {"id": row.torrent_id, "seeders": row.seeders} for row in rows}, total
+
+    mismatch = sum(legacy(page) != single_pass(page) for page in pages)
+    print(f"{len(pages)} pages, {mismatch} mismatch")
+    st = time.perf_counter()
+    for _ in range(n_rounds):
+        for page in pages:
+            legacy(page)
+    et = time.perf_counter()
+    print(f"BeautifulSoup : {(et - st) / (n_rounds * len(pages)) * 1000:.2f} ms/page")
+    st = time.perf_counter()
+    for _ in range(n_rounds):
+        for page in pages:
+            parse_result_page(page)
+    et = time.perf_counter()
+    print(f"parse_result_page : {(et - st) / (n_rounds * len(pages)) * 1000:.2f} ms/page")
+
+def bench_search_pages(n_results=500, workers=(1, 4), rate=20, latency=0.1):
+    import tempfile
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import parse_qs
+    from Cache import PageCache
+    from Throttle import RateLimiter
+
+    class StubYgg(BaseHTTPRequestHandler):
+        # answers a search of n_results results, 50 per page
+        def do_GET(self):
+            time.sleep(latency)
+            page = int(parse_qs(urlparse(self.path).query).get("page", ["0"])[0])
+            rows = "".join(f'<tr><td></td><td><a id="torrent_name">Show S01E{i:03} 1080p</a></td>'
+                           f'<td><a target="{i}" id="get_nfo"></a></td><td>{i % 50}</td><td>0</td></tr>'
+                           for i in range(page, min(page + 50, n_results)))
+            data = (f'<h2>Recherche <font style="float: right">{n_results} résultats</font></h2>'
+                    f'<table>{rows}</table>').encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubYgg)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    page_cache = YggConnector.page_cache
+    try:
+        for n in workers:
+            # a connector without its conf file, and a cold page cache
+            connector = YggConnector.__new__(YggConnector)
+            connector.domain = f"http://127.0.0.1:{server.server_address[1]}/"
+            connector.limiter, connector.page_workers = RateLimiter(rate), n
+            YggConnector.page_cache = PageCache(os.path.join(tempfile.mkdtemp(), "page_cache.db"))
+            st = time.perf_counter()
+            results = connector.get_results(f"{connector.domain}engine/search?name=toreplace", "show")
+            et = time.perf_counter()
+            print(f"{n} workers : {len(results)} results in {et - st:.2f} s, "
+                  f"{connector.limiter.waited:.2f} s waited for the limiter")
+    finally:
+        YggConnector.page_cache = page_cache
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    # python bench.py probe_pool tmdb_lookup ... runs bench_probe_pool, bench_tmdb_lookup, ...
+    for name in sys.argv[1:]:
+        globals()[f"bench_{name}"]()
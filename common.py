@@ -5,6 +5,7 @@ import os
 import platform
 import shutil
 import socket
+import threading
 import time
 from typing import Dict, Union
 from urllib.parse import urlparse, quote
@@ -15,6 +16,12 @@ import tmdbsimple as tmdb
 from thefuzz import process
 import re
 from copy import deepcopy
+from Cache import NfoCache, NfoKeyCache, PageCache, ProbeCache, TitleCache
+from Http import HttpClient
+from Matcher import TitleMatcher
+from Refresh import TmdbRefresher
+from Parser import (BRACKET_PAIRS, ParsedRelease, delete_from_to, isolate_numbers, parse_language, parse_release,
+                    strip_brackets)
 
 if platform.system() == "Linux":
     import psutil
@@ -38,6 +45,7 @@ TMDB_TITLE = os.path.join("data", "tmdb_tile.json")
 ANIME_LIB = os.path.join("lib", "anime.json")
 SHOWS_LIB = os.path.join("lib", "shows.json")
 MOVIES_LIB = os.path.join("lib", "movie.json")
+LIBRARY_DB = os.path.join("lib", "library.db")
 TMDB_DB = os.path.join("data", "tmdb_db.json")
 FEED_STORAGE = os.path.join("data", "feed_storage.json")
 RSS_ANIME = os.path.join("rss", "rss_anime.dat")
@@ -47,6 +55,14 @@ QUERY_SHOW = os.path.join("data", "query_show.dat")
 QUERY_ANIME = os.path.join("data", "query_anime.dat")
 QUERY_MOVIE = os.path.join("data", "guery_movie.dat")
 GGD_LIB = os.path.join("data", "ggd_lib.json")
+GGD_CURSOR = os.path.join("data", "ggd_cursor.json")
+GGD_PENDING = os.path.join("data", "ggd_pending.json")
+GGD_INDEX = os.path.join("data", "ggd_index.json")
+TITLE_CACHE = os.path.join("data", "title_cache.db")
+PROBE_CACHE = os.path.join("data", "probe_cache.db")
+NFO_CACHE = os.path.join("data", "nfo_cache.db")
+PAGE_CACHE = os.path.join("data", "page_cache.db")
+NFO_KEY_CACHE = os.path.join("data", "nfo_key_cache.db")
 list_language = ["french"]
 SUB_LIST = {"VOSTFR": "fre", "OmdU": "ger"}
 BAN_ID_FILE = os.path.join(CONF_DIR, "list_ban_id.list")
@@ -61,23 +77,11 @@ os.makedirs(LOGS_DIR, exist_ok=True)
 
 
 def flareSolverr_cookies_useragent(url : str =None):
-    data = {
-        "cmd" : "request.get",
-        "url" : url,
-        "maxTimeout" : 60000
-
-    }
-    response = requests.post(FLARESOLVERRURL,json=data, headers={'Content-Type': 'application/json'})
-    if response.status_code == 200:
-        response_data = json.loads(response.content)
-        cookies = response_data["solution"]["cookies"]
-        cookies = {cookie["name"] : cookie["value"] for cookie in cookies}
-
-        user_agent = response_data["solution"]["userAgent"]
-
-        return cookies, user_agent
-
-    return None, None
+    """
+    Solves the site of `url` with FlareSolverr and returns its cookies and user agent, also kept for the next
+    requests made through `Server.http.get_protected`.
+    """
+    return Server.http.refresh_clearance(url)
 
 def get_dir_size(path="."):
     total = 0
@@ -104,6 +108,55 @@ def remove_non_ascii(chaine):
     return chaine_decodee
 
 
+def atomic_json_dump(data, path: str, indent=5):
+    """
+    Writes `data` as JSON to `path` through a temporary file renamed over the target, so an interrupted write never
+    leaves a truncated file behind.
+    """
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=indent)
+    os.replace(temp_path, path)
+
+
+class JsonCheckpoint():
+    """
+    Flushes a JSON document to disk every `every` steps or every `interval` seconds, whichever comes first.
+
+    Example:
+        >>> checkpoint = JsonCheckpoint("lib.json", every=100, interval=30)
+        >>> for file in files:
+        ...     lib[file] = parse(file)
+        ...     checkpoint.step(lib)
+        >>> checkpoint.flush(lib)
+    """
+
+    def __init__(self, path: str, every: int = 200, interval: float = 60):
+        self.path = path
+        self.every = every
+        self.interval = interval
+        self.pending = 0
+        self.last_flush = time.monotonic()
+
+    def step(self, data) -> bool:
+        """
+        Records one change to `data` and flushes it if a checkpoint is due.
+
+        Returns:
+            bool: True if `data` was written to disk.
+        """
+        self.pending += 1
+        if self.pending >= self.every or time.monotonic() - self.last_flush >= self.interval:
+            self.flush(data)
+            return True
+        return False
+
+    def flush(self, data):
+        atomic_json_dump(data, self.path)
+        self.pending = 0
+        self.last_flush = time.monotonic()
+
+
 def list_all_files(directory: str) -> list:
     """
     Recursively lists all files within a directory.
@@ -216,7 +269,7 @@ def safe_move(src, dst, max_retries=2, retry_delay=1):
 
 def is_connected() -> bool:
     try:
-        requests.get("https://google.com")
+        Server.http.get("https://google.com")
     except requests.exceptions.ConnectionError:
         return False
     return True
@@ -503,75 +556,6 @@ def forbidden_car(name):
     return name
 
 
-def delete_from_to(string, fromm, to):
-    """
-    Deletes a substring from the given string, starting from the specified 'from' substring
-    and ending at the specified 'to' substring (both inclusive).
-
-    Args:
-        string (str): The original string.
-        fromm (str): The starting substring to be deleted.
-        to (str): The ending substring to be deleted.
-
-    Returns:
-        str: The modified string after deleting the specified substring.
-
-    Raises:
-        ValueError: If the 'from' or 'to' substrings are not found in the original string.
-
-    Example:
-        >>> delete_from_to("Hello [world], how are you?", "[", "]")
-        'Hello , how are you?'
-    """
-    if fromm not in string:
-        raise ValueError(f"'{fromm}' not found in '{string}'")
-    if to not in string:
-        raise ValueError(f"'{to}' not found in '{string}'")
-
-    result = ""
-    while string[0] != fromm:
-        result += string[0]
-        string = string[1:]
-
-    while string[0] != to:
-        string = string[1:]
-
-    string = string[1:]
-    return result + string
-
-
-def isolate_numbers(temp_file):
-    """
-    Retrieves a list of all numbers present in the given string.
-
-    Args:
-        temp_file (str): The input string.
-
-    Returns:
-        list: A list of all numbers found in the string.
-
-    Example:
-        >>> isolate_numbers("abc 123 xyz 456")
-        ['123', '456']
-    """
-    numbers = []
-    current_number = ""
-
-    while temp_file != "":
-        if temp_file[0].isnumeric():
-            current_number += temp_file[0]
-            temp_file = temp_file[1:]
-            while temp_file != "" and temp_file[0].isnumeric():
-                current_number += temp_file[0]
-                temp_file = temp_file[1:]
-            numbers.append(current_number)
-            current_number = ""
-        else:
-            temp_file = temp_file[1:]
-
-    return numbers
-
-
 def check_json(path):
     """
     Checks if the given file is a valid JSON file.
@@ -624,6 +608,29 @@ def correct_and_encode_url(url):
     return corrected_url
 
 
+def normalize_title(title: str) -> str:
+    """
+    Lowercases a title and keeps only its letters and digits, single-spaced.
+
+    Example:
+        >>> normalize_title("KonoSuba: An Explosion on This Wonderful World!")
+        'konosuba an explosion on this wonderful world'
+    """
+    return " ".join("".join(car if car.isalnum() else " " for car in title.lower()).split())
+
+
+def tmdb_media_type(info: dict) -> str:
+    """
+    Returns "anime", "show" or "movie" for a tmdb_db entry: an entry with seasons is a show, an anime if it is
+    in the Animation genre, and an entry without seasons is a movie.
+    """
+    if info.get("seasons", None) is None:
+        return "movie"
+    if [] != [i for i in info.get("genres", []) if i["name"] == "Animation"]:
+        return "anime"
+    return "show"
+
+
 class Server():
     tmdb_title: dict
     tmdb_db: dict
@@ -636,7 +643,7 @@ class Server():
 
     list_file = [ANIME_LIB, QUERY_MOVIE, QUERY_SHOW, MOVIES_LIB, SHOWS_LIB, CONF_FILE, TMDB_TITLE, TMDB_DB,
                  RSS_SHOW, RSS_ANIME,
-                 RSS_MOVIE, GGD_LIB, FEED_STORAGE, QUERY_ANIME, os.path.join(CONF_DIR, CONF_FILE), BAN_ID_FILE]
+                 RSS_MOVIE, GGD_LIB, GGD_INDEX, FEED_STORAGE, QUERY_ANIME, os.path.join(CONF_DIR, CONF_FILE), BAN_ID_FILE]
     for file in list_file:
         path = os.path.join(VAR_DIR, file)
         if os.path.isfile(path) and check_json(path):
@@ -655,6 +662,18 @@ class Server():
     query_anime = open(os.path.join(VAR_DIR, QUERY_ANIME), "r").read().split("\n")
     query_show = open(os.path.join(VAR_DIR, QUERY_SHOW), "r").read().split("\n")
     query_movie = open(os.path.join(VAR_DIR, QUERY_ANIME), "r").read().split("\n")
+    probe_cache = ProbeCache(os.path.join(VAR_DIR, PROBE_CACHE))
+
+    # secondary indexes over tmdb_db, kept in sync by update_tmdb_db and delete_tmdb_db_item
+    tmdb_id_index = {}
+    tmdb_type_index = {"anime": set(), "show": set(), "movie": set()}
+    tmdb_normalized_index = {}
+    title_matcher = TitleMatcher()
+    # identity map of the Show, Anime and Movie objects by (kind, id), see Database.get_media
+    media_objects = {}
+    # held while tmdb_db, tmdb_title, their indexes or media_objects change or are saved, the connectors resolve
+    # titles from concurrent threads
+    tmdb_lock = threading.RLock()
 
     CPU_TEMP = get_temp()
     TASK_GGD_SCAN = 100
@@ -738,6 +757,16 @@ class Server():
             quit()
 
     conf = load_config()
+    PROBE_WORKERS = int(conf.get("probe_workers", 4))
+    tmdb_refresher = TmdbRefresher(workers=int(conf.get("tmdb_refresh_workers", 4)),
+                                   rate=float(conf.get("tmdb_rate_limit", 20)),
+                                   batch_size=int(conf.get("tmdb_refresh_batch", 50)),
+                                   base_uri=conf.get("tmdb_base_url", None))
+    title_cache = TitleCache(os.path.join(VAR_DIR, TITLE_CACHE), size=int(conf.get("title_cache_size", 2048)),
+                             negative_ttl=int(conf.get("title_cache_negative_ttl", 86400)))
+    http = HttpClient(timeout=float(conf.get("http_timeout", 30)), retries=int(conf.get("http_retries", 3)),
+                      backoff=float(conf.get("http_backoff", 0.5)), pool_size=int(conf.get("http_pool_size", 10)),
+                      solver_url=FLARESOLVERRURL)
 
     def __init__(self, enable=True):
 
@@ -770,7 +799,7 @@ class Server():
                 else:
                     open(path, "w")
 
-    def update_tmdb_db(self, title: str, info: dict):
+    def update_tmdb_db(self, title: str, info: dict, save: bool = True):
         """Updates the TMDB database with the provided title and information.
 
         This method updates the TMDB database stored in the `tmdb_db` attribute of the Server class. It takes a title as a
@@ -780,6 +809,7 @@ class Server():
             self: The Server instance.
             title (str): The title to be added or updated in the TMDB database.
             info (dict): The information associated with the title.
+            save (bool, optional): Whether to write tmdb_db.json, a batch of updates writes it once. Defaults to True.
 
         Returns:
             None
@@ -788,15 +818,78 @@ class Server():
             raise TypeError(f"title is not a string: {title}")
         if not isinstance(info, dict):
             raise TypeError(f"info is not a dictionary: {info}")
-        Server.tmdb_db[title] = info
-        json.dump(Server.tmdb_db, open(os.path.join(VAR_DIR, TMDB_DB), "w", encoding="utf-8"), indent=5)
+        with Server.tmdb_lock:
+            previous = Server.tmdb_db.get(title, None)
+            if previous is not None:
+                Server.forget_media(previous["id"])
+            Server.forget_media(info["id"])
+            if previous is not None and previous["id"] == info["id"]:
+                # a refresh of the same id keeps the title at its place in tmdb_id_index, only its media type may
+                # change
+                for index in Server.tmdb_type_index.values():
+                    index.discard(title)
+                Server.tmdb_db[title] = info
+                Server.tmdb_type_index[tmdb_media_type(info)].add(title)
+            else:
+                if previous is not None:
+                    Server.unindex_tmdb_item(title)
+                Server.tmdb_db[title] = info
+                Server.index_tmdb_item(title)
+            if save:
+                json.dump(Server.tmdb_db, open(os.path.join(VAR_DIR, TMDB_DB), "w", encoding="utf-8"), indent=5)
+
+    def index_tmdb_item(title: str):
+        """Adds the tmdb_db entry stored under `title` to the id, media type and normalized title indexes."""
+        info = Server.tmdb_db[title]
+        # like the linear scans it replaces, an id stored under several titles resolves to the first one
+        Server.tmdb_id_index.setdefault(info["id"], []).append(title)
+        Server.tmdb_type_index[tmdb_media_type(info)].add(title)
+        Server.tmdb_normalized_index.setdefault(normalize_title(title), []).append(title)
+        Server.title_matcher.add(title)
+
+    def unindex_tmdb_item(title: str):
+        """Removes the tmdb_db entry stored under `title` from the indexes, before it is replaced or deleted."""
+        info = Server.tmdb_db[title]
+        for index in Server.tmdb_type_index.values():
+            index.discard(title)
+        for index, key in [(Server.tmdb_id_index, info["id"]), (Server.tmdb_normalized_index, normalize_title(title))]:
+            if title in index.get(key, []):
+                index[key].remove(title)
+                if index[key] == []:
+                    index.pop(key)
+
+    def forget_media(id: int):
+        """Drops the media objects of a TMDB id from the identity map, once its tmdb_db or library entry changed."""
+        for kind in ("anime", "show", "movie"):
+            Server.media_objects.pop((kind, int(id)), None)
+
+    def rebuild_tmdb_index():
+        with Server.tmdb_lock:
+            Server.media_objects.clear()
+            Server.tmdb_id_index.clear()
+            Server.tmdb_normalized_index.clear()
+            for index in Server.tmdb_type_index.values():
+                index.clear()
+            Server.title_matcher.clear()
+            for title in Server.tmdb_db:
+                Server.index_tmdb_item(title)
+
+    def get_tmdb_title_by_id(id: int) -> str | None:
+        """Returns the tmdb_db key of the entry with the given TMDB id, None if it is not cached."""
+        titles = Server.tmdb_id_index.get(id, None)
+        if titles is None:
+            return None
+        return titles[0]
+
+    def get_tmdb_titles_by_type(media_type: str) -> set[str]:
+        """Returns the tmdb_db keys of the cached entries of a media type ("anime", "show" or "movie")."""
+        return Server.tmdb_type_index[media_type]
 
     def is_anime_by_id(self, id: int ) -> bool:
-        try:
-            title = [i for i in self.tmdb_db if self.tmdb_db[i]["id"] == id][0]
-        except IndexError:
-             return False
-        return [] != [i for i in self.tmdb_db[title]["genres"] if i["name"] == "Animation" and self.tmdb_db[title].get("seasons", None) is not None]
+        title = Server.get_tmdb_title_by_id(id)
+        if title is None:
+            return False
+        return title in Server.tmdb_type_index["anime"]
 
 
     def add_tmdb_title(determined_title: str, tmdb_title: str):
@@ -816,7 +909,8 @@ class Server():
             raise TypeError(f"determined_title is not a string: {determined_title}")
         if not isinstance(tmdb_title, str):
             raise TypeError(f"tmdb_title is not a string: {tmdb_title}")
-        Server.tmdb_title[determined_title] = tmdb_title
+        with Server.tmdb_lock:
+            Server.tmdb_title[determined_title] = tmdb_title
 
     def get_tmdb_title(determined_title: str) -> str | None:
         """
@@ -865,20 +959,14 @@ class Server():
         if ((show or anime) and movie) or not (show or movie or anime):
             raise ValueError("You have to specify either show or movie")
         if show:
-            s = tmdb.TV(id)
-            info = s.info(append_to_response="seasons,translations")
+            info = Server.tmdb_refresher.fetch(id, "show")
             t = "name"
         elif movie:
-            s = tmdb.Movies(id)
-            info = s.info(append_to_response="translations")
+            info = Server.tmdb_refresher.fetch(id, "movie")
             t = "title"
         elif anime:
-            s = tmdb.TV(id)
-            info = s.info(append_to_response="seasons,translations")
+            info = Server.tmdb_refresher.fetch(id, "anime")
             t = "name"
-            seasons = self.make_anime_seasons(info["id"])
-            if seasons is not None:
-                info["seasons"] = seasons
         else:
             raise ValueError("You have to specify either show or movie")
         if compare_dictionaries(info, {}):
@@ -889,10 +977,10 @@ class Server():
     def get_tmdb_info_by_id(self, id: int, anime: int | None = False,show: int | None = False, movie: bool | None = False):
         if not isinstance(id, int):
             raise TypeError(f"id should be int not {type(id)}")
-        else:
-            for keys in Server.tmdb_db:
-                if Server.tmdb_db[keys]["id"] == id:
-                    return Server.tmdb_db[keys]
+        with Server.tmdb_lock:
+            title = Server.get_tmdb_title_by_id(id)
+            if title is not None:
+                return Server.tmdb_db[title]
             info = self.store_tmdb_info(id, anime=anime, show=show, movie=movie)
             return info
 
@@ -941,34 +1029,7 @@ class Server():
             info = self.store_tmdb_info(id,anime=anime, show=show, movie=movie)
             return info
     def make_anime_seasons(self, id:int):
-        episode_group_id = [i for i in tmdb.TV(id).episode_groups()["results"] if i["name"] == "Seasons"]
-        if episode_group_id == []:
-            return None
-        episode_group_id = episode_group_id[0]["id"]
-        new_dic = {"seasons" : []}
-        info = tmdb.TV_Episode_Groups(id=episode_group_id).info()['groups']
-        for seasons in range(len(info)):
-            air_date = info[seasons]['episodes'][0]["air_date"]
-            episode_count = len(info[seasons]['episodes'])
-            id = 0
-            name = info[seasons]["name"]
-            overview = ""
-            poster_path = ""
-            season_number = info[seasons]["order"]
-            vote_average = 0
-            new_dic["seasons"].append( {
-                        "air_date": air_date,
-                        "episode_count": episode_count,
-                        "id": id,
-                        "name": name,
-                        "overview": "",
-                        "poster_path": poster_path,
-                        "season_number": season_number,
-                        "vote_average": vote_average
-                })
-        return new_dic["seasons"]
-        
-
+        return Server.tmdb_refresher.fetch_anime_seasons(id)
 
     def find_tmdb_title(self, title: str, anime=False, shows=False, movie=False) -> str | bool:
         """Finds the TMDB title for a given title and stores it in the TMDB database if not already present. Also using this function add all related information tmdb_db
@@ -993,29 +1054,38 @@ class Server():
         """
         if not isinstance(title, str):
             raise TypeError(f"{title} is not a string")
-        try:
-            tmdb_title, score = process.extractOne(title, [i for i in self.tmdb_db])
-            if score < 90:
+        # resolved under tmdb_lock, the concurrent connectors search the same title once and never see tmdb_db
+        # halfway through an update
+        with Server.tmdb_lock:
+            # same answer as process.extractOne over the tmdb_db keys with a score of at least 90
+            match = Server.title_matcher.match(title, threshold=90)
+            if match is not None:
+                tmdb_title = match[0]
+            else:
                 tmdb_title = Server.get_tmdb_title(title)
-        except TypeError:
-            tmdb_title = Server.get_tmdb_title(title)
-        if tmdb_title is not None:
-            return tmdb_title
-        elif anime or shows:
-            self.search.tv(query=title)
-            t = "name"
-        else:
-            self.search.movie(query=title)
-            t = "title"
-        try:
-            Server.add_tmdb_title(title, self.search.results[0][t])
-            return self.search.results[0][t]
-        except IndexError:
-            log(f"No title found for {title}", warning=True)
-            return False
-        except requests.exceptions.ReadTimeout:
-            log("Connection timeout to tmdb", warning=True)
-            return False
+            if tmdb_title is not None:
+                return tmdb_title
+            kind = "tv" if anime or shows else "movie"
+            # the same unresolvable names come back on every feed pass, they are not searched again until the
+            # negative entry expires
+            if Server.title_cache.get(kind, title):
+                return False
+            if kind == "tv":
+                self.search.tv(query=title)
+                t = "name"
+            else:
+                self.search.movie(query=title)
+                t = "title"
+            try:
+                Server.add_tmdb_title(title, self.search.results[0][t])
+                return self.search.results[0][t]
+            except IndexError:
+                log(f"No title found for {title}", warning=True)
+                Server.title_cache.put(kind, title)
+                return False
+            except requests.exceptions.ReadTimeout:
+                log("Connection timeout to tmdb", warning=True)
+                return False
 
     def delete_tmdb_db_item(self, title: str) -> bool:
         """
@@ -1031,12 +1101,16 @@ class Server():
         Returns:
             bool: True if the item was successfully deleted, False if the item was not found in the TMDB database.
         """
-        item = Server.tmdb_db.get(title, None)
-        if item is None:
-            return False
-        else:
-            Server.tmdb_db.pop(title)
-            return True
+        with Server.tmdb_lock:
+            item = Server.tmdb_db.get(title, None)
+            if item is None:
+                return False
+            else:
+                Server.forget_media(item["id"])
+                Server.unindex_tmdb_item(title)
+                Server.title_matcher.remove(title)
+                Server.tmdb_db.pop(title)
+                return True
 
     def dict_have_ep(self, dic: dict, identifier: int, season: int, episode: int) -> None | bool:
         if dic.get(str(identifier), None) is None:
@@ -1067,6 +1141,8 @@ class Server():
 
     
 
+Server.rebuild_tmdb_index()
+
 if __name__ == "__main__":
     s = Server(True)
     paths = ["/home", "/etc"]
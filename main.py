@@ -110,13 +110,17 @@ class deployServ():
 
             log("wait before closing saving data", warning=True)
             log("saving GGD_lib", warning=True)
-            json.dump(Gg_drive.dict_ep, open(os.path.join(VAR_DIR, GGD_LIB), "w", encoding="utf-8"), indent=5)
+            atomic_json_dump(Gg_drive.dict_ep, os.path.join(VAR_DIR, GGD_LIB))
+            log("exporting libraries to JSON ...", warning=True)
+            self.db.export_libraries()
             log("saving tmdb_title ...", warning=True)
             self.db.save_tmdb_title()
             log("saving tmdb_db ...", warning=True)
-            json.dump(Server.tmdb_db, open(os.path.join(VAR_DIR, TMDB_DB), "w", encoding="utf-8"), indent=5)
+            with Server.tmdb_lock:
+                json.dump(Server.tmdb_db, open(os.path.join(VAR_DIR, TMDB_DB), "w", encoding="utf-8"), indent=5)
             log("Saving feed storage ...", warning=True)
             json.dump(Feed.feed_storage, open(os.path.join(VAR_DIR, FEED_STORAGE), "w", encoding="utf-8"), indent=5)
+            ConnectorShowBase.nfo_key_cache.flush()
             log("Shutting down", warning=True)
             quit()
 
@@ -0,0 +1,60 @@
+import os
+
+import pytest
+
+pytest.importorskip("thefuzz")
+
+from Nfo import MEDIAINFO_KEYS, MEDIAINFO_SECTIONS, NfoKeyMap, parse_nfo, split_value
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# the wanted names and thresholds of ConnectorShowBase.nfo_titles and ConnectorShowBase.nfo_specifications
+WANTED_TITLES = ["text", "video", "audio", "mkv"]
+WANTED_SPECIFICATIONS = ["format", "codec id", "duration", "width", "height", "language", "resolution", "hauteur",
+                         "largeur", "duree"]
+
+
+def load_nfo(file: str) -> str:
+    # as get_nfo passes the body of the get_nfo page of ygg
+    with open(os.path.join(FIXTURES_DIR, file), "rb") as f:
+        return str(f.read())
+
+
+@pytest.fixture
+def key_maps() -> tuple[NfoKeyMap, NfoKeyMap]:
+    return NfoKeyMap(WANTED_TITLES, 65, aliases=MEDIAINFO_SECTIONS), \
+           NfoKeyMap(WANTED_SPECIFICATIONS, 80, aliases=MEDIAINFO_KEYS)
+
+
+def test_parse_nfo_mediainfo(key_maps):
+    titles, specifications = key_maps
+    # a later section of the same kind replaces the previous one, the "Audio #2" one is kept
+    assert parse_nfo(load_nfo("mediainfo.nfo"), titles, specifications) == {
+        "video": {"format": "AVC", "codec id": "VMPEG4ISOAVC", "duration": "23 min 40 s", "width": "1 920 pixels",
+                  "height": "1 080 pixels"},
+        "audio": {"format": "AAC LC", "codec id": "AAAC2", "language": "Japanese"},
+        "text": {"format": "ASS", "codec id": "STEXTASS", "language": "French"},
+    }
+
+
+def test_parse_nfo_memoized_keys(key_maps):
+    titles, specifications = key_maps
+    first = parse_nfo(load_nfo("mediainfo.nfo"), titles, specifications)
+    assert parse_nfo(load_nfo("mediainfo.nfo"), titles, specifications) == first
+    assert specifications.stats()["hits"] > 0
+
+
+def test_parse_nfo_without_sections(key_maps):
+    titles, specifications = key_maps
+    assert parse_nfo(str(b"<pre>No MediaInfo here\n</pre>"), titles, specifications) == {}
+
+
+@pytest.mark.parametrize("part, expected", [
+    ("Codec ID : V_MPEGH/ISO/HEVC", ("codec id", "V_MPEGH/ISO/HEVC")),
+    ("Frame rate : 23.976 (24000/1001) FPS", ("frame rate", "23.976 (24000/1001) FPS")),
+    ("Writing app. : mkvmerge", ("writing app", "mkvmerge")),
+    ("00:01:30.000 : en:Part A", ("00", "01:30.000 : en:Part A")),
+    ("Audio #1", ("audio #1", "")),
+])
+def test_split_value(part, expected):
+    assert split_value(part) == expected
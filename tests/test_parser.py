@@ -0,0 +1,62 @@
+import json
+import os
+
+import pytest
+
+from Parser import BRACKET_PAIRS, delete_from_to, isolate_numbers, parse_release, strip_brackets
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def legacy_strip(name: str) -> str:
+    # how SorterCommon.make_clean_file_name removed the groups before strip_brackets
+    for fromm, to in BRACKET_PAIRS:
+        while fromm in name and to in name:
+            name = delete_from_to(name, fromm, to)
+    return name
+
+
+@pytest.mark.parametrize("name", [
+    "[Judas] Vinland Saga - S02E23 (1080p) [Multi Subs].mkv",
+    "[Erai-raws] Vinland Saga - S02E23 " + "[1080p][HEVC]{x265}(CR)[Multi [Subs]]" * 20 + "(v2.mkv",
+    "[ASW] Kaminaki Sekai no Kamisama Katsudou - 10 [1080p HEVC][504C7F1D].mkv",
+    "Saving 80,000 Gold in Another World for my Retirement - S01E12 (1080p CR WEB-DL -KS-).mkv",
+    "{Group} Show (2023) - 01 [v2] (Dual Audio).mkv",
+    "Show ]closed[ before opened].mkv",
+    "No group at all S01E01.mkv",
+])
+def test_strip_brackets_matches_delete_from_to(name):
+    assert strip_brackets(name) == legacy_strip(name)
+
+
+def test_strip_brackets_keeps_unclosed_group():
+    assert strip_brackets("Show - 01 [1080p.mkv") == "Show - 01 [1080p.mkv"
+    assert strip_brackets("[Group] Show - 01 (v2.mkv") == " Show - 01 (v2.mkv"
+
+
+def load_releases() -> list[dict]:
+    # names of main.test() and how SorterShows parsed them
+    with open(os.path.join(FIXTURES_DIR, "releases.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.mark.parametrize("release", load_releases(), ids=lambda release: release["name"])
+def test_parse_release_matches_sorter_shows(release):
+    parsed = parse_release(strip_brackets(release["name"]))
+    assert (parsed.title, parsed.season, parsed.episode, parsed.group) == \
+           (release["title"], release["season"], release["episode"], release["source"])
+
+
+@pytest.mark.parametrize("name, resolution, language", [
+    ("Vinland Saga S02E23 VOSTFR 1080p-Trix.mkv", "1080p", "VOSTFR"),
+    ("law.and.order.svu.s23e10.french.720p.hdtv.x264-obstacle.mkv", "720p", None),
+    ("Show S01E01 VF 10800p.mkv", None, "VF"),
+    ("Show S01E01 MULTi VF VOSTFR 2160p.mkv", "2160p", "VF/VOSTFR"),
+])
+def test_parse_release_tags(name, resolution, language):
+    parsed = parse_release(name)
+    assert (parsed.resolution, parsed.language) == (resolution, language)
+
+
+def test_isolate_numbers():
+    assert isolate_numbers("Show S01E0113 2023") == ["01", "0113", "2023"]
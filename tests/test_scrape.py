@@ -0,0 +1,64 @@
+import os
+
+import pytest
+
+from Scrape import ResultRow, parse_result_page
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+HEADER = '<h2>Résultats de recherche <font style="float: right">{} résultats trouvés</font></h2>'
+
+
+def load_page(file: str) -> bytes:
+    with open(os.path.join(FIXTURES_DIR, file), "rb") as f:
+        return f.read()
+
+
+def result_row(torrent_id: int, name: str, seeders: int) -> str:
+    return (f'<td><span class="tag_subcat_2179"></span></td><td><a id="torrent_name" href="/torrent/{torrent_id}">'
+            f'{name}</a></td><td><a target="{torrent_id}" id="get_nfo"></a></td><td>1.2Go</td><td>{seeders}</td>'
+            f'<td>0</td>')
+
+
+def test_parse_result_page():
+    # rows closed, left without </tr>, left without </td> and holding a nested table, in that order
+    assert parse_result_page(load_page("result_page.html")) == ([
+        ResultRow(name="Vinland.Saga.S02E23.MULTi.1080p.WEB.x264-GRP", torrent_id="1043251", seeders="87"),
+        ResultRow(name="Law & Order SVU S23E10 FRENCH 720p HDTV x264-OBSTACLE", torrent_id="1043187", seeders="14"),
+        ResultRow(name="Greys.Anatomy.S19E16.MULTi.1080p.AMZN.WEB-DL.DDP5.1.H.264-FCK", torrent_id="1042990",
+                  seeders="5"),
+        ResultRow(name="The.Full.Monty.The.Serie.S01E08.FiNAL.MULTi.HDR.2160p.DSNP.WEB-DL.DDP5.1.H.265-FCK",
+                  torrent_id="1042874", seeders="31"),
+    ], 127)
+
+
+def test_parse_result_page_str_and_bytes():
+    page = load_page("result_page.html")
+    assert parse_result_page(page.decode("utf-8")) == parse_result_page(page)
+
+
+@pytest.mark.parametrize("body", [
+    # </tr> missing, the next <tr> closes the row
+    "<table><tbody><tr>{first}<tr>{second}</tr></tbody></table>",
+    # </tr> missing, the end of the <tbody> and of the page close the rows
+    "<table><tbody><tr>{first}</tr><tr>{second}</tbody></table>",
+    "<table><tbody><tr>{first}</tr><tr>{second}",
+    # </td> missing, the next <td> closes the cell
+    "<table><tr>{first_open_tds}</tr><tr>{second}</tr></table>",
+    # a table nested in a cell does not end the row holding it
+    "<table><tr><td><table><tr><td>tooltip</td></tr></table></td>{first}</tr><tr>{second}</tr></table>",
+])
+def test_parse_result_page_malformed_rows(body):
+    first, second = result_row(1, "First.S01E01", 12), result_row(2, "Second.S01E02", 3)
+    body = body.format(first=first, second=second, first_open_tds=first.replace("</td>", ""))
+    assert parse_result_page(HEADER.format(2) + body) == \
+           ([ResultRow("First.S01E01", "1", "12"), ResultRow("Second.S01E02", "2", "3")], 2)
+
+
+def test_parse_result_page_without_results():
+    assert parse_result_page(HEADER.format(0) + "<table><tbody></tbody></table>") == ([], 0)
+
+
+def test_parse_result_page_without_count():
+    page = "<h2>Aucun résultat</h2><table><tr>" + result_row(1, "First.S01E01", 12) + "</tr></table>"
+    assert parse_result_page(page) == (None, None)